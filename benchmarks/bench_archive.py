@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare a trace directory with its content-addressed archive: disk size and
+time to read every file (plain reads vs archive reconstruction), plus random
+access to single steps.
+
+Usage:
+    python benchmarks/bench_archive.py --spec tiny traces/*.bin
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from jam_types import spec
+from jam_types.archive import TraceArchive, create_archive
+
+
+def read_files(files):
+    total = 0
+    for filename in files:
+        with open(filename, 'rb') as file:
+            total += len(file.read())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trace archive benchmark')
+    parser.add_argument('files', nargs='+', help='Trace files (genesis.bin, NNNNNNNN.bin)')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-n', '--count', type=int, default=1000, help='Number of random step reads')
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.jar')
+        start = time.perf_counter()
+        writer = create_archive(path, args.files)
+        elapsed = time.perf_counter() - start
+        print(f"{len(args.files)} files, {writer.input_size} bytes -> archive {writer.size} bytes "
+              f"({writer.size / writer.input_size:.1%}), created in {elapsed:.2f}s")
+
+        start = time.perf_counter()
+        total = read_files(args.files)
+        print(f"{'read files':20} {time.perf_counter() - start:8.3f}s {total} bytes")
+
+        with TraceArchive(path) as archive:
+            start = time.perf_counter()
+            total = sum(len(archive.read(name)) for name in archive.names())
+            print(f"{'read archive':20} {time.perf_counter() - start:8.3f}s {total} bytes")
+
+            rnd = random.Random(0)
+            names = [rnd.choice(archive.names()) for _ in range(args.count)]
+            start = time.perf_counter()
+            for name in names:
+                archive.read(name)
+            elapsed = time.perf_counter() - start
+            print(f"{'random access':20} {elapsed / args.count * 1e6:8.1f}us per file")
+
+
+if __name__ == '__main__':
+    main()
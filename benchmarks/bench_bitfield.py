@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Per core availability counts of an `AssurancesXt` with an assurance from every
+validator: unpacking the decoded bitfields bit by bit vs `bitfield.core_assurances`
+on the decoded and on the encoded extrinsic.
+
+Usage:
+    python benchmarks/bench_bitfield.py --spec full
+"""
+
+import argparse
+import os
+import random
+import time
+
+from jam_types import spec
+from jam_types.bitfield import core_assurances
+from jam_types.block import AssurancesXt
+from jam_types.codec import decode, encode
+from jam_types.spec import spec_params
+
+
+def loop_counts(assurances, core_count):
+    """Reference counting unpacking the bits of each bitfield."""
+    counts = [0] * core_count
+    for assurance in assurances:
+        octets = bytes.fromhex(assurance['bitfield'][2:])
+        for core in range(core_count):
+            if octets[core // 8] >> (core % 8) & 1:
+                counts[core] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Availability bitfields aggregation benchmark')
+    parser.add_argument('--spec', default='full', choices=['tiny', 'full'])
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    params = spec_params(args.spec)
+    core_count = params['core_count']
+    width = params['avail_bitfield_bytes']
+    rnd = random.Random(0)
+    assurances = [{
+        'anchor': '0x' + os.urandom(32).hex(),
+        'bitfield': '0x' + rnd.getrandbits(core_count).to_bytes(width, 'little').hex(),
+        'validator_index': index,
+        'signature': '0x' + os.urandom(64).hex(),
+    } for index in range(params['validators_count'])]
+    blob = encode(AssurancesXt, assurances)
+    assurances = decode(AssurancesXt, blob)
+    print(f"{len(assurances)} assurances, {core_count} cores")
+
+    reference = loop_counts(assurances, core_count)
+    timings = {}
+    for name, run in (('bit loop', lambda: loop_counts(assurances, core_count)),
+                      ('decoded', lambda: core_assurances(assurances)),
+                      ('encoded', lambda: core_assurances(blob))):
+        if run() != reference:
+            raise SystemExit(f"Error: {name} counts differ")
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+        print(f"{name:10} {best * 1e6:10.1f} us  ({timings['bit loop'] / best:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
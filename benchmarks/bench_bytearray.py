@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure the ByteArray single slice fast path against per-element decoding.
+
+Usage:
+    python benchmarks/bench_bytearray.py --spec tiny traces/00000001.bin traces/00000002.bin
+"""
+
+import argparse
+import os
+import re
+import time
+
+from jam_types import spec, ScaleBytes
+from jam_types.simple import ByteArray
+from jam_types.fuzzer import Genesis, TraceStep
+
+
+def infer_type(filename):
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name == 'genesis':
+        return Genesis
+    if re.match(r'^\d{8}$', name):
+        return TraceStep
+    raise ValueError(f"Cannot infer type of '{filename}'")
+
+
+def per_element_process(self):
+    """Reference path: one `U8` object per octet (pre fast path behavior)."""
+    return '0x{}'.format(bytes(self.process_type('U8').value for _ in range(self.element_count)).hex())
+
+
+def bench(blobs, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for decode_type, blob in blobs:
+            decode_type(data=ScaleBytes(blob)).decode()
+    return (time.perf_counter() - start) / (rounds * len(blobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ByteArray decoding benchmark')
+    parser.add_argument('files', nargs='+', help='Trace step (NNNNNNNN.bin) or genesis.bin files')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-r', '--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    blobs = []
+    for filename in args.files:
+        with open(filename, 'rb') as file:
+            blobs.append((infer_type(filename), file.read()))
+    total = sum(len(blob) for _, blob in blobs)
+    print(f"{len(blobs)} files, {total} bytes, spec {args.spec}, {args.rounds} rounds")
+
+    fast_process = ByteArray.process
+    fast = bench(blobs, args.rounds)
+    ByteArray.process = per_element_process
+    try:
+        slow = bench(blobs, args.rounds)
+    finally:
+        ByteArray.process = fast_process
+
+    # Both paths must produce the same output
+    for decode_type, blob in blobs:
+        fast_value = decode_type(data=ScaleBytes(blob)).decode()
+        ByteArray.process = per_element_process
+        try:
+            slow_value = decode_type(data=ScaleBytes(blob)).decode()
+        finally:
+            ByteArray.process = fast_process
+        assert fast_value == slow_value
+
+    print(f"per-element: {slow * 1e3:9.3f} ms/file")
+    print(f"slice:       {fast * 1e3:9.3f} ms/file")
+    print(f"speedup:     {slow / fast:9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Decode the arrays of encoded `Statistics` values: lists of dicts (`codec.decode`)
+vs NumPy columns (`columnar.decode_columns`). Requires NumPy.
+
+Usage:
+    python benchmarks/bench_columnar.py --spec full statistics/*.bin
+"""
+
+import argparse
+import time
+
+from jam_types import spec
+from jam_types.codec import decode, map_file
+from jam_types.columnar import decode_columns
+from jam_types.types import CoresStatistics, ServicesStatistics, Statistics, ValidatorsStatistics
+from jam_types.view import view
+
+FIELDS = (
+    ('vals_curr', ValidatorsStatistics),
+    ('cores', CoresStatistics),
+    ('services', ServicesStatistics),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar decoding benchmark')
+    parser.add_argument('files', nargs='+', help='Encoded Statistics files')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    arrays = {name: [] for name, _ in FIELDS}
+    for filename in args.files:
+        data = map_file(filename)
+        stats = view(Statistics, data)
+        for name, _ in FIELDS:
+            arrays[name].append(bytes(stats._raw_field(name)))
+        data.release()
+
+    for name, cls in FIELDS:
+        timings = []
+        for run in (lambda blob: decode(cls, blob), lambda blob: decode_columns(cls, blob)):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for blob in arrays[name]:
+                    run(blob)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best / len(arrays[name]))
+        print(f"{cls.__name__:22} decode {timings[0] * 1e3:8.3f} ms  columns {timings[1] * 1e3:8.3f} ms"
+              f"  ({timings[0] / timings[1]:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+JAM compact integers: table-driven single value and run codecs (`codec.decode_compact`,
+`codec.decode_compacts`, `codec.encode_compacts`) vs a bit by bit loop, then
+decoding of full `Statistics` values (mostly compact fields) with scalecodec
+vs the compiled codec.
+
+Usage:
+    python benchmarks/bench_compact.py
+    python benchmarks/bench_compact.py --spec full statistics/*.bin
+"""
+
+import argparse
+import random
+import time
+
+from scalecodec.base import ScaleBytes
+
+from jam_types import spec
+from jam_types.codec import decode, decode_compact, decode_compacts, encode_compacts, map_file
+from jam_types.types import Statistics
+
+
+def loop_decode_compact(data, offset):
+    """Reference decoder walking the head bits one at a time."""
+    head = data[offset]
+    if head < 0x80:
+        return head, offset + 1
+    length = 1
+    while length < 8 and head & (0x80 >> length):
+        length += 1
+    start = offset + 1
+    end = start + length
+    low = int.from_bytes(data[start:end], 'little')
+    if length == 8:
+        return low, end
+    return ((head & (0xff >> (length + 1))) << (8 * length)) | low, end
+
+
+def loop_encode_compact(value):
+    """Reference encoder trying the lengths one at a time."""
+    if value < 0x80:
+        return bytes([value])
+    for length in range(1, 8):
+        if value < 1 << (7 * (length + 1)):
+            head = 256 - (1 << (8 - length)) + (value >> (8 * length))
+            return bytes([head]) + (value & ((1 << (8 * length)) - 1)).to_bytes(length, 'little')
+    return b'\xff' + value.to_bytes(8, 'little')
+
+
+def best_of(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def per_item(elapsed, count):
+    elapsed /= count
+    return f"{elapsed * 1e3:7.3f} ms" if elapsed >= 1e-4 else f"{elapsed * 1e9:7.1f} ns"
+
+
+def compare(label, runs, count, repeat):
+    (base_name, base), (name, run) = runs
+    if base() != run():
+        raise SystemExit(f"Error: {label} results differ")
+    base_time = best_of(base, repeat)
+    run_time = best_of(run, repeat)
+    print(f"{label:14} {base_name} {per_item(base_time, count)}  {name} {per_item(run_time, count)}"
+          f"  ({base_time / run_time:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact integer codec benchmark')
+    parser.add_argument('files', nargs='*', help='Encoded Statistics files')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-n', '--count', type=int, default=100000, help='Number of compact integers')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    # Mostly small counters, as in the statistics records, with some large values
+    values = [rnd.getrandbits(rnd.choice((6, 6, 6, 10, 13, 20, 32, 64))) for _ in range(args.count)]
+    blob = encode_compacts(values)
+    print(f"{len(values)} compact integers, {len(blob)} bytes")
+
+    def loop_single():
+        offset, result = 0, []
+        for _ in range(len(values)):
+            value, offset = loop_decode_compact(blob, offset)
+            result.append(value)
+        return result
+
+    def table_single():
+        offset, result = 0, []
+        for _ in range(len(values)):
+            value, offset = decode_compact(blob, offset)
+            result.append(value)
+        return result
+
+    compare('decode single', (('loop', loop_single), ('table', table_single)), len(values), args.repeat)
+    compare('decode run', (('loop', loop_single), ('table', lambda: decode_compacts(blob, 0, len(values))[0])),
+            len(values), args.repeat)
+    compare('encode run', (('loop', lambda: b''.join(map(loop_encode_compact, values))),
+                           ('table', lambda: bytes(encode_compacts(values)))), len(values), args.repeat)
+
+    if args.files:
+        spec.set_spec(args.spec)
+        blobs = []
+        for filename in args.files:
+            data = map_file(filename)
+            blobs.append(bytes(data))
+            data.release()
+        compare('Statistics', (('scalecodec', lambda: [Statistics(data=ScaleBytes(b)).decode() for b in blobs]),
+                               ('compiled', lambda: [decode(Statistics, b) for b in blobs])),
+                len(blobs), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure end-to-end fuzzer protocol throughput against a stand-in target.
+
+The stand-in `TraceTarget` runs in a separate process on a Unix socket and
+answers from the given trace files. The fuzzer side imports all the trace blocks
+`--rounds` times, first one request at a time and then with pipelined requests.
+
+Usage:
+    python benchmarks/bench_endpoint.py --spec tiny traces/genesis.bin traces/0*.bin
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from jam_types import spec
+from jam_types.endpoint import FuzzerClient, TraceTarget, message_kind, serve_target
+
+
+def run_target(path, files, spec_name, ready):
+    async def serve():
+        target = TraceTarget.from_files(files, spec=spec_name)
+        server = await serve_target(target.handle, path=path, spec=spec_name)
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+async def run_fuzzer(path, target, rounds, window):
+    client = await FuzzerClient.connect(path=path, window=window)
+    await client.handshake(target.info)
+    if target.genesis is not None:
+        await client.initialize(target.genesis['header'], target.genesis['state']['keyvals'])
+    else:
+        first = target.steps[0]
+        await client.initialize(first['block']['header'], first['pre_state']['keyvals'])
+    blocks = [step['block'] for step in target.steps] * rounds
+    start = time.perf_counter()
+    imported = 0
+    async for response in client.import_blocks(blocks):
+        if message_kind(response) != 'state_root':
+            raise ValueError(f"Unexpected response {response}")
+        imported += 1
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return imported, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fuzzer protocol end-to-end benchmark')
+    parser.add_argument('files', nargs='+', help='Trace step (NNNNNNNN.bin) and genesis.bin files')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-r', '--rounds', type=int, default=5)
+    parser.add_argument('-w', '--window', type=int, default=16, help='Pipelined requests in flight')
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    target = TraceTarget.from_files(args.files)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'target.sock')
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=run_target, args=(path, args.files, args.spec, ready), daemon=True)
+        process.start()
+        ready.wait()
+        try:
+            print(f"{len(target.steps)} blocks, spec {args.spec}, {args.rounds} rounds")
+            for window in (1, args.window):
+                imported, elapsed = asyncio.run(run_fuzzer(path, target, args.rounds, window))
+                print(f"window {window:3}: {imported / elapsed:10.1f} blocks/s")
+        finally:
+            process.terminate()
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
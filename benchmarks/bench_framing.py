@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measure FuzzerWireMessage framing throughput over a local Unix socket.
+
+Messages are `import_block` and `state` messages built out of the given trace
+steps (or `state_root` messages if no file is given). The writer thread sends
+pre-encoded frames in batches, the reader is either a naive `recv` loop or
+`FrameReader` (frames only, then frames and decoding).
+
+Usage:
+    python benchmarks/bench_framing.py --spec tiny traces/00000001.bin traces/00000002.bin
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from jam_types import spec
+from jam_types.codec import decode, encode
+from jam_types.fuzzer import FuzzerMessage, TraceStep
+from jam_types.framing import FrameReader, FrameWriter
+
+
+def build_payloads(files):
+    if not files:
+        return [bytes(encode(FuzzerMessage, {'state_root': '0x' + '11' * 32}))]
+    payloads = []
+    for filename in files:
+        with open(filename, 'rb') as file:
+            step = decode(TraceStep, file.read())
+        payloads.append(bytes(encode(FuzzerMessage, {'import_block': step['block']})))
+        payloads.append(bytes(encode(FuzzerMessage, {'state': step['post_state']['keyvals']})))
+    return payloads
+
+
+def send_all(sock, payloads, count):
+    writer = FrameWriter(sock)
+    for i in range(count):
+        writer.write_frame(payloads[i % len(payloads)])
+    writer.flush()
+    sock.shutdown(socket.SHUT_WR)
+
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def naive_reader(sock):
+    """Reference path: one `recv` for the length and `recv` + join for the message."""
+    count = 0
+    while True:
+        try:
+            length = struct.unpack('<I', recv_exact(sock, 4))[0]
+        except EOFError:
+            return count
+        recv_exact(sock, length)
+        count += 1
+
+
+def framed_reader(sock):
+    reader = FrameReader(sock)
+    count = 0
+    while reader.read_frame() is not None:
+        count += 1
+    return count
+
+
+def decoding_reader(sock):
+    return sum(1 for _ in FrameReader(sock))
+
+
+def bench(read, payloads, count):
+    left, right = socket.socketpair(socket.AF_UNIX)
+    sender = threading.Thread(target=send_all, args=(left, payloads, count))
+    start = time.perf_counter()
+    sender.start()
+    received = read(right)
+    elapsed = time.perf_counter() - start
+    sender.join()
+    left.close()
+    right.close()
+    assert received == count
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FuzzerWireMessage framing benchmark')
+    parser.add_argument('files', nargs='*', help='Trace step (NNNNNNNN.bin) files')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-n', '--count', type=int, default=20000, help='Number of messages')
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    payloads = build_payloads(args.files)
+    total = sum(len(payloads[i % len(payloads)]) + 4 for i in range(args.count))
+    print(f"{args.count} messages, {total} bytes, spec {args.spec}")
+
+    for name, read in (('naive recv', naive_reader), ('FrameReader', framed_reader),
+                       ('FrameReader+decode', decoding_reader)):
+        elapsed = bench(read, payloads, args.count)
+        print(f"{name:20} {args.count / elapsed:12.0f} msg/s {total / elapsed / 1e6:9.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
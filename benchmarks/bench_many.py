@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Decode and encode many values of the same type (the headers and the
+`import_block` fuzzer messages of trace steps): a loop of scalecodec
+`cls(data=ScaleBytes(b)).decode()`, a loop of `codec.decode` and
+`codec.decode_many`, optionally in a process pool; same for encoding.
+
+Usage:
+    python benchmarks/bench_many.py --spec tiny traces/0*.bin
+    python benchmarks/bench_many.py --spec full -n 5000 -j 4 traces/0*.bin
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scalecodec.base import ScaleBytes
+
+from jam_types import spec
+from jam_types.block import Header
+from jam_types.codec import decode, decode_many, encode, encode_many, map_file
+from jam_types.fuzzer import FuzzerMessage, TraceStep
+from jam_types.view import view
+
+
+def best_of(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare(label, runs, count, repeat):
+    expected = None
+    base = None
+    for name, run in runs:
+        result = [bytes(item) for item in run()] if label == 'encode' else run()
+        if expected is None:
+            expected = result
+        elif result != expected:
+            raise SystemExit(f"Error: {name} results differ")
+        elapsed = best_of(run, repeat)
+        base = base or elapsed
+        print(f"  {label} {name:22} {elapsed / count * 1e6:10.1f} us/value  ({base / elapsed:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch decoding and encoding benchmark')
+    parser.add_argument('files', nargs='+', help='Trace step files (NNNNNNNN.bin)')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-n', '--count', type=int, default=1000, help='Values per batch (files reused as needed)')
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='Also run in a pool of JOBS processes')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    headers = []
+    messages = []
+    for filename in args.files:
+        data = map_file(filename)
+        block = view(TraceStep, data).block
+        headers.append(bytes(block.header._raw))
+        messages.append(b'\x03' + bytes(block._raw))
+        data.release()
+    headers = (headers * (args.count // len(headers) + 1))[:args.count]
+    messages = (messages * (args.count // len(messages) + 1))[:args.count]
+
+    executor = ProcessPoolExecutor(args.jobs) if args.jobs else None
+    for cls, blobs in ((Header, headers), (FuzzerMessage, messages)):
+        print(f"{cls.__name__}: {len(blobs)} values, {sum(map(len, blobs))} bytes")
+        decode_runs = [
+            ('scalecodec', lambda: [cls(data=ScaleBytes(bytearray(blob))).decode() for blob in blobs]),
+            ('decode loop', lambda: [decode(cls, blob) for blob in blobs]),
+            ('decode_many', lambda: decode_many(cls, blobs)),
+        ]
+        if executor:
+            decode_runs.append((f'decode_many ({args.jobs} jobs)', lambda: decode_many(cls, blobs, executor=executor)))
+        compare('decode', decode_runs, len(blobs), args.repeat)
+
+        values = decode_many(cls, blobs)
+        encode_runs = [
+            ('encode loop', lambda: [encode(cls, value) for value in values]),
+            ('encode_many', lambda: encode_many(cls, values)),
+        ]
+        if executor:
+            encode_runs.append((f'encode_many ({args.jobs} jobs)', lambda: encode_many(cls, values, executor=executor)))
+        compare('encode', encode_runs, len(blobs), args.repeat)
+    if executor:
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Decoding into dicts (`codec.decode`) vs into the typed model (`model.decode_model`):
+decoding time and memory held by the decoded values.
+
+Usage:
+    python benchmarks/bench_model.py --spec full traces/0*.bin
+    python benchmarks/bench_model.py --spec full -t Statistics statistics.bin
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from jam_types import spec
+from jam_types.codec import decode, map_file, resolve_type
+from jam_types.model import decode_model
+from jam_types.scripts.jam_decode import resolve_decode_type
+
+
+def measure(run, blobs, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for blob in blobs:
+            run(blob)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    values = [run(blob) for blob in blobs]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del values
+    return best, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Typed model decoding benchmark')
+    parser.add_argument('files', nargs='+', help='Files to decode')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-t', '--type', default='trace_step', help='Type of the files (default: trace_step)')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    cls = resolve_decode_type(args.type) or resolve_type(args.type)
+    blobs = []
+    for filename in args.files:
+        data = map_file(filename)
+        blobs.append(bytes(data))
+        data.release()
+    total = sum(len(blob) for blob in blobs)
+    print(f"{len(blobs)} files, {total} bytes")
+
+    results = {}
+    for name, run in (('decode', lambda blob: decode(cls, blob)),
+                      ('decode_model', lambda blob: decode_model(cls, blob))):
+        elapsed, size, peak = measure(run, blobs, args.repeat)
+        results[name] = (elapsed, size)
+        print(f"{name:14} {elapsed:8.3f}s {size / 2**20:9.2f} MiB held {peak / 2**20:9.2f} MiB peak")
+    print(f"time {results['decode'][0] / results['decode_model'][0]:.2f}x, "
+          f"memory {results['decode'][1] / results['decode_model'][1]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
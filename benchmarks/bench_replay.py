@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Walk a whole trace: decode every step in full (the pre- and post-state
+key-values indexed in dicts) vs the incremental replay over the step files and
+over their archive.
+
+Usage:
+    python benchmarks/bench_replay.py --spec tiny traces/*.bin
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from jam_types import spec
+from jam_types.archive import TraceArchive, create_archive
+from jam_types.codec import decode_file
+from jam_types.fuzzer import TraceStep
+from jam_types.replay import replay_archive, replay_files
+
+
+def full_decode(files):
+    changes = 0
+    for filename in files:
+        if os.path.basename(filename) == 'genesis.bin':
+            continue
+        step = decode_file(TraceStep, filename)
+        pre = {entry['key']: entry['value'] for entry in step['pre_state']['keyvals']}
+        post = {entry['key']: entry['value'] for entry in step['post_state']['keyvals']}
+        changes += sum(1 for key in pre.keys() | post.keys() if pre.get(key) != post.get(key))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trace replay benchmark')
+    parser.add_argument('files', nargs='+', help='Trace files (genesis.bin, NNNNNNNN.bin)')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.jar')
+        create_archive(path, args.files)
+        with TraceArchive(path) as archive:
+            runs = (
+                ('full decode', lambda: full_decode(args.files)),
+                ('replay files', lambda: sum(len(step.changes) for step in replay_files(args.files))),
+                ('replay archive', lambda: sum(len(step.changes) for step in replay_archive(archive))),
+            )
+            for name, run in runs:
+                start = time.perf_counter()
+                changes = run()
+                print(f"{name:16} {time.perf_counter() - start:8.3f}s {changes} changes")
+
+
+if __name__ == '__main__':
+    main()
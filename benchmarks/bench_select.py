@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Extract a few values out of many encoded files: full decode of each file and
+walk of the decoded value vs path-selective decoding (`jam_types.select`).
+
+Usage:
+    python benchmarks/bench_select.py --spec full traces/0*.bin
+    python benchmarks/bench_select.py --select block.header.slot --select post_state.state_root traces/0*.bin
+"""
+
+import argparse
+import time
+
+from jam_types import spec
+from jam_types.codec import decode_file, map_file
+from jam_types.fuzzer import TraceStep
+from jam_types.select import parse_path, select_paths
+
+DEFAULT_PATHS = ['block.header.slot', 'block.extrinsic.guarantees[*].report']
+
+
+def walk(value, steps):
+    """Reference selection on a decoded value."""
+    if not steps or value is None:
+        return value
+    step, rest = steps[0], steps[1:]
+    if isinstance(step, slice):
+        return [walk(item, rest) for item in value[step]]
+    if isinstance(step, str) and not isinstance(value, dict):
+        # A variant of a unit enum
+        return None
+    if isinstance(step, str) and step not in value:
+        # Another variant of an enum
+        return None
+    return walk(value[step], rest)
+
+
+def full_decode(files, paths):
+    steps = [parse_path(path) for path in paths]
+    results = []
+    for filename in files:
+        value = decode_file(TraceStep, filename)
+        results.append({path: walk(value, path_steps) for path, path_steps in zip(paths, steps)})
+    return results
+
+
+def selective(files, paths):
+    results = []
+    for filename in files:
+        data = map_file(filename)
+        try:
+            results.append(select_paths(TraceStep, data, paths))
+        finally:
+            data.release()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Path-selective decoding benchmark')
+    parser.add_argument('files', nargs='+', help='Trace step files (NNNNNNNN.bin)')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('--select', action='append', metavar='PATH',
+                        help=f"Paths to select in the trace steps (default: {', '.join(DEFAULT_PATHS)})")
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    paths = args.select or DEFAULT_PATHS
+    timings = {}
+    for name, run in (('full decode', full_decode), ('select', selective)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = run(args.files, paths)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = (best, results)
+        print(f"{name:12} {best:8.3f}s {best / len(args.files) * 1e3:8.3f} ms/file")
+    if timings['full decode'][1] != timings['select'][1]:
+        raise SystemExit("Error: selections differ from the full decode")
+    print(f"speedup {timings['full decode'][0] / timings['select'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure the state Merkle root computation on a full-size synthetic state: one
+shot root, cached trie build and root, and root after updating a few keys.
+
+With trace files, also check the recorded state roots (genesis state and step
+post-states) against the computed ones.
+
+Usage:
+    python benchmarks/bench_trie.py -n 100000
+    python benchmarks/bench_trie.py --spec tiny traces/*.bin
+"""
+
+import argparse
+import os
+import random
+import time
+
+from jam_types import KeyValuesMap, spec
+from jam_types.codec import map_file
+from jam_types.fuzzer import Genesis, TraceStep
+from jam_types.trie import StateTrie, merkle_root
+from jam_types.view import view
+
+
+def synthetic_state(count, rnd):
+    # Mostly small values (embedded leaves), some large ones (hashed)
+    return {rnd.randbytes(31): rnd.randbytes(rnd.choice((4, 8, 32, 64, 300))) for _ in range(count)}
+
+
+def timed(label, run, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:28} {elapsed * 1e3:10.2f} ms")
+    return result
+
+
+def check_files(files):
+    for filename in files:
+        data = map_file(filename)
+        if os.path.basename(filename) == 'genesis.bin':
+            state = view(Genesis, data).state._raw
+        else:
+            state = view(TraceStep, data).post_state._raw
+        keyvals = KeyValuesMap.from_raw_state(state)
+        root = merkle_root(keyvals)
+        status = 'ok' if '0x' + root.hex() == keyvals.state_root else f"MISMATCH (computed 0x{root.hex()})"
+        print(f"{os.path.basename(filename):16} {len(keyvals):8} keys {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='State trie Merkle root benchmark')
+    parser.add_argument('files', nargs='*', help='Trace files (genesis.bin, NNNNNNNN.bin) to check')
+    parser.add_argument('--spec', default='tiny', choices=['tiny', 'full'])
+    parser.add_argument('-n', '--count', type=int, default=100000, help='Synthetic state keys')
+    parser.add_argument('-u', '--updates', type=int, default=20, help='Keys changed per update round')
+    args = parser.parse_args()
+
+    spec.set_spec(args.spec)
+    if args.files:
+        check_files(args.files)
+        return
+
+    rnd = random.Random(0)
+    state = synthetic_state(args.count, rnd)
+    print(f"{len(state)} keys, {sum(map(len, state.values()))} value bytes")
+    root = timed('merkle_root', lambda: merkle_root(state))
+    trie = timed('StateTrie build', lambda: StateTrie(state))
+    assert timed('StateTrie first root', trie.root) == root
+
+    keys = list(state)
+
+    def update():
+        for key in rnd.sample(keys, args.updates):
+            trie[key] = rnd.randbytes(8)
+        return trie.root()
+
+    timed(f"update {args.updates} keys + root", update, repeat=20)
+    assert trie.root() == merkle_root(trie)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,14 @@ from .block import *
 from .work import *
 from .history import *
 from .utils import *
+from .codec import *
+from .view import *
+from .index import *
+from .registry import *
+from .keyvals import *
+from .diff import *
+from .hashing import *
+from .select import *
 
 from scalecodec import ScaleBytes
 
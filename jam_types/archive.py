@@ -0,0 +1,391 @@
+"""
+Content-addressed trace archive.
+
+Consecutive trace steps share most of their state: the post-state of a step is
+the pre-state of the next one and only a few key-values change per block. An
+archive stores each distinct blob (an encoded `KeyValue`, block or header) once
+and describes every trace file with a small manifest referencing blobs by id:
+
+    <header> <blobs> <index> <blob offsets>
+
+ * header: magic, version, offsets of the index and of the blob offsets table.
+ * blobs: distinct contents, back to back. States are blobs too (state root
+   and key-value blob ids), so equal states (e.g. a step post-state and the
+   next step pre-state) are stored once. Key-value blob ids are stored as runs
+   of consecutive ids, and as blobs are written in order a run is rebuilt with
+   a single copy.
+ * index: the spec name and the files manifests in insertion order.
+ * blob offsets: `U64` little endian start offsets of the blobs, followed by
+   the end of the last one, for constant time blob lookup.
+
+Files are rebuilt by concatenating blobs, byte-identical to the originals:
+
+    with TraceArchiveWriter('trace.jar', spec='tiny') as writer:
+        for filename in filenames:
+            writer.add_file(filename)
+
+    archive = TraceArchive('trace.jar')
+    blob = archive.read('00000042.bin')     # or archive.read(41)
+    archive.extract('traces/')
+
+Files other than `genesis.bin` and `NNNNNNNN.bin`, and trace files which can't
+be rebuilt exactly from their components, are stored as a single blob.
+
+The archive structures are SCALE encoded, without being registered as JAM types:
+
+    state:    state_root ++ Vec<U32> runs (flattened `(first, count)` pairs)
+    index:    String spec ++ Vec<file>
+    file:     String name ++ U64 size ++ content
+    content:  0 ++ U32 header ++ U32 state                      (genesis)
+              1 ++ U32 pre_state ++ U32 block ++ U32 post_state  (trace_step)
+              2 ++ U32 blob                                     (raw)
+"""
+
+import hashlib
+import os
+import re
+import struct
+import sys
+from array import array
+
+from .codec import _truncated, compact_size, decode, decode_compact, map_file, write_compact
+from .fuzzer import Genesis, TraceStep
+from .index import measure
+from .spec import get_current_spec
+
+MAGIC = b'JAMTRACE'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIQQ')
+_TRACE_STEP_NAME = re.compile(r'^\d{8}\.bin$')
+
+
+# Manifest contents: kind and blob id fields, by enum index
+_CONTENTS = (
+    ('genesis', ('header', 'state')),
+    ('trace_step', ('pre_state', 'block', 'post_state')),
+    ('raw', None),
+)
+_CONTENT_INDEX = {kind: index for index, (kind, _) in enumerate(_CONTENTS)}
+_U64 = struct.Struct('<Q')
+
+
+def _compact(value):
+    buf = bytearray(compact_size(value))
+    write_compact(buf, 0, value)
+    return bytes(buf)
+
+
+def _ids(ids):
+    return struct.pack(f'<{len(ids)}I', *ids)
+
+
+def _string(value):
+    value = value.encode()
+    return _compact(len(value)) + value
+
+
+def _encode_state(state_root, runs):
+    return state_root + _compact(len(runs)) + _ids(runs)
+
+
+def _encode_index(spec, files):
+    parts = [_string(spec), _compact(len(files))]
+    for file in files:
+        kind, value = next(iter(file['content'].items()))
+        index = _CONTENT_INDEX[kind]
+        fields = _CONTENTS[index][1]
+        parts += (_string(file['name']), _U64.pack(file['size']), bytes((index,)),
+                  _ids([value] if fields is None else [value[field] for field in fields]))
+    return b''.join(parts)
+
+
+def _decode_string(data, offset):
+    length, start = decode_compact(data, offset)
+    end = start + length
+    if end > len(data):
+        _truncated('String')
+    return str(data[start:end], 'utf-8'), end
+
+
+def _decode_index(data):
+    """`(spec, files)` of an encoded index."""
+    try:
+        spec, offset = _decode_string(data, 0)
+        count, offset = decode_compact(data, offset)
+        files = []
+        for _ in range(count):
+            name, offset = _decode_string(data, offset)
+            size = _U64.unpack_from(data, offset)[0]
+            index = data[offset + 8]
+            if index >= len(_CONTENTS):
+                raise ValueError(f"Index '{index}' not present in Enum type mapping")
+            kind, fields = _CONTENTS[index]
+            ids = struct.unpack_from(f'<{1 if fields is None else len(fields)}I', data, offset + 9)
+            offset += 9 + 4 * len(ids)
+            value = ids[0] if fields is None else dict(zip(fields, ids))
+            files.append({'name': name, 'size': size, 'content': {kind: value}})
+    except (IndexError, struct.error):
+        _truncated('ArchiveIndex')
+    if offset != len(data):
+        raise ValueError(f"Decoding <ArchiveIndex> - Current offset: {offset} / length: {len(data)}")
+    return spec, files
+
+
+class TraceArchiveWriter:
+    """
+    Build an archive at `path` out of trace files.
+
+    Trace files are split with the `spec` (the current one if None) types, the
+    archive itself can be read without knowing it.
+    """
+
+    def __init__(self, path, spec=None):
+        self.spec = spec or get_current_spec()
+        self._file = open(path, 'wb')
+        self._file.write(bytes(_HEADER.size))
+        self._ids = {}
+        self._offsets = array('Q', [_HEADER.size])
+        self._files = []
+        self._names = set()
+        self.input_size = 0
+        self.size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def _blob(self, data):
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        blob_id = self._ids.get(digest)
+        if blob_id is None:
+            blob_id = len(self._offsets) - 1
+            self._ids[digest] = blob_id
+            self._file.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+        return blob_id
+
+    def _state(self, data, node):
+        keyvals = node['keyvals']
+        offsets = keyvals.offsets
+        blob = self._blob
+        runs = []
+        last = None
+        for i in range(keyvals.count):
+            blob_id = blob(data[offsets[i]:offsets[i + 1]])
+            if runs and blob_id == last + 1:
+                runs[-1] += 1
+            else:
+                runs += (blob_id, 1)
+            last = blob_id
+        root = node['state_root']
+        return blob(_encode_state(bytes(data[root.start:root.end]), runs))
+
+    def _split(self, name, data):
+        """Manifest content of a trace file, None if it can't be rebuilt from its components."""
+        cls, states = (Genesis, ('state',)) if name == 'genesis.bin' else (TraceStep, ('pre_state', 'post_state'))
+        try:
+            index = measure(cls, data, depth=2, spec=self.spec)
+        except ValueError:
+            return None
+        if index.end != len(data):
+            return None
+        for state in states:
+            keyvals = index[state]['keyvals']
+            # Only canonical length prefixes are rebuilt from the entries count
+            if data[keyvals.start:keyvals.offsets[0]] != _compact(keyvals.count):
+                return None
+        if cls is Genesis:
+            header = index['header']
+            return {'genesis': {
+                'header': self._blob(data[header.start:header.end]),
+                'state': self._state(data, index['state']),
+            }}
+        block = index['block']
+        return {'trace_step': {
+            'pre_state': self._state(data, index['pre_state']),
+            'block': self._blob(data[block.start:block.end]),
+            'post_state': self._state(data, index['post_state']),
+        }}
+
+    def add(self, name, data):
+        """Archive the content `data` of the file `name` (e.g. '00000001.bin')."""
+        if name in self._names:
+            raise ValueError(f"Duplicate archive file '{name}'")
+        data = memoryview(data)
+        content = None
+        if name == 'genesis.bin' or _TRACE_STEP_NAME.match(name):
+            content = self._split(name, data)
+        if content is None:
+            content = {'raw': self._blob(data)}
+        self._names.add(name)
+        self._files.append({'name': name, 'size': len(data), 'content': content})
+        self.input_size += len(data)
+
+    def add_file(self, filename, name=None):
+        """Archive the file `filename`, as `name` (its base name if None)."""
+        data = map_file(filename)
+        try:
+            self.add(name or os.path.basename(filename), data)
+        finally:
+            data.release()
+
+    def close(self):
+        """Write the index and the blob offsets table."""
+        if self._file.closed:
+            return
+        try:
+            file = self._file
+            index_offset = self._offsets[-1]
+            file.write(_encode_index(self.spec, self._files))
+            table_offset = file.tell()
+            offsets = array('Q', self._offsets)
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            file.write(offsets.tobytes())
+            self.size = file.tell()
+            file.seek(0)
+            file.write(_HEADER.pack(MAGIC, VERSION, index_offset, table_offset))
+        finally:
+            self._file.close()
+
+
+def _release(data):
+    if isinstance(data, memoryview):
+        data.release()
+
+
+class TraceArchive:
+    """
+    Read-only archive, memory mapped.
+
+    Files are addressed by name or by position (insertion order) and rebuilt on
+    access reading only their blobs.
+    """
+
+    def __init__(self, path):
+        data = map_file(path)
+        try:
+            if len(data) < _HEADER.size:
+                raise ValueError("Not a trace archive")
+            magic, version, index_offset, table_offset = _HEADER.unpack_from(data)
+            if magic != MAGIC:
+                raise ValueError("Not a trace archive")
+            if version != VERSION:
+                raise ValueError(f"Unsupported trace archive version {version}")
+            spec, files = _decode_index(data[index_offset:table_offset])
+            table = data[table_offset:]
+            if sys.byteorder == 'little':
+                table = table.cast('Q')
+            else:
+                table = array('Q', table)
+                table.byteswap()
+        except Exception:
+            data.release()
+            raise
+        self._data = data
+        self._table = table
+        self.spec = spec
+        self.files = files
+        self._positions = {file['name']: position for position, file in enumerate(self.files)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        _release(self._table)
+        self._data.release()
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def names(self):
+        return [file['name'] for file in self.files]
+
+    def file(self, key):
+        """Manifest (`{'name', 'size', 'content'}` dict) of the file `key`, a name or a position."""
+        if isinstance(key, str):
+            position = self._positions.get(key)
+            if position is None:
+                raise KeyError(key)
+            key = position
+        return self.files[key]
+
+    @property
+    def blob_count(self):
+        return len(self._table) - 1
+
+    def blob(self, blob_id):
+        """Content of the blob `blob_id`, as a memoryview over the archive."""
+        return self._data[self._table[blob_id]:self._table[blob_id + 1]]
+
+    def state_runs(self, blob_id):
+        """
+        `(state_root, firsts, counts)` of the state blob `blob_id`: the key-values
+        are the blobs `first .. first + count - 1` of each run.
+        """
+        state = self.blob(blob_id)
+        runs = decode('Vec<U32>', state[32:])
+        return state[:32], runs[0::2], runs[1::2]
+
+    def state(self, blob_id):
+        """`(state_root, keyvals)` of the state blob `blob_id`, root as bytes and key-values as blob ids."""
+        root, firsts, counts = self.state_runs(blob_id)
+        keyvals = []
+        for first, count in zip(firsts, counts):
+            keyvals.extend(range(first, first + count))
+        return bytes(root), keyvals
+
+    def _state_parts(self, blob_id, parts):
+        root, firsts, counts = self.state_runs(blob_id)
+        parts.append(root)
+        parts.append(_compact(sum(counts)))
+        data, table = self._data, self._table
+        for first, count in zip(firsts, counts):
+            parts.append(data[table[first]:table[first + count]])
+
+    def read(self, key):
+        """Content of the file `key` (a name or a position), byte-identical to the archived one."""
+        content = self.file(key)['content']
+        kind, value = next(iter(content.items()))
+        parts = []
+        if kind == 'genesis':
+            parts.append(self.blob(value['header']))
+            self._state_parts(value['state'], parts)
+        elif kind == 'trace_step':
+            self._state_parts(value['pre_state'], parts)
+            parts.append(self.blob(value['block']))
+            self._state_parts(value['post_state'], parts)
+        else:
+            parts.append(self.blob(value))
+        return b''.join(parts)
+
+    def extract(self, directory, names=None):
+        """Write the files `names` (all if None) into `directory`, returning their paths."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name in self.names() if names is None else names:
+            # Names come from the archive: plain file names only, never outside `directory`
+            if name in ('', '.', '..') or os.path.isabs(name) or os.path.basename(name) != name:
+                raise ValueError(f"Invalid archive file name '{name}'")
+            path = os.path.join(directory, name)
+            with open(path, 'wb') as file:
+                file.write(self.read(name))
+            paths.append(path)
+        return paths
+
+
+def create_archive(path, filenames, spec=None):
+    """Archive `filenames` (in name order) into `path`, returning the `TraceArchiveWriter` with its sizes."""
+    with TraceArchiveWriter(path, spec) as writer:
+        for filename in sorted(filenames, key=os.path.basename):
+            writer.add_file(filename)
+    return writer
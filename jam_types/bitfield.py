@@ -0,0 +1,258 @@
+"""
+Availability bitfields as sets of cores.
+
+A `Bitfield` holds the bits of an `AvailabilityBitfield` in an int, bit `i`
+(bit `i % 8` of octet `i // 8`) standing for core `i`:
+
+    bits = Bitfield.from_bytes(assurance['bitfield'], core_count)
+    bits.popcount()                     # number of cores assured
+    bits.cores()                        # [0, 3, ...]
+    3 in bits, bits & other, bits | other
+
+`decode_model` decodes availability bitfields as `Bitfield`s.
+
+Assurances extrinsics are aggregated without unpacking the bits one by one: the
+bitfields of all the validators are summed at once, as bit-sliced counters over
+ints holding half of the remaining bitfields each.
+
+    core_assurances(block['extrinsic']['assurances'])    # per core counts
+    available_cores(block['extrinsic']['assurances'])    # cores over 2/3 assured
+"""
+
+import struct
+
+from .codec import _as_buffer, _fixed_octets, _truncated, decode_compact, fixed_size
+from .spec import get_current_spec, spec_params
+from .types import AvailAssurance, OpaqueHash
+from .view import SequenceView
+
+# Bit `k` of each octet
+_BIT = tuple(bytes((octet >> k) & 1 for octet in range(256)) for k in range(8))
+
+
+class Bitfield:
+    """
+    Set of indices below `size` backed by the int `bits`.
+
+    Bitfields read from octets keep them, so that the padding bits above `size`
+    (ignored as cores) are encoded back unchanged.
+    """
+    __slots__ = ('bits', 'size', '_octets')
+
+    def __init__(self, bits=0, size=0):
+        # No bit set at or above `size`: the padding bits of the encoding are zero
+        if bits < 0 or bits >> size:
+            raise ValueError(f"Bitfield: {bits:#x} doesn't fit {size} bits")
+        self.bits = bits
+        self.size = size
+        self._octets = None
+
+    @classmethod
+    def from_bytes(cls, value, size=None):
+        """Bitfield of the octets `value` (hex string, bytes-like or list), `size` defaults to all their bits."""
+        if isinstance(value, Bitfield):
+            value = value.to_bytes()
+        if size is None:
+            octets = bytes.fromhex(value[2:]) if type(value) is str else bytes(value)
+            size = 8 * len(octets)
+        else:
+            octets = _fixed_octets(value, (size + 7) // 8, cls.__name__)
+        return cls._from_octets(octets, size)
+
+    @classmethod
+    def _from_octets(cls, octets, size):
+        bits = int.from_bytes(octets, 'little')
+        if not bits >> size:
+            return cls(bits, size)
+        bitfield = cls(bits & ((1 << size) - 1), size)
+        bitfield._octets = bytes(octets)
+        return bitfield
+
+    @classmethod
+    def from_cores(cls, cores, size):
+        """Bitfield with the `cores` indices set."""
+        bits = 0
+        for core in cores:
+            if not 0 <= core < size:
+                raise ValueError(f"Bitfield: core {core} out of range ({size} cores)")
+            bits |= 1 << core
+        return cls(bits, size)
+
+    def to_bytes(self):
+        if self._octets is not None:
+            return self._octets
+        return self.bits.to_bytes((self.size + 7) // 8, 'little')
+
+    __bytes__ = to_bytes
+
+    def to_json(self):
+        """Hex string, as `codec.decode` gives an `AvailabilityBitfield`."""
+        return '0x' + self.to_bytes().hex()
+
+    def popcount(self):
+        """Number of set bits."""
+        return self.bits.bit_count()
+
+    def cores(self):
+        """Indices of the set bits, in increasing order."""
+        cores = []
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            cores.append(low.bit_length() - 1)
+            bits ^= low
+        return cores
+
+    def __iter__(self):
+        return iter(self.cores())
+
+    def __contains__(self, core):
+        return core >= 0 and (self.bits >> core) & 1 == 1
+
+    def __getitem__(self, core):
+        if not 0 <= core < self.size:
+            raise IndexError(f"Bitfield index {core} out of range")
+        return (self.bits >> core) & 1 == 1
+
+    def __and__(self, other):
+        if not isinstance(other, Bitfield):
+            return NotImplemented
+        return Bitfield(self.bits & other.bits, max(self.size, other.size))
+
+    def __or__(self, other):
+        if not isinstance(other, Bitfield):
+            return NotImplemented
+        return Bitfield(self.bits | other.bits, max(self.size, other.size))
+
+    def __xor__(self, other):
+        if not isinstance(other, Bitfield):
+            return NotImplemented
+        return Bitfield(self.bits ^ other.bits, max(self.size, other.size))
+
+    def __invert__(self):
+        return Bitfield(self.bits ^ ((1 << self.size) - 1), self.size)
+
+    def __int__(self):
+        return self.bits
+
+    def __eq__(self, other):
+        if not isinstance(other, Bitfield):
+            return NotImplemented
+        return self.bits == other.bits and self.size == other.size
+
+    def __hash__(self):
+        return hash((self.bits, self.size))
+
+    def __repr__(self):
+        return f"Bitfield({self.cores()}, size={self.size})"
+
+#
+# Assurances aggregation
+#
+
+def _bitfields(assurances, width, spec):
+    """`(octets, count)`: the bitfields of `assurances` concatenated."""
+    if isinstance(assurances, SequenceView):
+        assurances = assurances._raw
+    if isinstance(assurances, (list, tuple)):
+        bitfields = [assurance['bitfield'] if isinstance(assurance, dict) else assurance.bitfield
+                     for assurance in assurances]
+        if all(type(bitfield) is str and len(bitfield) == 2 * width + 2 and bitfield[:2] == '0x'
+               for bitfield in bitfields):
+            # Decoded hex strings, joined and parsed at once
+            return bytes.fromhex(''.join([bitfield[2:] for bitfield in bitfields])), len(bitfields)
+        octets = []
+        for bitfield in bitfields:
+            if isinstance(bitfield, Bitfield):
+                octets.append(bitfield.bits.to_bytes(width, 'little'))
+            else:
+                octets.append(_fixed_octets(bitfield, width, 'AvailabilityBitfield'))
+        return b''.join(octets), len(bitfields)
+
+    # Encoded AssurancesXt: fixed size records, the bitfield after the anchor
+    data = _as_buffer(assurances)
+    try:
+        count, offset = decode_compact(data, 0)
+    except IndexError:
+        _truncated('AssurancesXt')
+    record = fixed_size(AvailAssurance, spec)
+    end = offset + count * record
+    if end > len(data):
+        _truncated('AssurancesXt')
+    if end != len(data):
+        raise ValueError(f"Decoding <AssurancesXt> - Current offset: {end} / length: {len(data)}")
+    records = bytes(data[offset + fixed_size(OpaqueHash, spec):end])
+    octets = bytearray(count * width)
+    for j in range(width):
+        octets[j::width] = records[j::record]
+    return octets, count
+
+
+def _add(a, b):
+    """Sum of the bit-sliced counters `a` and `b` (least significant plane first, `len(a) >= len(b)`)."""
+    x, y = a[0], b[0]
+    result = [x ^ y]
+    carry = x & y
+    for k in range(1, len(a)):
+        x = a[k]
+        y = b[k] if k < len(b) else 0
+        s = x ^ y
+        result.append(s ^ carry)
+        carry = (x & y) | (carry & s)
+    if carry:
+        result.append(carry)
+    return result
+
+
+def _column_counts(octets, count, width, size):
+    """Number of the `count` bitfields of `width` octets in `octets` with each of the first `size` bits set."""
+    bits = 8 * width
+    # Fold the upper half of the bitfields onto the lower one until a single one is left
+    n = 1
+    while n < count:
+        n <<= 1
+    if n > 1:
+        n >>= 1
+        planes = _add([int.from_bytes(octets[:n * width], 'little')], [int.from_bytes(octets[n * width:], 'little')])
+    else:
+        planes = [int.from_bytes(octets, 'little')]
+    while n > 1:
+        n >>= 1
+        shift = n * bits
+        mask = (1 << shift) - 1
+        planes = _add([plane & mask for plane in planes], [plane >> shift for plane in planes])
+    # Spread the bits of each plane to 16 bit lanes and sum them with their weights
+    total = 0
+    lanes = bytearray(16 * width)
+    for k, plane in enumerate(planes):
+        plane = plane.to_bytes(width, 'little')
+        for j in range(8):
+            lanes[2 * j::16] = plane.translate(_BIT[j])
+        total += int.from_bytes(lanes, 'little') << k
+    return list(struct.unpack_from(f'<{size}H', total.to_bytes(16 * width, 'little')))
+
+
+def core_assurances(assurances, spec=None):
+    """
+    Number of assurances of each core (list of `core_count` ints) in `assurances`:
+    an `AssurancesXt` decoded (dicts or model values), as a view or encoded.
+    """
+    params = spec_params(spec or get_current_spec())
+    width = params['avail_bitfield_bytes']
+    octets, count = _bitfields(assurances, width, spec)
+    if count > 0xffff:
+        raise ValueError(f"Too many assurances ({count})")
+    return _column_counts(octets, count, width, params['core_count'])
+
+
+def available_cores(assurances, threshold=None, spec=None):
+    """Bitfield of the cores with at least `threshold` (default: super majority) assurances."""
+    params = spec_params(spec or get_current_spec())
+    if threshold is None:
+        threshold = params['validators_super_majority']
+    counts = core_assurances(assurances, spec)
+    bits = 0
+    for core, assured in enumerate(counts):
+        if assured >= threshold:
+            bits |= 1 << core
+    return Bitfield(bits, params['core_count'])
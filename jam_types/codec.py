@@ -0,0 +1,1278 @@
+"""
+Compiled JAM codec.
+
+Each jam_types class (Struct, Enum, Vec, BoundedVec, FixedLengthArray, Compact, ...)
+is turned, on first use and once per spec, into a flat decoding function working
+directly on a bytes-like buffer. Type names are resolved at compile time, so the
+per-call cost is only the actual decoding.
+
+Decoded values are identical to the ones returned by the scalecodec `decode()`.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from functools import partial
+from itertools import islice
+
+from scalecodec import (
+    Null,
+    U8,
+    U16,
+    U32,
+    U64,
+    F32,
+    F64,
+    Bool,
+    Bytes,
+    Compact,
+    Enum,
+    FixedLengthArray,
+    HexBytes,
+    Option,
+    ScaleBytes,
+    Struct,
+    Vec,
+)
+from scalecodec.base import RuntimeConfiguration
+
+from .simple import ByteArray
+from .spec import get_current_spec, spec_attribute
+
+__all__ = [
+    'resolve_type',
+    'fixed_size',
+    'compile_decoder',
+    'compile_encoder',
+    'compile_skipper',
+    'decode',
+    'decode_many',
+    'decode_file',
+    'map_file',
+    'encode',
+    'encode_many',
+    'encode_into',
+    'encoded_size',
+    'decode_compact',
+    'decode_compacts',
+    'compact_size',
+    'compacts_size',
+    'write_compact',
+    'write_compacts',
+    'encode_compacts',
+    'compact_length',
+    'skip_compact',
+]
+
+# Fixed width little endian primitives: (class, struct format, size)
+_PRIMITIVES = (
+    (U8, '<B', 1),
+    (U16, '<H', 2),
+    (U32, '<I', 4),
+    (U64, '<Q', 8),
+    (F32, '<f', 4),
+    (F64, '<d', 8),
+)
+
+_decoders = {}
+_encoders = {}
+_skippers = {}
+_layouts = {}
+_lock = threading.RLock()
+# Spec the codecs are being built for (set while building for a given spec)
+_context = threading.local()
+
+
+def resolve_type(type_string):
+    """Resolve a type name (e.g. 'Vec<Option<OpaqueHash>>') to its decoder class."""
+    if isinstance(type_string, type):
+        return type_string
+    if type_string is None:
+        return Null
+    cls = RuntimeConfiguration().get_decoder_class(type_string)
+    if cls is None:
+        raise ValueError(f"Unknown type '{type_string}'")
+    return cls
+
+
+def _type_key(type_string):
+    return type_string if isinstance(type_string, type) else str(type_string).lower()
+
+
+def _truncated(name):
+    raise ValueError(f"Decoding <{name}> - not enough bytes")
+
+
+def _is_u8(type_string):
+    return resolve_type(type_string) is U8
+
+
+def _fn_name(prefix, cls):
+    return prefix + ''.join(c if c.isalnum() else '_' for c in cls.__name__)
+
+#
+# Compact integers
+#
+
+#
+# The first octet of an encoding tells, by its leading one bits, the number of
+# octets following it (`_COMPACT_EXTRA`), its remaining bits are the most
+# significant ones of the value (`_COMPACT_HIGH`). The encoded length of a value
+# only depends on its bit length (`_COMPACT_SIZES`).
+#
+
+_COMPACT_EXTRA = bytes(next(n for n in range(9) if n == 8 or not head & (0x80 >> n)) for head in range(256))
+_COMPACT_HIGH = bytes(head & (0xff >> (_COMPACT_EXTRA[head] + 1)) for head in range(256))
+_COMPACT_SIZES = bytes(min(9, 1 + max(0, bits - 1) // 7) for bits in range(65))
+# First octet marker bits of the encodings with `n` octets following the first one
+_COMPACT_PREFIX = tuple((0xff00 >> n) & 0xff for n in range(9))
+
+
+def decode_compact(data, offset):
+    """Decode a JAM compact integer, returning `(value, next_offset)`."""
+    head = data[offset]
+    if head < 0x80:
+        return head, offset + 1
+    if head < 0xc0:
+        return ((head & 0x3f) << 8) | data[offset + 1], offset + 2
+    length = _COMPACT_EXTRA[head]
+    start = offset + 1
+    end = start + length
+    if end > len(data):
+        _truncated('Compact')
+    return (_COMPACT_HIGH[head] << (8 * length)) | int.from_bytes(data[start:end], 'little'), end
+
+
+def decode_compacts(data, offset, count):
+    """Decode `count` consecutive JAM compact integers, returning `(values, next_offset)`."""
+    extra = _COMPACT_EXTRA
+    high = _COMPACT_HIGH
+    values = []
+    append = values.append
+    size = len(data)
+    try:
+        for _ in range(count):
+            head = data[offset]
+            if head < 0x80:
+                append(head)
+                offset += 1
+            elif head < 0xc0:
+                append(((head & 0x3f) << 8) | data[offset + 1])
+                offset += 2
+            else:
+                start = offset + 1
+                offset = start + extra[head]
+                if offset > size:
+                    raise IndexError
+                append((high[head] << (8 * extra[head])) | int.from_bytes(data[start:offset], 'little'))
+    except IndexError:
+        _truncated('Compact')
+    return values, offset
+
+#
+# Fixed layouts
+#
+# Types made only of fixed width fields (integers, bools, octet arrays, arrays of
+# integers and structs of them) have a `struct` format for the current spec.
+# A layout is a `(format, items, decode_expr, encode_expr)` tuple, where
+# `decode_expr(k)` is the source building the value out of the unpacked tuple `t`
+# starting from item `k`, and `encode_expr(src)` the source of the pack arguments
+# of the value `src`. Consecutive fixed layout fields are then decoded with one
+# `unpack_from`, arrays of them with one `iter_unpack`, and encoded with `pack_into`.
+#
+
+def _check_bool(value):
+    if value > 1:
+        raise ValueError('Invalid value for datatype "bool"')
+    return value == 1
+
+
+def _bool_octet(value):
+    if value is not True and value is not False:
+        raise ValueError('Value must be boolean')
+    return 1 if value else 0
+
+
+def _check_float(value):
+    if type(value) is not float:
+        raise ValueError(f'{value} is not a float')
+    return value
+
+
+def _fixed_octets(value, count, name):
+    value = _octets(value, name)
+    if len(value) != count:
+        raise ValueError(f"{name}: value should be {count} bytes long")
+    return value
+
+
+def _fixed_items(value, count, name):
+    if type(value) is not list or len(value) != count:
+        raise ValueError(f"{name}: value should be a list of {count} elements")
+    return value
+
+
+_LAYOUT_HELPERS = {
+    'check_bool': _check_bool,
+    'bool_octet': _bool_octet,
+    'check_float': _check_float,
+    'fixed_octets': _fixed_octets,
+    'fixed_items': _fixed_items,
+    'truncated': _truncated,
+}
+
+
+def _item_layout(fmt, decode_expr='t[{k}]', encode_expr='{src}'):
+    return (fmt, 1, lambda k: decode_expr.format(k=k), lambda src: encode_expr.format(src=src))
+
+
+def _compile_layout(cls):
+    if issubclass(cls, Null):
+        return ('', 0, lambda k: 'None', lambda src: '')
+    if issubclass(cls, Bool):
+        return _item_layout('B', 'check_bool(t[{k}])', 'bool_octet({src})')
+    for base, fmt, _ in _PRIMITIVES:
+        if issubclass(cls, base):
+            if base in (F32, F64):
+                return _item_layout(fmt[1:], encode_expr='check_float({src})')
+            return _item_layout(fmt[1:])
+    if issubclass(cls, FixedLengthArray):
+        count = _element_count(cls)
+        name = cls.__name__
+        if count and (issubclass(cls, ByteArray) or _is_u8(cls.sub_type)):
+            return _item_layout(f'{count}s', "'0x' + t[{k}].hex()", f"fixed_octets({{src}}, {count}, {name!r})")
+        sub_cls = resolve_type(cls.sub_type)
+        if count and issubclass(sub_cls, (U16, U32, U64)):
+            fmt = _layout(sub_cls)[0]
+            return (f'{count}{fmt}', count,
+                    lambda k: f"list(t[{k}:{k + count}])",
+                    lambda src: f"*fixed_items({src}, {count}, {name!r})")
+        return None
+    if issubclass(cls, Struct):
+        fields = []
+        for field, type_string in cls.type_mapping:
+            layout = _layout(type_string)
+            if layout is None:
+                return None
+            fields.append((field, layout))
+
+        def decode_expr(k):
+            values = []
+            for field, layout in fields:
+                values.append(f"{field!r}: {layout[2](k)}")
+                k += layout[1]
+            return "{" + ", ".join(values) + "}"
+
+        def encode_expr(src):
+            args = (layout[3](f"{src}[{field!r}]") for field, layout in fields)
+            return ", ".join(arg for arg in args if arg)
+
+        return (''.join(layout[0] for _, layout in fields), sum(layout[1] for _, layout in fields),
+                decode_expr, encode_expr)
+    return None
+
+
+def _layout(type_string):
+    """Fixed layout of `type_string` for the current spec, None if it has none."""
+    return _cached(_layouts, lambda cls: _compile_layout(cls) or False, type_string) or None
+
+
+def fixed_size(cls, spec=None):
+    """Encoded size of `cls` (a class or a type name) if it doesn't depend on the value, else None."""
+    return _compile_skip(cls, spec)[0]
+
+#
+# Decoders
+#
+
+def _compile_struct(cls):
+    fn_name = _fn_name('decode_', cls)
+    lines = [f"def {fn_name}(data, offset):"]
+    namespace = dict(_LAYOUT_HELPERS)
+    values = []
+    run = []
+
+    def flush_run():
+        if not run:
+            return
+        unpacker = struct.Struct('<' + ''.join(layout[0] for _, layout in run))
+        namespace[f"s{len(lines)}"] = unpacker.unpack_from
+        lines.append(f"    t = s{len(lines)}(data, offset)")
+        k = 0
+        for var, layout in run:
+            lines.append(f"    {var} = {layout[2](k)}")
+            k += layout[1]
+        lines.append(f"    offset += {unpacker.size}")
+        run.clear()
+
+    for i, (name, type_string) in enumerate(cls.type_mapping):
+        var = f"v{i}"
+        values.append(f"{name!r}: {var}")
+        layout = _layout(type_string)
+        if layout is not None:
+            run.append((var, layout))
+            continue
+        flush_run()
+        if issubclass(resolve_type(type_string), Compact):
+            # Single octet compacts (most counters and lengths) decoded inline
+            namespace['decode_compact'] = decode_compact
+            lines.append(f"    {var} = data[offset]")
+            lines.append(f"    if {var} < 0x80:")
+            lines.append("        offset += 1")
+            lines.append("    else:")
+            lines.append(f"        {var}, offset = decode_compact(data, offset)")
+            continue
+        namespace[f"f{i}"] = _compile(type_string)
+        lines.append(f"    {var}, offset = f{i}(data, offset)")
+    flush_run()
+    lines.append(f"    return {{{', '.join(values)}}}, offset")
+    exec("\n".join(lines), namespace)
+    return namespace[fn_name]
+
+
+def _compile_enum(cls):
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    variants = [None] * 256
+    for index, (name, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            variants[index] = (name, None)
+        else:
+            variants[index] = (name, _compile(type_string))
+
+    def decode_enum(data, offset):
+        index = data[offset]
+        variant = variants[index]
+        if variant is None:
+            raise ValueError(f"Index '{index}' not present in Enum type mapping")
+        name, decode_value = variant
+        if decode_value is None:
+            return name, offset + 1
+        value, offset = decode_value(data, offset + 1)
+        return {name: value}, offset
+
+    return decode_enum
+
+
+def _compile_sequence(element_type):
+    """Decoder of `count` consecutive elements: `decode_elements(data, offset, count)`."""
+    layout = _layout(element_type)
+    if layout is not None and layout[0]:
+        unpacker = struct.Struct('<' + layout[0])
+        namespace = dict(_LAYOUT_HELPERS, iter_unpack=unpacker.iter_unpack)
+        name = resolve_type(element_type).__name__
+        exec(f"def decode_elements(data, offset, count):\n"
+             f"    end = offset + count * {unpacker.size}\n"
+             f"    if end > len(data):\n"
+             f"        truncated({name!r})\n"
+             f"    return [{layout[2](0)} for t in iter_unpack(data[offset:end])], end",
+             namespace)
+        return namespace['decode_elements']
+    if issubclass(resolve_type(element_type), Compact):
+        return decode_compacts
+
+    decode_element = _compile(element_type)
+
+    def decode_elements(data, offset, count):
+        result = []
+        append = result.append
+        for _ in range(count):
+            value, offset = decode_element(data, offset)
+            append(value)
+        return result, offset
+
+    return decode_elements
+
+
+def _compile_fixed_array(cls):
+    count = _element_count(cls)
+    if not count:
+        return lambda data, offset: ([], offset)
+    if issubclass(cls, ByteArray) or _is_u8(cls.sub_type):
+        def decode_octets(data, offset):
+            end = offset + count
+            if end > len(data):
+                _truncated(cls.__name__)
+            return '0x' + data[offset:end].hex(), end
+        return decode_octets
+
+    decode_elements = _compile_sequence(cls.sub_type)
+
+    def decode_array(data, offset):
+        return decode_elements(data, offset, count)
+
+    return decode_array
+
+
+def _compile_vec(cls):
+    if _is_u8(cls.sub_type):
+        return _compile_bytes(cls)
+
+    decode_elements = _compile_sequence(cls.sub_type)
+
+    def decode_vec(data, offset):
+        count, offset = decode_compact(data, offset)
+        return decode_elements(data, offset, count)
+
+    return decode_vec
+
+
+def _compile_bytes(cls):
+    as_hex = issubclass(cls, HexBytes)
+
+    def decode_bytes(data, offset):
+        length, offset = decode_compact(data, offset)
+        end = offset + length
+        if end > len(data):
+            _truncated(cls.__name__)
+        value = data[offset:end]
+        if not as_hex:
+            try:
+                return bytes(value).decode(), end
+            except UnicodeDecodeError:
+                pass
+        return '0x' + value.hex(), end
+
+    return decode_bytes
+
+
+def _compile_option(cls):
+    if not cls.sub_type:
+        return lambda data, offset: (None, offset + 1)
+    decode_value = _compile(cls.sub_type)
+
+    def decode_option(data, offset):
+        if data[offset] == 0:
+            return None, offset + 1
+        return decode_value(data, offset + 1)
+
+    return decode_option
+
+
+def _compile_primitive(cls):
+    for base, fmt, size in _PRIMITIVES:
+        if issubclass(cls, base):
+            unpacker = struct.Struct(fmt).unpack_from
+
+            def decode_primitive(data, offset):
+                return unpacker(data, offset)[0], offset + size
+
+            return decode_primitive
+    return None
+
+
+def _compile_fallback(cls):
+    """Delegate decoding of types with no compiled counterpart to scalecodec."""
+    def decode_scale(data, offset):
+        scale_bytes = ScaleBytes(bytearray(data[offset:]))
+        value = cls(data=scale_bytes).decode(check_remaining=False)
+        return value, offset + scale_bytes.offset
+    return decode_scale
+
+
+def _compile_decoder(cls):
+    if issubclass(cls, Struct):
+        return _compile_struct(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _compile_enum(cls)
+    if issubclass(cls, FixedLengthArray):
+        return _compile_fixed_array(cls)
+    if issubclass(cls, Vec):
+        return _compile_vec(cls)
+    if issubclass(cls, Option):
+        return _compile_option(cls)
+    if issubclass(cls, Compact):
+        return decode_compact
+    if issubclass(cls, (HexBytes, Bytes)):
+        return _compile_bytes(cls)
+    if issubclass(cls, Null):
+        return lambda data, offset: (None, offset)
+    if issubclass(cls, Bool):
+        def decode_bool(data, offset):
+            value = data[offset]
+            if value > 1:
+                raise ValueError('Invalid value for datatype "bool"')
+            return value == 1, offset + 1
+        return decode_bool
+    return _compile_primitive(cls) or _compile_fallback(cls)
+
+
+def _active_spec():
+    """Spec being built for, the current one outside of `_cached` builds."""
+    return getattr(_context, 'spec', None) or get_current_spec()
+
+
+def _element_count(cls):
+    return int(spec_attribute(cls, 'element_count', _active_spec()))
+
+
+def _cached(cache, build, type_string, spec=None):
+    """
+    Get (or build and store) the compiled object of `type_string` for `spec`.
+
+    `spec` defaults to the one being built for (nested builds) or the current one.
+    Builds read spec dependent attributes through `_element_count`, so objects for
+    any spec can be built without switching the global one.
+    """
+    spec = spec or _active_spec()
+    key = (spec, _type_key(type_string))
+    compiled = cache.get(key)
+    if compiled is None:
+        with _lock:
+            compiled = cache.get(key)
+            if compiled is None:
+                previous = getattr(_context, 'spec', None)
+                _context.spec = spec
+                try:
+                    compiled = build(resolve_type(type_string))
+                finally:
+                    _context.spec = previous
+                cache[key] = compiled
+    return compiled
+
+
+def _compile(type_string, spec=None):
+    return _cached(_decoders, _compile_decoder, type_string, spec)
+
+
+def compile_decoder(cls, spec=None):
+    """
+    Get the compiled decoder of `cls` (a class or a type name) for `spec` (default: current spec).
+
+    The returned function has signature `decoder(data, offset) -> (value, next_offset)`.
+    """
+    return _compile(cls, spec)
+
+
+def _as_buffer(data):
+    if isinstance(data, ScaleBytes):
+        data = data.data
+    return data if isinstance(data, memoryview) else memoryview(data)
+
+
+def decode(cls, data, check_remaining=True, spec=None):
+    """Decode `data` (bytes-like or ScaleBytes) as `cls` using the compiled decoder."""
+    data = _as_buffer(data)
+    try:
+        value, offset = _compile(cls, spec)(data, 0)
+    except (IndexError, struct.error):
+        _truncated(getattr(cls, '__name__', cls))
+    if check_remaining and offset != len(data):
+        raise ValueError(f"Decoding <{getattr(cls, '__name__', cls)}> - Current offset: {offset} / length: {len(data)}")
+    return value
+
+
+def _decode_all(cls, buffers, check_remaining, spec):
+    decoder = _compile(cls, spec)
+    name = getattr(cls, '__name__', cls)
+    for data in buffers:
+        data = _as_buffer(data)
+        try:
+            value, offset = decoder(data, 0)
+        except (IndexError, struct.error):
+            _truncated(name)
+        if check_remaining and offset != len(data):
+            raise ValueError(f"Decoding <{name}> - Current offset: {offset} / length: {len(data)}")
+        yield value
+
+
+def _decode_chunk(cls, check_remaining, spec, buffers):
+    return list(_decode_all(cls, buffers, check_remaining, spec))
+
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_many(cls, buffers, check_remaining=True, spec=None, lazy=False, executor=None, chunk_size=256):
+    """
+    Decode each of `buffers` (bytes-like or ScaleBytes) as `cls`, with the decoder looked up once.
+
+    Returns the list of values, or a generator of them if `lazy`. With a
+    `concurrent.futures` `executor`, the buffers are decoded in chunks of
+    `chunk_size` in the executor (values still in order); the spec is fixed when
+    called, and process pools need picklable buffers (e.g. bytes, not memoryviews).
+    """
+    spec = spec or _active_spec()
+    if executor is None:
+        values = _decode_all(cls, buffers, check_remaining, spec)
+        return values if lazy else list(values)
+    results = executor.map(partial(_decode_chunk, cls, check_remaining, spec), _chunks(buffers, chunk_size))
+    values = (value for chunk in results for value in chunk)
+    return values if lazy else list(values)
+
+
+def map_file(filename):
+    """
+    Read-only memoryview over the whole content of `filename`, memory mapped.
+
+    Nothing is read upfront: pages are loaded from the page cache on access (and
+    shared with any other process mapping the same file). The mapping is released
+    once the view and all the slices taken from it are released or collected, so
+    views (`view`, `measure`, `KeyValuesMap`) built on it keep referring the file.
+    """
+    with open(filename, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def decode_file(cls, filename, check_remaining=True, spec=None):
+    """Decode the content of `filename` as `cls`, working on the memory mapped file."""
+    data = map_file(filename)
+    try:
+        return decode(cls, data, check_remaining, spec)
+    finally:
+        data.release()
+
+#
+# Encoders
+#
+# An encoder is a `(size, write)` pair: `size(value)` returns the exact encoded
+# length of `value` and `write(buf, offset, value)` writes it into `buf` (any
+# writable buffer, e.g. bytearray or memoryview) returning the next offset.
+#
+
+def compact_size(value):
+    """Length of the JAM compact encoding of `value`."""
+    if value < 0x80:
+        return 1
+    bits = value.bit_length()
+    return _COMPACT_SIZES[bits] if bits <= 64 else 9
+
+
+def compacts_size(values):
+    """Length of the JAM compact encodings of `values`."""
+    sizes = _COMPACT_SIZES
+    total = 0
+    for value in values:
+        if value < 0x80:
+            total += 1
+        else:
+            bits = value.bit_length()
+            total += sizes[bits] if bits <= 64 else 9
+    return total
+
+
+def write_compact(buf, offset, value):
+    """Write `value` as a JAM compact integer into `buf`, returning the next offset."""
+    if value < 0x80:
+        if value < 0:
+            raise ValueError(f"{value} out of range for Compact")
+        buf[offset] = value
+        return offset + 1
+    bits = value.bit_length()
+    if bits > 64:
+        raise ValueError(f"{value} out of range for Compact")
+    length = _COMPACT_SIZES[bits] - 1
+    end = offset + 1 + length
+    if length == 8:
+        buf[offset] = 0xff
+        buf[offset + 1:end] = value.to_bytes(8, 'little')
+    else:
+        buf[offset] = _COMPACT_PREFIX[length] | (value >> (8 * length))
+        buf[offset + 1:end] = (value & ((1 << (8 * length)) - 1)).to_bytes(length, 'little')
+    return end
+
+
+def write_compacts(buf, offset, values):
+    """Write `values` as consecutive JAM compact integers into `buf`, returning the next offset."""
+    for value in values:
+        if 0 <= value < 0x80:
+            buf[offset] = value
+            offset += 1
+        else:
+            offset = write_compact(buf, offset, value)
+    return offset
+
+
+def encode_compacts(values):
+    """Encoding (bytearray) of `values` as consecutive JAM compact integers."""
+    values = list(values)
+    buf = bytearray(compacts_size(values))
+    write_compacts(buf, 0, values)
+    return buf
+
+
+def _octets(value, name):
+    """Convert a hex string (0x..) or bytes-like value to bytes-like."""
+    if type(value) is str:
+        if value[0:2] != '0x':
+            raise ValueError(f"{name}: value should be a hex-string (0x..) or bytes")
+        return bytes.fromhex(value[2:])
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    if type(value) is list:
+        return bytes(value)
+    raise ValueError(f"{name}: value should be a hex-string (0x..) or bytes")
+
+
+def _octets_len(value):
+    if type(value) is str:
+        return (len(value) - 2) // 2
+    return len(value)
+
+
+def _encoder_struct(cls):
+    namespace = dict(_LAYOUT_HELPERS)
+    fixed = 0
+    size_terms = []
+    write_lines = []
+    run = []
+
+    def flush_run():
+        nonlocal fixed
+        if not run:
+            return
+        packer = struct.Struct('<' + ''.join(layout[0] for _, layout in run))
+        args = (layout[3](f"value[{name!r}]") for name, layout in run)
+        args = ", ".join(arg for arg in args if arg)
+        if args:
+            namespace[f"p{len(write_lines)}"] = packer.pack_into
+            write_lines.append(f"    p{len(write_lines)}(buf, offset, {args})")
+            write_lines.append(f"    offset += {packer.size}")
+        fixed += packer.size
+        run.clear()
+
+    for i, (name, type_string) in enumerate(cls.type_mapping):
+        layout = _layout(type_string)
+        if layout is not None:
+            run.append((name, layout))
+            continue
+        flush_run()
+        namespace[f"z{i}"], namespace[f"w{i}"] = _compile_enc(type_string)
+        field_size = fixed_size(type_string)
+        if field_size is None:
+            size_terms.append(f"z{i}(value[{name!r}])")
+        else:
+            fixed += field_size
+        write_lines.append(f"    offset = w{i}(buf, offset, value[{name!r}])")
+    flush_run()
+
+    size_name = _fn_name('size_', cls)
+    write_name = _fn_name('write_', cls)
+    exec(f"def {size_name}(value):\n"
+         f"    return {' + '.join([str(fixed)] + size_terms)}\n"
+         f"def {write_name}(buf, offset, value):\n" +
+         "\n".join(write_lines + ["    return offset"]),
+         namespace)
+    return namespace[size_name], namespace[write_name]
+
+
+def _encoder_enum(cls):
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    variants = {}
+    for index, (name, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            variants[name] = (index, None)
+        else:
+            variants[name] = (index, _compile_enc(type_string))
+
+    def variant(value):
+        if type(value) is str:
+            value = {value: None}
+        if type(value) is not dict or len(value) != 1:
+            raise ValueError(f"{cls.__name__}: value must be a single entry dict or str, not '{value}'")
+        (name, inner), = value.items()
+        try:
+            index, encoder = variants[name]
+        except KeyError:
+            raise ValueError(f"Value '{name}' not present in type_mapping of {cls.__name__}") from None
+        return index, encoder, inner
+
+    def size_enum(value):
+        _, encoder, inner = variant(value)
+        return 1 if encoder is None else 1 + encoder[0](inner)
+
+    def write_enum(buf, offset, value):
+        index, encoder, inner = variant(value)
+        buf[offset] = index
+        if encoder is None:
+            return offset + 1
+        return encoder[1](buf, offset + 1, inner)
+
+    return size_enum, write_enum
+
+
+def _encoder_elements(cls):
+    """Encoder of a list of `cls.sub_type` elements, with no length prefix."""
+    layout = _layout(cls.sub_type)
+    element_fixed = fixed_size(cls.sub_type)
+    name = cls.__name__
+
+    if layout is not None and layout[0]:
+        packer = struct.Struct('<' + layout[0])
+        namespace = dict(_LAYOUT_HELPERS, pack_into=packer.pack_into)
+        exec(f"def write_elements(buf, offset, value):\n"
+             f"    for element in value:\n"
+             f"        pack_into(buf, offset, {layout[3]('element')})\n"
+             f"        offset += {packer.size}\n"
+             f"    return offset",
+             namespace)
+        write_elements = namespace['write_elements']
+    else:
+        element_write = _compile_enc(cls.sub_type)[1]
+
+        def write_elements(buf, offset, value):
+            for element in value:
+                offset = element_write(buf, offset, element)
+            return offset
+
+    if element_fixed is not None:
+        def size_elements(value):
+            if type(value) is not list:
+                raise ValueError(f"{name}: provided value is not a list")
+            return len(value) * element_fixed
+    else:
+        element_size = _compile_enc(cls.sub_type)[0]
+
+        def size_elements(value):
+            if type(value) is not list:
+                raise ValueError(f"{name}: provided value is not a list")
+            total = 0
+            for element in value:
+                total += element_size(element)
+            return total
+
+    return size_elements, write_elements
+
+
+def _encoder_octets(cls, count):
+    name = cls.__name__
+
+    def size_octets(value):
+        return count
+
+    def write_octets(buf, offset, value):
+        value = _octets(value, name)
+        if len(value) != count:
+            raise ValueError(f"{name}: value should be {count} bytes long")
+        end = offset + count
+        buf[offset:end] = value
+        return end
+
+    return size_octets, write_octets
+
+
+def _encoder_fixed_array(cls):
+    count = _element_count(cls)
+    if count and (issubclass(cls, ByteArray) or _is_u8(cls.sub_type)):
+        return _encoder_octets(cls, count)
+    size_elements, write_elements = _encoder_elements(cls)
+
+    def size_array(value):
+        value = value or []
+        if len(value) != count:
+            raise ValueError(f"{cls.__name__}: expected {count} elements, got {len(value)}")
+        return size_elements(value)
+
+    def write_array(buf, offset, value):
+        return write_elements(buf, offset, value or [])
+
+    return size_array, write_array
+
+
+def _encoder_vec(cls):
+    if _is_u8(cls.sub_type):
+        return _encoder_bytes(cls)
+    size_elements, write_elements = _encoder_elements(cls)
+
+    def size_vec(value):
+        return compact_size(len(value)) + size_elements(value)
+
+    def write_vec(buf, offset, value):
+        return write_elements(buf, write_compact(buf, offset, len(value)), value)
+
+    return size_vec, write_vec
+
+
+def _encoder_bytes(cls):
+    name = cls.__name__
+    as_hex = issubclass(cls, HexBytes)
+
+    def convert(value):
+        if type(value) is str and not as_hex and value[0:2] != '0x':
+            return value.encode()
+        return _octets(value, name)
+
+    def size_bytes(value):
+        if type(value) is str and not as_hex and value[0:2] != '0x':
+            length = len(value.encode())
+        else:
+            length = _octets_len(value)
+        return compact_size(length) + length
+
+    def write_bytes(buf, offset, value):
+        value = convert(value)
+        length = len(value)
+        offset = write_compact(buf, offset, length)
+        end = offset + length
+        buf[offset:end] = value
+        return end
+
+    return size_bytes, write_bytes
+
+
+def _write_none(buf, offset, value):
+    buf[offset] = 0
+    return offset + 1
+
+
+def _encoder_option(cls):
+    if not cls.sub_type:
+        return (lambda value: 1), _write_none
+    value_size, value_write = _compile_enc(cls.sub_type)
+
+    def size_option(value):
+        return 1 if value is None else 1 + value_size(value)
+
+    def write_option(buf, offset, value):
+        if value is None:
+            buf[offset] = 0
+            return offset + 1
+        buf[offset] = 1
+        return value_write(buf, offset + 1, value)
+
+    return size_option, write_option
+
+
+def _encoder_compact(cls):
+    def size_compact(value):
+        return compact_size(int(value))
+
+    def write(buf, offset, value):
+        return write_compact(buf, offset, int(value))
+
+    return size_compact, write
+
+
+def _encoder_bool(cls):
+    def write_bool(buf, offset, value):
+        if value is not True and value is not False:
+            raise ValueError('Value must be boolean')
+        buf[offset] = 1 if value else 0
+        return offset + 1
+
+    return (lambda value: 1), write_bool
+
+
+def _encoder_primitive(cls):
+    for base, fmt, size in _PRIMITIVES:
+        if issubclass(cls, base):
+            packer = struct.Struct(fmt).pack_into
+            is_float = base in (F32, F64)
+
+            def write_primitive(buf, offset, value):
+                if is_float and type(value) is not float:
+                    raise ValueError(f'{value} is not a float')
+                try:
+                    packer(buf, offset, value if is_float else int(value))
+                except struct.error:
+                    raise ValueError(f"{value} out of range for {cls.__name__}") from None
+                return offset + size
+
+            return (lambda value: size), write_primitive
+    return None
+
+
+def _encoder_fallback(cls):
+    """Delegate encoding of types with no compiled counterpart to scalecodec."""
+    def size_scale(value):
+        return len(cls().encode(value).data)
+
+    def write_scale(buf, offset, value):
+        data = cls().encode(value).data
+        end = offset + len(data)
+        buf[offset:end] = data
+        return end
+
+    return size_scale, write_scale
+
+
+def _compile_encoder(cls):
+    if issubclass(cls, Struct):
+        return _encoder_struct(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _encoder_enum(cls)
+    if issubclass(cls, FixedLengthArray):
+        return _encoder_fixed_array(cls)
+    if issubclass(cls, Vec):
+        return _encoder_vec(cls)
+    if issubclass(cls, Option):
+        return _encoder_option(cls)
+    if issubclass(cls, Compact):
+        return _encoder_compact(cls)
+    if issubclass(cls, (HexBytes, Bytes)):
+        return _encoder_bytes(cls)
+    if issubclass(cls, Null):
+        return (lambda value: 0), (lambda buf, offset, value: offset)
+    if issubclass(cls, Bool):
+        return _encoder_bool(cls)
+    return _encoder_primitive(cls) or _encoder_fallback(cls)
+
+
+def _compile_enc(type_string, spec=None):
+    return _cached(_encoders, _compile_encoder, type_string, spec)
+
+
+def compile_encoder(cls, spec=None):
+    """
+    Get the compiled encoder of `cls` (a class or a type name) for `spec` (default: current spec).
+
+    Returns a `(size, write)` pair, with `size(value) -> int` and
+    `write(buf, offset, value) -> next_offset`.
+    """
+    return _compile_enc(cls, spec)
+
+
+def _encoding_error(cls, error):
+    if isinstance(error, KeyError):
+        return ValueError(f"Element {error} of struct is missing in given value")
+    return ValueError(f"Encoding <{getattr(cls, '__name__', cls)}> - {error}")
+
+
+def encoded_size(cls, value, spec=None):
+    """Exact length of the encoding of `value` as `cls`."""
+    try:
+        return _compile_enc(cls, spec)[0](value)
+    except (KeyError, TypeError, struct.error) as error:
+        raise _encoding_error(cls, error) from None
+
+
+def encode_into(cls, value, buf, offset=0, spec=None):
+    """
+    Encode `value` as `cls` into the writable buffer `buf` starting at `offset`.
+
+    Returns the offset following the written data.
+    """
+    size, write = _compile_enc(cls, spec)
+    try:
+        end = offset + size(value)
+        if end > len(buf):
+            raise ValueError(f"Encoding <{getattr(cls, '__name__', cls)}> - buffer too small ({len(buf)} < {end})")
+        return write(buf, offset, value)
+    except (KeyError, TypeError, struct.error) as error:
+        raise _encoding_error(cls, error) from None
+
+
+def encode(cls, value, spec=None):
+    """Encode `value` as `cls` into a single preallocated bytearray."""
+    size, write = _compile_enc(cls, spec)
+    try:
+        buf = bytearray(size(value))
+        write(buf, 0, value)
+    except (KeyError, TypeError, struct.error) as error:
+        raise _encoding_error(cls, error) from None
+    return buf
+
+def _encode_all(cls, values, spec):
+    size, write = _compile_enc(cls, spec)
+    for value in values:
+        try:
+            buf = bytearray(size(value))
+            write(buf, 0, value)
+        except (KeyError, TypeError, struct.error) as error:
+            raise _encoding_error(cls, error) from None
+        yield buf
+
+
+def _encode_chunk(cls, spec, values):
+    return list(_encode_all(cls, values, spec))
+
+
+def encode_many(cls, values, spec=None, lazy=False, executor=None, chunk_size=256):
+    """
+    Encode each of `values` as `cls` (bytearrays), with the encoder looked up once.
+
+    Returns a list, or a generator if `lazy`. `executor` and `chunk_size` as for
+    `decode_many`.
+    """
+    spec = spec or _active_spec()
+    if executor is None:
+        blobs = _encode_all(cls, values, spec)
+        return blobs if lazy else list(blobs)
+    results = executor.map(partial(_encode_chunk, cls, spec), _chunks(values, chunk_size))
+    blobs = (blob for chunk in results for blob in chunk)
+    return blobs if lazy else list(blobs)
+
+#
+# Skippers
+#
+# A skipper is a `(fixed_size, skip)` pair: `skip(data, offset)` returns the offset
+# following the encoded value found at `offset` without building any object, using
+# only fixed sizes and length prefixes. `fixed_size` is the encoded length when it
+# doesn't depend on the value, None otherwise.
+#
+
+def compact_length(head):
+    """Length of a JAM compact integer encoding given its first octet."""
+    return _COMPACT_EXTRA[head] + 1
+
+
+def skip_compact(data, offset):
+    return offset + 1 + _COMPACT_EXTRA[data[offset]]
+
+
+def _fixed_skipper(size):
+    def skip_fixed(data, offset):
+        return offset + size
+    return size, skip_fixed
+
+
+def _skip_steps(skippers):
+    """Collapse consecutive fixed size skippers into single offset increments."""
+    steps = []
+    for fixed, skip in skippers:
+        if fixed is not None and steps and isinstance(steps[-1], int):
+            steps[-1] += fixed
+        else:
+            steps.append(fixed if fixed is not None else skip)
+    return tuple(steps)
+
+
+def _skipper_struct(cls):
+    skippers = [_compile_skip(type_string) for _, type_string in cls.type_mapping]
+    if all(fixed is not None for fixed, _ in skippers):
+        return _fixed_skipper(sum(fixed for fixed, _ in skippers))
+    steps = _skip_steps(skippers)
+
+    def skip_struct(data, offset):
+        for step in steps:
+            if step.__class__ is int:
+                offset += step
+            else:
+                offset = step(data, offset)
+        return offset
+
+    return None, skip_struct
+
+
+def _skipper_enum(cls):
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    variants = [None] * 256
+    for index, (_, type_string) in items:
+        variants[index] = _compile_skip(type_string)[1]
+
+    def skip_enum(data, offset):
+        index = data[offset]
+        skip = variants[index]
+        if skip is None:
+            raise ValueError(f"Index '{index}' not present in Enum type mapping")
+        return skip(data, offset + 1)
+
+    return None, skip_enum
+
+
+def _skipper_elements(element):
+    element_fixed, element_skip = element
+
+    def skip_elements(data, offset, count):
+        if element_fixed is not None:
+            return offset + count * element_fixed
+        for _ in range(count):
+            offset = element_skip(data, offset)
+        return offset
+
+    return skip_elements
+
+
+def _skipper_fixed_array(cls):
+    count = _element_count(cls)
+    if not count:
+        return _fixed_skipper(0)
+    if issubclass(cls, ByteArray) or _is_u8(cls.sub_type):
+        return _fixed_skipper(count)
+    element = _compile_skip(cls.sub_type)
+    if element[0] is not None:
+        return _fixed_skipper(count * element[0])
+    skip_elements = _skipper_elements(element)
+
+    def skip_array(data, offset):
+        return skip_elements(data, offset, count)
+
+    return None, skip_array
+
+
+def _skip_bytes(data, offset):
+    length, offset = decode_compact(data, offset)
+    return offset + length
+
+
+def _skipper_vec(cls):
+    if _is_u8(cls.sub_type):
+        return None, _skip_bytes
+    skip_elements = _skipper_elements(_compile_skip(cls.sub_type))
+
+    def skip_vec(data, offset):
+        count, offset = decode_compact(data, offset)
+        return skip_elements(data, offset, count)
+
+    return None, skip_vec
+
+
+def _skipper_option(cls):
+    if not cls.sub_type:
+        return _fixed_skipper(1)
+    skip_value = _compile_skip(cls.sub_type)[1]
+
+    def skip_option(data, offset):
+        if data[offset] == 0:
+            return offset + 1
+        return skip_value(data, offset + 1)
+
+    return None, skip_option
+
+
+def _skipper_fallback(cls):
+    decode_value = _compile(cls)
+
+    def skip_decoding(data, offset):
+        return decode_value(data, offset)[1]
+
+    return None, skip_decoding
+
+
+def _compile_skipper(cls):
+    if issubclass(cls, Struct):
+        return _skipper_struct(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _skipper_enum(cls)
+    if issubclass(cls, FixedLengthArray):
+        return _skipper_fixed_array(cls)
+    if issubclass(cls, Vec):
+        return _skipper_vec(cls)
+    if issubclass(cls, Option):
+        return _skipper_option(cls)
+    if issubclass(cls, Compact):
+        return None, skip_compact
+    if issubclass(cls, (HexBytes, Bytes)):
+        return None, _skip_bytes
+    if issubclass(cls, Null):
+        return _fixed_skipper(0)
+    if issubclass(cls, Bool):
+        return _fixed_skipper(1)
+    for base, _, size in _PRIMITIVES:
+        if issubclass(cls, base):
+            return _fixed_skipper(size)
+    return _skipper_fallback(cls)
+
+
+def _compile_skip(type_string, spec=None):
+    return _cached(_skippers, _compile_skipper, type_string, spec)
+
+
+def compile_skipper(cls, spec=None):
+    """
+    Get the compiled skipper of `cls` (a class or a type name) for `spec` (default: current spec).
+
+    The returned function has signature `skip(data, offset) -> next_offset`.
+    """
+    return _compile_skip(cls, spec)[1]
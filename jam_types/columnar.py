@@ -0,0 +1,426 @@
+"""
+Columnar decoding into NumPy arrays (optional, `pip install jam_types[numpy]`).
+
+Long homogeneous arrays (`ValidatorsStatistics`, `CoresStatistics`,
+`EpochMarkValidatorsKeys`, `TicketsBodies`, `AuthQueues`, ...) are decoded
+straight into NumPy arrays instead of lists of dicts:
+
+    stats = view(Statistics, blob)
+    columns = decode_columns(ValidatorsStatistics, stats._raw_field('vals_curr'))
+    columns['blocks'].sum()
+    cores = decode_array(CoresStatistics, stats._raw_field('cores'))   # structured array
+    cores['gas_used'].max()
+    encode_array(CoresStatistics, cores) == stats._raw_field('cores')
+
+Sequences (`FixedLengthArray`, `Vec`) are supported when their elements are:
+
+ * fixed width values (integers, bools, floats, octets, arrays and structs of
+   them): records are little endian packed structured dtypes (octets as `u1`
+   sub-arrays), and the whole sequence is read with a single `frombuffer`;
+ * structs of compact integers, fixed width values and structs of them
+   (e.g. `ServicesStatistics` entries): compacts are decoded as
+   `u8` with a vectorised varint decoder, which locates the records by pointer
+   doubling over the per-byte encoded lengths.
+
+Anything else (e.g. `Option` or variable length octets elements, as in
+`AvailabilityAssignments`) raises a ValueError.
+"""
+
+import itertools
+import operator
+
+from scalecodec import Bool, Compact, F32, F64, FixedLengthArray, Struct, U8, U16, U32, U64, Vec
+
+from .codec import _as_buffer, _cached, _element_count, _is_u8, _truncated, decode_compact, resolve_type, write_compact
+from .simple import ByteArray
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_PRIMITIVE_DTYPES = (
+    (Bool, '?'),
+    (U8, 'u1'),
+    (U16, '<u2'),
+    (U32, '<u4'),
+    (U64, '<u8'),
+    (F32, '<f4'),
+    (F64, '<f8'),
+)
+
+_plans = {}
+
+
+def _numpy():
+    if np is None:
+        raise ImportError("jam_types.columnar requires NumPy (pip install jam_types[numpy])")
+    return np
+
+
+def _fixed_dtype(cls):
+    """Packed dtype of the fixed width type `cls`, None if it has none."""
+    for base, dtype in _PRIMITIVE_DTYPES:
+        if issubclass(cls, base):
+            return np.dtype(dtype)
+    if issubclass(cls, FixedLengthArray):
+        count = _element_count(cls)
+        if not count:
+            return None
+        if issubclass(cls, ByteArray) or _is_u8(cls.sub_type):
+            return np.dtype(('u1', (count,)))
+        element = _fixed_dtype(resolve_type(cls.sub_type))
+        return None if element is None else np.dtype((element, (count,)))
+    if issubclass(cls, Struct) and cls.type_mapping:
+        fields = []
+        for name, type_string in cls.type_mapping:
+            dtype = _fixed_dtype(resolve_type(type_string))
+            if dtype is None:
+                return None
+            fields.append((name, dtype))
+        return np.dtype(fields)
+    return None
+
+
+def _has_bool(dtype):
+    if dtype.fields:
+        return any(_has_bool(field[0]) for field in dtype.fields.values())
+    if dtype.subdtype:
+        return _has_bool(dtype.subdtype[0])
+    return dtype.kind == 'b'
+
+
+def _check_bools(raw, dtype):
+    """Reject bool octets other than 0 and 1 in the `(count, itemsize)` records `raw`, as the codec does."""
+    bools = np.zeros(dtype.itemsize, dtype=bool)
+    _bool_mask(dtype, 0, bools)
+    if (raw[:, bools] > 1).any():
+        raise ValueError('Invalid value for datatype "bool"')
+
+
+def _bool_mask(dtype, offset, mask):
+    if dtype.fields:
+        for field_dtype, field_offset in (field[:2] for field in dtype.fields.values()):
+            _bool_mask(field_dtype, offset + field_offset, mask)
+    elif dtype.subdtype:
+        element, shape = dtype.subdtype
+        for i in range(int(np.prod(shape))):
+            _bool_mask(element, offset + i * element.itemsize, mask)
+    elif dtype.kind == 'b':
+        mask[offset] = True
+
+
+class _Plan:
+    """Columnar layout of a sequence type for a spec."""
+
+    def __init__(self, cls):
+        if not issubclass(cls, (FixedLengthArray, Vec)) or _is_u8(cls.sub_type) or issubclass(cls, ByteArray):
+            raise ValueError(f"<{cls.__name__}> is not a sequence")
+        self.name = cls.__name__
+        self.count = _element_count(cls) if issubclass(cls, FixedLengthArray) else None
+        element = resolve_type(cls.sub_type)
+        self.dtype = _fixed_dtype(element)
+        self.fields = None
+        self.has_bool = self.dtype is not None and _has_bool(self.dtype)
+        if self.dtype is not None:
+            return
+        # Struct of compacts and fixed width values
+        if not issubclass(element, Struct) or not element.type_mapping:
+            raise ValueError(f"<{cls.__name__}> elements have no columnar layout")
+        self.fields = []
+        self.dtype = self._record(element, ())
+        # Upper bound of an element encoded size
+        self.max_size = sum(9 if width is None else width for _, width, _ in self.fields)
+
+    def _record(self, cls, path):
+        """Dtype of the struct `cls` at `path`, adding its `(path, width, dtype)` leaves to `fields`."""
+        fields = []
+        for name, type_string in cls.type_mapping:
+            field_cls = resolve_type(type_string)
+            dtype = _fixed_dtype(field_cls)
+            if issubclass(field_cls, Compact):
+                dtype = np.dtype('<u8')
+                self.fields.append((path + (name,), None, dtype))
+            elif dtype is not None and not _has_bool(dtype):
+                self.fields.append((path + (name,), dtype.itemsize, dtype))
+            elif issubclass(field_cls, Struct) and field_cls.type_mapping:
+                dtype = self._record(field_cls, path + (name,))
+            else:
+                raise ValueError(f"<{self.name}> elements have no columnar layout ({'.'.join(path + (name,))})")
+            fields.append((name, dtype))
+        return np.dtype(fields)
+
+
+def _plan(cls, spec=None):
+    _numpy()
+    return _cached(_plans, _Plan, cls, spec)
+
+#
+# Compact integers
+#
+# The encoded length of a compact is given by its first byte, so the records
+# offsets follow from a per byte "next value offset" table. Record offsets are
+# found by pointer doubling (jumps of 1, 2, 4... records), then all the values
+# of a field are decoded at once gathering their bytes.
+#
+
+_COMPACT_EXTRA = None
+
+
+def _compact_extra():
+    """Number of bytes following each compact first byte (the count of its leading one bits)."""
+    global _COMPACT_EXTRA
+    if _COMPACT_EXTRA is None:
+        heads = np.arange(256)
+        extra = np.zeros(256, dtype=np.int32)
+        for bit in range(8):
+            extra += (heads >> (7 - bit)) & 1 & (extra == bit)
+        _COMPACT_EXTRA = extra
+    return _COMPACT_EXTRA
+
+
+def decode_compact_array(data, offset, count):
+    """
+    Decode `count` consecutive compacts of `data` (bytes-like) from `offset`,
+    returning `(values, next_offset)`, values as a `u8` array.
+    """
+    _numpy()
+    data = _as_buffer(data)
+    values, end = _decode_records(data, offset, count, [(('value',), None, np.dtype('<u8'))], 9, 'Compact')
+    return values[0], end
+
+
+def _decode_compact_values(padded, positions):
+    extra = _compact_extra()[padded[positions]]
+    raw = padded[positions[:, None] + np.arange(1, 9)]
+    raw[np.arange(8) >= extra[:, None]] = 0
+    low = raw.view('<u8').reshape(len(positions))
+    head = padded[positions].astype(np.uint64) & (np.uint64(0xff) >> (extra + 1).astype(np.uint64))
+    return low | (head << (8 * np.minimum(extra, 7)).astype(np.uint64))
+
+
+def _power(jump, times):
+    """`jump` composed `times` times with itself."""
+    result = None
+    while times:
+        if times & 1:
+            result = jump if result is None else jump[result]
+        times >>= 1
+        if times:
+            jump = jump[jump]
+    return result
+
+
+def _decode_records(data, offset, count, fields, max_size, name):
+    """
+    Column arrays of `count` records of `(path, width, dtype)` fields (width None
+    for compacts) and the next offset.
+    """
+    available = len(data) - offset
+    if available < 0:
+        _truncated(name)
+    if not count:
+        return [np.zeros(0, dtype) for _, _, dtype in fields], offset
+    length = min(available, count * max_size)
+    padded = np.zeros(length + 9 + max(width or 0 for _, width, _ in fields), dtype=np.uint8)
+    padded[:length] = np.frombuffer(data, np.uint8, length, offset)
+    # Next value offset for every byte offset, per field kind (int32 keeps the gathers cheap)
+    positions = np.arange(length + 1, dtype=np.int32)
+    steps = {}
+    extra = _compact_extra()
+    for _, width, _ in fields:
+        if width not in steps:
+            step = positions + (1 + extra[padded[:length + 1]] if width is None else width)
+            steps[width] = np.minimum(step, length)
+    jumps = [steps[width] for _, width, _ in fields]
+    # Offset of the next record, for any record start, composing the runs of
+    # fields of the same kind by squaring
+    record = None
+    for width, run in itertools.groupby(width for _, width, _ in fields):
+        jump = _power(steps[width], len(list(run)))
+        record = jump if record is None else jump[record]
+    starts = np.zeros(1, dtype=np.int32)
+    while len(starts) < count:
+        starts = np.concatenate((starts, record[starts]))
+        if len(starts) < count:
+            record = record[record]
+    starts = starts[:count]
+
+    columns = []
+    field_positions = starts
+    for (_, width, dtype), jump in zip(fields, jumps):
+        # Offsets only grow, and stop at `length` once past the data
+        if field_positions[-1] >= length:
+            _truncated(name)
+        if width is None:
+            columns.append(_decode_compact_values(padded, field_positions))
+            end = field_positions[-1] + 1 + extra[padded[field_positions[-1]]]
+        else:
+            raw = padded[field_positions[:, None] + np.arange(width)]
+            columns.append(raw.view(dtype).reshape(count))
+            end = field_positions[-1] + width
+        field_positions = jump[field_positions]
+    if end > length:
+        _truncated(name)
+    return columns, offset + int(end)
+
+
+def _compact_lengths(values):
+    lengths = np.ones(len(values), dtype=np.int64)
+    for extra in range(1, 9):
+        lengths += values >= np.uint64(1 << (7 * extra))
+    return lengths
+
+
+def _write_records(columns, fields, count):
+    """Encoding of `count` records with `(path, width, dtype)` fields out of their `columns`."""
+    lengths = np.empty((count, len(fields)), dtype=np.int64)
+    values = []
+    for i, ((path, width, dtype), column) in enumerate(zip(fields, columns)):
+        if width is None:
+            try:
+                if not isinstance(column, np.ndarray) or column.dtype.kind == 'O':
+                    # Python ints, which NumPy would turn into floats beyond the int64 range
+                    column = np.fromiter(map(operator.index, column), np.uint64, count)
+                elif column.dtype.kind not in 'ui' or (column.dtype.kind == 'i' and (column < 0).any()):
+                    raise ValueError
+            except (OverflowError, TypeError, ValueError):
+                raise ValueError(f"{'.'.join(path)}: compact values must be non negative integers") from None
+            column = column.astype(np.uint64)
+            lengths[:, i] = _compact_lengths(column)
+        else:
+            column = np.ascontiguousarray(column, dtype).view('u1').reshape(count, width)
+            lengths[:, i] = width
+        values.append(column)
+    ends = np.cumsum(lengths.reshape(-1)).reshape(count, len(fields))
+    starts = ends - lengths
+    out = np.zeros(int(ends[-1, -1]) if count else 0, dtype=np.uint8)
+    for i, ((_, width, _), column) in enumerate(zip(fields, values)):
+        field_starts = starts[:, i]
+        if width is not None:
+            out[field_starts[:, None] + np.arange(width)] = column
+            continue
+        extra = lengths[:, i] - 1
+        # First byte: `extra` leading one bits, then the value bits above the following bytes
+        prefix = (0xff00 >> extra) & 0xff
+        high = np.where(extra < 8, column >> (8 * np.minimum(extra, 7)).astype(np.uint64), 0)
+        out[field_starts] = prefix | (high & (np.uint64(0xff) >> (extra + 1).astype(np.uint64))).astype(np.int64)
+        for byte in range(8):
+            selected = extra > byte
+            out[field_starts[selected] + 1 + byte] = (column[selected] >> np.uint64(8 * byte)) & np.uint64(0xff)
+    return out
+
+
+def encode_compact_array(values):
+    """Encoding (bytes) of the compacts `values` (non negative integers array-like)."""
+    _numpy()
+    if isinstance(values, np.ndarray):
+        values = values.reshape(-1)
+    else:
+        values = list(values)
+    return _write_records([values], [(('value',), None, None)], len(values)).tobytes()
+
+#
+# Sequences
+#
+
+def _decode(plan, data, check_remaining, columns=False):
+    """Structured array (or `{field: array}` dict) of the sequence `plan` encoded in `data`."""
+    offset = 0
+    count = plan.count
+    if count is None:
+        try:
+            count, offset = decode_compact(data, 0)
+        except IndexError:
+            _truncated(plan.name)
+    if plan.fields is None:
+        end = offset + count * plan.dtype.itemsize
+        if end > len(data):
+            _truncated(plan.name)
+        if plan.has_bool:
+            _check_bools(np.frombuffer(data, np.uint8, end - offset, offset).reshape(count, -1), plan.dtype)
+        value = np.frombuffer(data, plan.dtype, count, offset).copy()
+        if columns:
+            if value.dtype.names is None:
+                raise ValueError(f"<{plan.name}> elements are not structs")
+            value = {name: np.ascontiguousarray(value[name]) for name in value.dtype.names}
+    else:
+        arrays, end = _decode_records(data, offset, count, plan.fields, plan.max_size, plan.name)
+        value = np.empty(count, plan.dtype)
+        for (path, _, _), array in zip(plan.fields, arrays):
+            _leaf(value, path)[...] = array
+        if columns:
+            value = {name: np.ascontiguousarray(value[name]) for name in value.dtype.names}
+    if check_remaining and end != len(data):
+        raise ValueError(f"Decoding <{plan.name}> - Current offset: {end} / length: {len(data)}")
+    return value
+
+
+def _leaf(array, path):
+    for name in path:
+        array = array[name]
+    return array
+
+
+def decode_array(cls, data, check_remaining=True, spec=None):
+    """
+    Decode the sequence `cls` encoded in `data` into a NumPy array: a structured
+    array for struct elements, with the element shape as extra dimensions else.
+    """
+    return _decode(_plan(cls, spec), _as_buffer(data), check_remaining)
+
+
+def decode_columns(cls, data, check_remaining=True, spec=None):
+    """Decode the sequence of structs `cls` encoded in `data` into a `{field: array}` dict."""
+    return _decode(_plan(cls, spec), _as_buffer(data), check_remaining, columns=True)
+
+
+def encode_array(cls, value, spec=None):
+    """
+    Encode the sequence `cls` out of an array (as returned by `decode_array`)
+    or a `{field: array}` dict of columns, into a bytearray.
+    """
+    plan = _plan(cls, spec)
+    if isinstance(value, dict):
+        names = plan.dtype.names
+        if names is None or set(value) != set(names):
+            raise ValueError(f"Encoding <{plan.name}> - columns should be {list(names or ())}")
+        lengths = {len(np.asarray(column)) for column in value.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"Encoding <{plan.name}> - columns have different lengths")
+        count = lengths.pop()
+        if plan.fields is not None:
+            columns = [_leaf(value[path[0]], path[1:]) for path, _, _ in plan.fields]
+    else:
+        value = np.asarray(value)
+        count = len(value)
+        if plan.fields is not None:
+            if value.dtype.names != plan.dtype.names:
+                raise ValueError(f"Encoding <{plan.name}> - expected {plan.dtype} elements, got {value.dtype}")
+            columns = [_leaf(value, path) for path, _, _ in plan.fields]
+    if plan.count is not None and count != plan.count:
+        raise ValueError(f"Encoding <{plan.name}> - expected {plan.count} elements, got {count}")
+    buf = bytearray()
+    if plan.count is None:
+        buf = bytearray(9)
+        buf = buf[:write_compact(buf, 0, count)]
+    if plan.fields is not None:
+        buf += _write_records(columns, plan.fields, count).tobytes()
+    elif isinstance(value, dict):
+        array = np.empty(count, plan.dtype)
+        for name in plan.dtype.names:
+            array[name] = value[name]
+        buf += array.tobytes()
+    else:
+        # Values are cast to the encoded dtype
+        # Nested sub-arrays dtypes expand into the array shape
+        expanded = np.empty(0, plan.dtype)
+        dtype = expanded.dtype
+        if value.shape[1:] != expanded.shape[1:] or (dtype.names and value.dtype.names != dtype.names):
+            raise ValueError(f"Encoding <{plan.name}> - expected {dtype} {expanded.shape[1:]} elements, "
+                             f"got {value.dtype} {value.shape[1:]}")
+        try:
+            buf += value.astype(dtype, casting='same_kind').tobytes()
+        except TypeError as error:
+            raise ValueError(f"Encoding <{plan.name}> - {error}") from None
+    return buf
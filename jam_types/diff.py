@@ -0,0 +1,207 @@
+"""
+Structural diff of two encoded values.
+
+Both encodings are walked together through lazy views: components whose encoded
+bytes are equal are skipped without being decoded, so only the differing
+subtrees are ever decoded. Differences are addressed by path (struct field
+names, sequence indices and enum variant names):
+
+    for d in diff(TraceStep, expected, actual):
+        print(format_path(d.path), d.exp, d.got)
+    # post_state.state_root 0x12.. 0x34..
+    # post_state.keyvals[3].value 0x.. 0x..
+
+Sequences are compared element by element, so elements past the shorter one are
+reported as 'removed' or 'added'.
+
+States (`RawState` or `KeyValues` encodings) are better compared by key:
+`state_diff` and `keyvals_diff` merge the two key sorted lists in linear time,
+comparing the values as raw byte slices, and return `StateDiff`/`KeyValueDiffs`
+values ready to be encoded.
+"""
+
+import json
+import struct
+from collections import namedtuple
+
+from .codec import _as_buffer, _compile_skip, _truncated
+from .keyvals import _scan_keyvals
+from .view import EnumView, SequenceView, StructView, view
+
+# `diff` itself is left out, so that `jam_types.diff` stays the module
+__all__ = [
+    'Difference',
+    'format_path',
+    'unified_diff',
+    'keyvals_diff',
+    'state_diff',
+]
+
+Difference = namedtuple('Difference', ('path', 'kind', 'exp', 'got'))
+Difference.__doc__ = """
+A difference at `path` (tuple of field names, indices and variant names).
+
+`kind` is 'changed', 'removed' (only in the expected value, `got` is None) or
+'added' (only in the actual value, `exp` is None). `exp` and `got` are decoded
+values, as returned by `codec.decode`.
+"""
+
+_VIEWS = (StructView, SequenceView, EnumView)
+
+
+def _value(node):
+    return node._decode() if isinstance(node, _VIEWS) else node
+
+
+def _walk(path, exp, got, out):
+    if isinstance(exp, StructView) and isinstance(got, StructView):
+        for name in exp._fields:
+            if exp._raw_field(name) != got._raw_field(name):
+                _walk(path + (name,), exp[name], got[name], out)
+    elif isinstance(exp, SequenceView) and isinstance(got, SequenceView):
+        common = min(len(exp), len(got))
+        for index in range(common):
+            if exp._raw_element(index) != got._raw_element(index):
+                _walk(path + (index,), exp[index], got[index], out)
+        for index in range(common, len(exp)):
+            out.append(Difference(path + (index,), 'removed', _value(exp[index]), None))
+        for index in range(common, len(got)):
+            out.append(Difference(path + (index,), 'added', None, _value(got[index])))
+    elif isinstance(exp, EnumView) and isinstance(got, EnumView) and exp._variant == got._variant:
+        _walk(path + (exp._variant,), exp._value, got._value, out)
+    else:
+        exp_value, got_value = _value(exp), _value(got)
+        if exp_value != got_value:
+            out.append(Difference(path, 'changed', exp_value, got_value))
+
+
+def _whole_view(cls, data, spec):
+    """View of `data`, checked to hold exactly one `cls` encoding (as `codec.decode` does)."""
+    data = _as_buffer(data)
+    name = getattr(cls, '__name__', cls)
+    try:
+        end = _compile_skip(cls, spec)[1](data, 0)
+    except (IndexError, struct.error):
+        _truncated(name)
+    if end > len(data):
+        _truncated(name)
+    if end != len(data):
+        raise ValueError(f"Decoding <{name}> - Current offset: {end} / length: {len(data)}")
+    return view(cls, data, spec=spec)
+
+
+def diff(cls, exp, got, spec=None):
+    """List of `Difference` between the values of type `cls` encoded in `exp` and `got`."""
+    out = []
+    exp_view = _whole_view(cls, exp, spec)
+    got_view = _whole_view(cls, got, spec)
+    if isinstance(exp_view, _VIEWS) and isinstance(got_view, _VIEWS) and exp_view._raw == got_view._raw:
+        return out
+    _walk((), exp_view, got_view, out)
+    return out
+
+
+def format_path(path):
+    """Render a difference path, e.g. `block.extrinsic.guarantees[0].slot`."""
+    text = ''.join(f"[{key}]" if isinstance(key, int) else f".{key}" for key in path)
+    return text.lstrip('.') or '.'
+
+
+def unified_diff(differences, fromfile='exp', tofile='got'):
+    """Render `differences` as unified diff like lines, one hunk per difference."""
+    if not differences:
+        return
+    yield f"--- {fromfile}"
+    yield f"+++ {tofile}"
+    for difference in differences:
+        yield f"@@ {format_path(difference.path)} @@"
+        if difference.kind != 'added':
+            for line in json.dumps(difference.exp, indent=2).splitlines():
+                yield f"-{line}"
+        if difference.kind != 'removed':
+            for line in json.dumps(difference.got, indent=2).splitlines():
+                yield f"+{line}"
+
+
+def _hex(value):
+    # A key missing on one side (None) has an empty value in a `StateDiff`
+    return '0x' if value is None else '0x' + value.hex()
+
+
+def _merge_keyvals(exp_data, exp_offset, got_data, got_offset):
+    """
+    Changes `(key, exp_value, got_value)` between the `KeyValues` encoded in
+    `exp_data` and `got_data`, and the end offsets of both encodings.
+
+    Values are memoryview slices of the inputs, None on the side a key is missing.
+    """
+    exp_entries, exp_end = _scan_keyvals(exp_data, exp_offset)
+    got_entries, got_end = _scan_keyvals(got_data, got_offset)
+    out = []
+    i = j = 0
+    while i < len(exp_entries) and j < len(got_entries):
+        exp_key, exp_start, exp_stop = exp_entries[i]
+        got_key, got_start, got_stop = got_entries[j]
+        if exp_key == got_key:
+            exp_value = exp_data[exp_start:exp_stop]
+            got_value = got_data[got_start:got_stop]
+            if exp_value != got_value:
+                out.append((exp_key, exp_value, got_value))
+            i += 1
+            j += 1
+        elif exp_key < got_key:
+            out.append((exp_key, exp_data[exp_start:exp_stop], None))
+            i += 1
+        else:
+            out.append((got_key, None, got_data[got_start:got_stop]))
+            j += 1
+    for exp_key, exp_start, exp_stop in exp_entries[i:]:
+        out.append((exp_key, exp_data[exp_start:exp_stop], None))
+    for got_key, got_start, got_stop in got_entries[j:]:
+        out.append((got_key, None, got_data[got_start:got_stop]))
+    return out, exp_end, got_end
+
+
+def _keyvals_changes(exp, got):
+    """Changes (see `_merge_keyvals`) between the `KeyValues` encoded in `exp` and `got`."""
+    exp, got = _as_buffer(exp), _as_buffer(got)
+    out, exp_end, got_end = _merge_keyvals(exp, 0, got, 0)
+    if exp_end != len(exp) or got_end != len(got):
+        raise ValueError("Decoding <KeyValues> - trailing bytes")
+    return out
+
+
+def _state_changes(exp, got):
+    """`(roots, changes)` between the `RawState` encoded in `exp` and `got`."""
+    exp, got = _as_buffer(exp), _as_buffer(got)
+    if len(exp) < 32 or len(got) < 32:
+        _truncated('RawState')
+    out, exp_end, got_end = _merge_keyvals(exp, 32, got, 32)
+    if exp_end != len(exp) or got_end != len(got):
+        raise ValueError("Decoding <RawState> - trailing bytes")
+    return (exp[:32], got[:32]), out
+
+
+def _keyvals_diff_value(changes):
+    return [{'key': '0x' + key.hex(), 'diff': {'exp': _hex(exp), 'got': _hex(got)}} for key, exp, got in changes]
+
+
+def _state_diff_value(roots, changes):
+    return {
+        'roots': {'exp': _hex(roots[0]), 'got': _hex(roots[1])},
+        'keyvals': _keyvals_diff_value(changes),
+    }
+
+
+def keyvals_diff(exp, got):
+    """
+    `KeyValueDiffs` value between the `KeyValues` encoded in `exp` and `got`.
+
+    Keys present on one side only are reported with an empty value on the other.
+    """
+    return _keyvals_diff_value(_keyvals_changes(exp, got))
+
+
+def state_diff(exp, got):
+    """`StateDiff` value between the `RawState` encoded in `exp` and `got`."""
+    return _state_diff_value(*_state_changes(exp, got))
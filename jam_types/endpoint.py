@@ -0,0 +1,277 @@
+"""
+asyncio fuzzer protocol endpoints.
+
+`MessageStream` frames `FuzzerMessage` values over an asyncio stream pair, with
+large payloads decoded in an executor to keep the event loop responsive.
+On top of it:
+
+ * `FuzzerClient` is the fuzzer side: handshake, initialization, pipelined
+   `import_block` requests and state retrieval.
+ * `serve_target` runs the target side, answering each request with a handler.
+ * `TraceTarget` is a stand-in target handler answering from recorded trace
+   steps, to exercise fuzzers and measure throughput without a real node.
+
+    client = await FuzzerClient.connect(path='/tmp/jam_target.sock')
+    target_info = await client.handshake(info)
+    root = await client.initialize(header, keyvals)
+    async for response in client.import_blocks(blocks):
+        ...
+"""
+
+import asyncio
+import inspect
+import os
+import re
+import struct
+from functools import partial
+
+from .codec import _truncated, decode, decode_file, encode_into, encoded_size
+from .framing import peek_message
+from .hashing import header_hash
+from .fuzzer import FEATURES_MASK, FuzzerMessage, Genesis, TraceStep
+from .spec import get_current_spec
+
+_LENGTH = struct.Struct('<I')
+
+
+def message_kind(message):
+    """Variant name of a decoded `FuzzerMessage` (e.g. 'import_block')."""
+    return message if isinstance(message, str) else next(iter(message))
+
+
+class MessageStream:
+    """
+    `FuzzerMessage` framing over an asyncio `(reader, writer)` stream pair.
+
+    Payloads of at least `offload_size` bytes are decoded in `executor` (the loop
+    default executor if None) instead of the event loop thread. The spec is fixed
+    at creation (the current one if not given), so process pool executors decode
+    with the same spec.
+    """
+
+    def __init__(self, reader, writer, spec=None, offload_size=1 << 16, executor=None, max_frame_size=None):
+        self.reader = reader
+        self.writer = writer
+        self.spec = spec or get_current_spec()
+        self.offload_size = offload_size
+        self.executor = executor
+        self.max_frame_size = max_frame_size
+
+    async def read_frame(self):
+        """Read the next encoded `FuzzerMessage`, None at end of stream."""
+        try:
+            header = await self.reader.readexactly(_LENGTH.size)
+        except asyncio.IncompleteReadError as error:
+            if not error.partial:
+                return None
+            _truncated('FuzzerWireMessage')
+        length = _LENGTH.unpack(header)[0]
+        if self.max_frame_size is not None and length > self.max_frame_size:
+            raise ValueError(f"Frame too large: {length} > {self.max_frame_size}")
+        try:
+            return await self.reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            _truncated('FuzzerWireMessage')
+
+    async def recv_kind(self):
+        """Read the next frame without decoding it, returning `(kind, payload)` or None at end of stream."""
+        payload = await self.read_frame()
+        return None if payload is None else peek_message(payload)
+
+    async def recv(self):
+        """Read and decode the next `FuzzerMessage`, None at end of stream."""
+        payload = await self.read_frame()
+        if payload is None:
+            return None
+        if len(payload) < self.offload_size:
+            return decode(FuzzerMessage, payload, spec=self.spec)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(decode, FuzzerMessage, payload, spec=self.spec))
+
+    def write(self, message):
+        """Encode and buffer `message`, without waiting for the transport to drain."""
+        length = encoded_size(FuzzerMessage, message, spec=self.spec)
+        frame = bytearray(_LENGTH.size + length)
+        _LENGTH.pack_into(frame, 0, length)
+        encode_into(FuzzerMessage, message, frame, _LENGTH.size, spec=self.spec)
+        self.writer.write(frame)
+
+    async def send(self, message):
+        """Write `message` and wait for the transport to drain."""
+        self.write(message)
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def open_stream(path=None, host=None, port=None, **kwargs):
+    """Connect to a Unix socket `path` or to `host:port` and return a `MessageStream`."""
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    return MessageStream(reader, writer, **kwargs)
+
+
+class FuzzerClient:
+    """
+    Fuzzer side of the protocol.
+
+    `import_blocks` keeps up to `window` `import_block` requests in flight, the
+    target answers them in order.
+    """
+
+    def __init__(self, stream, window=8):
+        self.stream = stream
+        self.window = window
+        self.target_info = None
+        self.features = 0
+
+    @classmethod
+    async def connect(cls, path=None, host=None, port=None, window=8, **kwargs):
+        return cls(await open_stream(path, host, port, **kwargs), window)
+
+    async def _response(self):
+        response = await self.stream.recv()
+        if response is None:
+            raise ValueError("Connection closed by target")
+        return response
+
+    async def _request(self, message, expected):
+        await self.stream.send(message)
+        response = await self._response()
+        kind = message_kind(response)
+        if kind != expected:
+            detail = f": {response['error']}" if kind == 'error' else ''
+            raise ValueError(f"Expected '{expected}' response, got '{kind}'{detail}")
+        return response[expected]
+
+    async def handshake(self, info):
+        """Exchange `PeerInfo` values, returning the target one."""
+        self.target_info = await self._request({'peer_info': info}, 'peer_info')
+        self.features = info['fuzz_features'] & self.target_info['fuzz_features'] & FEATURES_MASK
+        return self.target_info
+
+    async def initialize(self, header, keyvals, ancestry=()):
+        """Initialize the target state, returning its state root."""
+        message = {'initialize': {'header': header, 'state': keyvals, 'ancestry': list(ancestry)}}
+        return await self._request(message, 'state_root')
+
+    async def import_block(self, block):
+        """Import a single block, returning the target response (`state_root` or `error` message)."""
+        await self.stream.send({'import_block': block})
+        return await self._response()
+
+    async def import_blocks(self, blocks):
+        """Import `blocks` with pipelined requests, yielding the target responses in order."""
+        pending = 0
+        for block in blocks:
+            self.stream.write({'import_block': block})
+            pending += 1
+            if pending >= self.window:
+                await self.stream.writer.drain()
+                yield await self._response()
+                pending -= 1
+        await self.stream.writer.drain()
+        for _ in range(pending):
+            yield await self._response()
+
+    async def get_state(self, header_hash):
+        """Get the target state (key-values) after the block with `header_hash`."""
+        return await self._request({'get_state': header_hash}, 'state')
+
+    async def close(self):
+        await self.stream.close()
+
+
+async def run_target(stream, handler):
+    """
+    Serve requests on `stream` until end of stream.
+
+    `handler(message)` (a function or a coroutine function) returns the response
+    message, or None to not respond.
+    """
+    try:
+        while True:
+            message = await stream.recv()
+            if message is None:
+                break
+            response = handler(message)
+            if inspect.isawaitable(response):
+                response = await response
+            if response is not None:
+                await stream.send(response)
+    finally:
+        await stream.close()
+
+
+async def serve_target(handler, path=None, host=None, port=None, **kwargs):
+    """Start an asyncio server on a Unix socket `path` or on `host:port` running `handler`."""
+    async def connected(reader, writer):
+        await run_target(MessageStream(reader, writer, **kwargs), handler)
+
+    if path is not None:
+        return await asyncio.start_unix_server(connected, path)
+    return await asyncio.start_server(connected, host, port)
+
+
+class TraceTarget:
+    """
+    Stand-in target answering from recorded trace steps.
+
+    No state transition is run: an imported block is looked up among the trace
+    blocks (by header seal) and answered with the recorded post-state root, or
+    an error if unknown.
+    """
+
+    def __init__(self, steps, genesis=None, info=None, spec=None):
+        self.info = info or {
+            'fuzz_version': 1,
+            'fuzz_features': FEATURES_MASK,
+            'jam_version': {'major': 0, 'minor': 7, 'patch': 0},
+            'app_version': {'major': 0, 'minor': 0, 'patch': 0},
+            'app_name': 'jam-types-trace-target',
+        }
+        if genesis is not None:
+            self.initial_root = genesis['state']['state_root']
+        elif steps:
+            self.initial_root = steps[0]['pre_state']['state_root']
+        else:
+            raise ValueError("No trace steps nor genesis")
+        self.steps = steps
+        self.genesis = genesis
+        self._roots = {}
+        self._states = {}
+        for step in steps:
+            header = step['block']['header']
+            self._roots[header['seal']] = step['post_state']['state_root']
+            self._states[header_hash(header, spec)] = step['post_state']['keyvals']
+
+    @classmethod
+    def from_files(cls, filenames, spec=None, **kwargs):
+        """Load `genesis.bin` and `NNNNNNNN.bin` trace step files (in name order)."""
+        genesis = None
+        steps = []
+        for filename in sorted(filenames, key=os.path.basename):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            if name == 'genesis':
+                genesis = decode_file(Genesis, filename, spec=spec)
+            elif re.match(r'^\d{8}$', name):
+                steps.append(decode_file(TraceStep, filename, spec=spec))
+        return cls(steps, genesis, spec=spec, **kwargs)
+
+    def handle(self, message):
+        kind = message_kind(message)
+        if kind == 'peer_info':
+            return {'peer_info': self.info}
+        if kind == 'initialize':
+            return {'state_root': self.initial_root}
+        if kind == 'import_block':
+            root = self._roots.get(message[kind]['header']['seal'])
+            return {'error': 'Unknown block'} if root is None else {'state_root': root}
+        if kind == 'get_state':
+            keyvals = self._states.get(message[kind])
+            return {'error': 'Unknown header hash'} if keyvals is None else {'state': keyvals}
+        return {'error': f"Unexpected message '{kind}'"}
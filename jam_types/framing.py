@@ -0,0 +1,257 @@
+"""
+Streaming `FuzzerWireMessage` framing.
+
+On the wire each `FuzzerMessage` is prefixed by its encoded length as a little
+endian `U32`. `FrameReader` reads frames from a socket, pipe or binary file into
+a single reusable buffer (`recv_into`/`readinto`, partial frames are completed
+by the following reads) and decodes them with the compiled codec. `FrameWriter`
+encodes messages straight into an output buffer, so several messages can be
+batched in a single send:
+
+    reader = FrameReader(sock)
+    writer = FrameWriter(sock)
+    writer.send({'peer_info': info})
+    message = reader.read()
+
+    for block in blocks:
+        writer.write({'import_block': block})
+    writer.flush()
+
+Routing, logging or recording only needs the message kind, which is read out of
+the enum discriminant without decoding the payload:
+
+    kind, payload = reader.read_kind()
+    if kind == 'import_block':
+        block = decode_payload(kind, payload)
+"""
+
+import errno
+import struct
+
+from .codec import _as_buffer, _encoding_error, _truncated, compile_encoder, decode
+from .fuzzer import FuzzerMessage
+
+_LENGTH = struct.Struct('<I')
+
+# FuzzerMessage discriminant: (kind, payload type)
+_VARIANTS = [None] * 256
+for _index, _variant in FuzzerMessage.type_mapping.items():
+    _VARIANTS[_index] = _variant
+_PAYLOAD_TYPES = dict(variant for variant in _VARIANTS if variant is not None)
+
+
+def peek_message(data):
+    """
+    `(kind, payload)` of an encoded `FuzzerMessage`, without decoding the payload.
+
+    `kind` is the variant name (e.g. 'import_block') and `payload` a memoryview
+    of the encoded variant value.
+    """
+    data = _as_buffer(data)
+    if not data:
+        _truncated('FuzzerMessage')
+    variant = _VARIANTS[data[0]]
+    if variant is None:
+        raise ValueError(f"Index '{data[0]}' not present in Enum type mapping")
+    return variant[0], data[1:]
+
+
+def peek_wire_message(data):
+    """`(kind, payload)` of an encoded `FuzzerWireMessage` (length prefixed `FuzzerMessage`)."""
+    data = _as_buffer(data)
+    if len(data) < _LENGTH.size:
+        _truncated('FuzzerWireMessage')
+    end = _LENGTH.size + _LENGTH.unpack_from(data)[0]
+    if end > len(data):
+        _truncated('FuzzerWireMessage')
+    return peek_message(data[_LENGTH.size:end])
+
+
+def decode_payload(kind, payload, spec=None):
+    """Decode the `payload` of a `kind` message, as returned by `peek_message`."""
+    return decode(_PAYLOAD_TYPES[kind], payload, spec=spec)
+
+
+class FrameReader:
+    """
+    Read length prefixed `FuzzerMessage` frames from `stream`.
+
+    `stream` is anything with `recv_into` (sockets) or `readinto` (pipes, files,
+    `socket.makefile('rb')`). Frames larger than `max_frame_size` (if given) are
+    rejected before allocating them.
+    """
+
+    def __init__(self, stream, buffer_size=1 << 16, max_frame_size=None, spec=None):
+        self._recv_into = getattr(stream, 'recv_into', None) or stream.readinto
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.max_frame_size = max_frame_size
+        self.spec = spec
+
+    def _fill(self, needed, frame_start=False):
+        """
+        Make sure `needed` bytes are buffered from `_start`.
+
+        Returns False on end of stream at a `frame_start`, a partial frame is an error.
+        """
+        available = self._end - self._start
+        if available >= needed:
+            return True
+        if not available:
+            self._start = self._end = 0
+        if self._start + needed > len(self._buf):
+            if needed > len(self._buf):
+                # Grow into a new buffer, views returned by `read_frame` may still refer the old one
+                buf = bytearray(max(needed, 2 * len(self._buf)))
+                buf[:available] = self._view[self._start:self._end]
+                self._buf = buf
+                self._view = memoryview(buf)
+            else:
+                self._buf[:available] = self._buf[self._start:self._end]
+            self._start = 0
+            self._end = available
+        while self._end - self._start < needed:
+            received = self._recv_into(self._view[self._end:])
+            if received is None:
+                # Non-blocking stream with no data yet, the buffered bytes are kept
+                raise BlockingIOError(errno.EAGAIN, 'Stream not ready for reading')
+            if not received:
+                if frame_start and self._end == self._start:
+                    return False
+                _truncated('FuzzerWireMessage')
+            self._end += received
+        return True
+
+    def read_frame(self):
+        """
+        Read the next frame, returning the encoded `FuzzerMessage` as a memoryview.
+
+        The view refers the internal buffer and is only valid until the next read.
+        Returns None at end of stream.
+        """
+        if not self._fill(_LENGTH.size, frame_start=True):
+            return None
+        length = _LENGTH.unpack_from(self._buf, self._start)[0]
+        if self.max_frame_size is not None and length > self.max_frame_size:
+            raise ValueError(f"Frame too large: {length} > {self.max_frame_size}")
+        self._fill(_LENGTH.size + length)
+        start = self._start + _LENGTH.size
+        self._start = start + length
+        return self._view[start:self._start]
+
+    def read_kind(self):
+        """
+        Read the next frame without decoding it, returning `(kind, payload)` (see
+        `peek_message`) or None at end of stream.
+
+        As for `read_frame`, the payload is only valid until the next read.
+        """
+        frame = self.read_frame()
+        return None if frame is None else peek_message(frame)
+
+    def read(self):
+        """Read and decode the next `FuzzerMessage`, None at end of stream."""
+        payload = self.read_frame()
+        if payload is None:
+            return None
+        return decode(FuzzerMessage, payload, spec=self.spec)
+
+    def __iter__(self):
+        while True:
+            message = self.read()
+            if message is None:
+                return
+            yield message
+
+
+class FrameWriter:
+    """
+    Write length prefixed `FuzzerMessage` frames to `stream`.
+
+    Messages are encoded into an internal buffer, which is sent when it holds at
+    least `buffer_size` bytes or on `flush()`. `stream` is anything with
+    `send` (sockets) or `write` (pipes, files).
+    """
+
+    def __init__(self, stream, buffer_size=1 << 16, spec=None):
+        self._stream = stream
+        self._send = getattr(stream, 'send', None)
+        self._buf = bytearray(buffer_size)
+        self._len = 0
+        self.buffer_size = buffer_size
+        self.spec = spec
+
+    def _reserve(self, size):
+        end = self._len + size
+        if end > len(self._buf):
+            self._buf.extend(bytes(max(end, 2 * len(self._buf)) - len(self._buf)))
+        return end
+
+    def write(self, message):
+        """Encode `message` (a `FuzzerMessage` value) into the output buffer."""
+        size, write = compile_encoder(FuzzerMessage, self.spec)
+        offset = self._len
+        try:
+            length = size(message)
+            self._len = self._reserve(_LENGTH.size + length)
+            _LENGTH.pack_into(self._buf, offset, length)
+            write(self._buf, offset + _LENGTH.size, message)
+        except (KeyError, TypeError, struct.error) as error:
+            self._len = offset
+            raise _encoding_error(FuzzerMessage, error) from None
+        except ValueError:
+            self._len = offset
+            raise
+        if self._len >= self.buffer_size:
+            self.flush()
+
+    def write_frame(self, payload):
+        """Buffer an already encoded `FuzzerMessage`."""
+        offset = self._len
+        self._len = self._reserve(_LENGTH.size + len(payload))
+        _LENGTH.pack_into(self._buf, offset, len(payload))
+        self._buf[offset + _LENGTH.size:self._len] = payload
+        if self._len >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Send all the buffered frames. A non-blocking stream not ready for
+        writing raises `BlockingIOError`; the unsent bytes stay buffered for
+        the next `flush()`.
+        """
+        if not self._len:
+            return
+        sent = 0
+        with memoryview(self._buf) as view:
+            while sent < self._len:
+                # Sockets and raw (unbuffered) streams may send only part of the
+                # data, and nothing (BlockingIOError, None) when non-blocking and not ready
+                with view[sent:self._len] as data:
+                    try:
+                        written = self._send(data) if self._send is not None else self._stream.write(data)
+                    except BlockingIOError as error:
+                        written = getattr(error, 'characters_written', 0) or None
+                if written is None:
+                    break
+                sent += written
+        if sent < self._len:
+            self._buf[:self._len - sent] = self._buf[sent:self._len]
+            self._len -= sent
+            raise BlockingIOError(errno.EAGAIN, 'Stream not ready for writing', sent)
+        self._len = 0
+        if self._send is None:
+            getattr(self._stream, 'flush', lambda: None)()
+
+    def send(self, message):
+        """Write `message` and flush it (and any previously buffered one)."""
+        self.write(message)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -0,0 +1,142 @@
+"""
+Hashes of protocol values: blake2b-256 of their canonical encoding.
+
+    header_hash(header)                 # HeaderHash, '0x..'
+    work_report_hash(report)            # WorkReportHash
+    work_package_hash(package)          # WorkPackageHash
+    extrinsic_hash(block['extrinsic'])  # header extrinsic_hash
+
+Values can be given decoded, as views or encoded (bytes-like). Views and
+encodings are hashed as they are, decoded values have to be encoded first: their
+hashes are kept in a small identity-keyed cache, so hashing the same (unchanged)
+object again costs a dict lookup. `decode_hashable` decodes a value and caches
+the hashes of it and of its header/extrinsic right out of the source bytes, so
+freshly decoded values are never re-encoded:
+
+    block = decode_hashable(Block, blob)
+    header_hash(block['header'])        # no encoding
+"""
+
+import hashlib
+import threading
+
+from .block import Block, Extrinsics, Header
+from .codec import _as_buffer, compact_size, decode, encode, resolve_type, write_compact
+from .spec import get_current_spec
+from .view import StructView, view
+from .work import WorkPackage, WorkReport
+
+__all__ = [
+    'blake2b_256',
+    'clear_cache',
+    'header_hash',
+    'work_report_hash',
+    'work_package_hash',
+    'extrinsic_hash',
+    'decode_hashable',
+]
+
+_CACHE_SIZE = 4096
+
+# (id(value), type, spec) -> (value, digest). Values are referenced, so their
+# ids can't be reused while cached.
+_cache = {}
+_lock = threading.Lock()
+
+
+def blake2b_256(data):
+    """blake2b-256 digest (bytes) of `data`."""
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def _remember(cls, value, digest, spec):
+    with _lock:
+        if len(_cache) >= _CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+        _cache[(id(value), cls, spec)] = (value, digest)
+
+
+def clear_cache():
+    """Drop the cached hashes of decoded values (e.g. after modifying them)."""
+    with _lock:
+        _cache.clear()
+
+
+def _digest(cls, value, spec, compute=blake2b_256):
+    """`compute(encoding)` of `value` (decoded, view or bytes-like), cached for decoded values."""
+    if isinstance(value, StructView):
+        return compute(value._raw)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return compute(value)
+    spec = spec or get_current_spec()
+    entry = _cache.get((id(value), cls, spec))
+    if entry is not None and entry[0] is value:
+        return entry[1]
+    digest = compute(encode(cls, value, spec=spec))
+    _remember(cls, value, digest, spec)
+    return digest
+
+
+def header_hash(header, spec=None):
+    """`HeaderHash` ('0x..') of a `Header`."""
+    return '0x' + _digest(Header, header, spec).hex()
+
+
+def work_report_hash(report, spec=None):
+    """`WorkReportHash` ('0x..') of a `WorkReport`."""
+    return '0x' + _digest(WorkReport, report, spec).hex()
+
+
+def work_package_hash(package, spec=None):
+    """`WorkPackageHash` ('0x..') of a `WorkPackage`."""
+    return '0x' + _digest(WorkPackage, package, spec).hex()
+
+
+def _extrinsic_digest(data, spec):
+    xt = view(Extrinsics, data, spec=spec)
+    guarantees = xt.guarantees
+    # Guarantees are committed with the hash of their report in place of the report
+    count = len(guarantees)
+    parts = [bytearray(compact_size(count))]
+    write_compact(parts[0], 0, count)
+    for guarantee in guarantees:
+        raw = guarantee._raw
+        report = guarantee._raw_field('report')
+        parts.append(blake2b_256(report))
+        parts.append(raw[len(report):])
+    return blake2b_256(b''.join((
+        blake2b_256(xt._raw_field('tickets')),
+        blake2b_256(xt._raw_field('preimages')),
+        blake2b_256(b''.join(parts)),
+        blake2b_256(xt._raw_field('assurances')),
+        blake2b_256(xt._raw_field('disputes')),
+    )))
+
+
+def extrinsic_hash(extrinsic, spec=None):
+    """
+    Extrinsic hash ('0x..', the header `extrinsic_hash`) of an `Extrinsics`:
+    the hash of the hashes of its five components, the guarantees one with the
+    reports replaced by their hashes.
+    """
+    return '0x' + _digest(Extrinsics, extrinsic, spec, lambda data: _extrinsic_digest(data, spec)).hex()
+
+
+def decode_hashable(cls, data, spec=None):
+    """
+    Decode the value of type `cls` encoded in `data`, caching its hash (and for a
+    `Block` the hashes of its header and extrinsic) computed on the source bytes.
+    """
+    cls = resolve_type(cls)
+    data = _as_buffer(data)
+    spec = spec or get_current_spec()
+    value = decode(cls, data, spec=spec)
+    if cls is Block:
+        block = view(Block, data, spec=spec)
+        _remember(Header, value['header'], blake2b_256(block._raw_field('header')), spec)
+        _remember(Extrinsics, value['extrinsic'], _extrinsic_digest(block._raw_field('extrinsic'), spec), spec)
+    elif cls is Extrinsics:
+        _remember(cls, value, _extrinsic_digest(data, spec), spec)
+    elif isinstance(value, (dict, list)):
+        _remember(cls, value, blake2b_256(data), spec)
+    return value
@@ -0,0 +1,322 @@
+"""
+Skip-scan size index.
+
+`measure()` walks an encoding without building any value: fixed sizes are used
+for ByteArray/FixedLengthArray and fixed layout types, length prefixes for Vec and
+ByteSequence and the header octet for compact integers. The result is a tree of
+`SizeIndex` nodes holding the encoded span of each component, which can then be
+reused for random access, parallel splitting and partial decoding:
+
+    index = measure(TraceStep, blob)
+    guarantees = index['block']['extrinsic']['guarantees']
+    report = guarantees.decode_element(blob, 0)
+    chunks = index['pre_state']['keyvals'].split(4)
+"""
+
+import struct
+from array import array
+
+from scalecodec import Enum, FixedLengthArray, Null, Option, Struct, Vec
+
+from .codec import (
+    _as_buffer,
+    _cached,
+    _active_spec,
+    _compile_skip,
+    _element_count,
+    _is_u8,
+    _truncated,
+    compile_decoder,
+    decode_compact,
+    resolve_type,
+)
+from .simple import ByteArray
+
+__all__ = [
+    'SizeIndex',
+    'encoded_length',
+    'measure',
+]
+
+_measurers = {}
+
+
+class SizeIndex:
+    """
+    Encoded span of a value of type `type_name`, with the spans of its components.
+
+    `children` is a dict (struct fields, enum variant), a list (sequence elements
+    with a composite type), the inner node of a present Option or None. Sequences
+    also have `count` and either a constant `element_size` or the `offsets` array
+    of the elements start (followed by the sequence end). `spec` is the spec the
+    index was built for, used when decoding out of it.
+    """
+    __slots__ = ('type_name', 'start', 'end', 'children', 'count', 'element_size', 'offsets', 'spec')
+
+    def __init__(self, type_name, start, end, children=None, count=None, element_size=None, offsets=None,
+                 spec=None):
+        self.type_name = type_name
+        self.start = start
+        self.end = end
+        self.children = children
+        self.count = count
+        self.element_size = element_size
+        self.offsets = offsets
+        self.spec = spec
+
+    @property
+    def size(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        count = '' if self.count is None else f" len={self.count}"
+        return f"<SizeIndex {self.type_name} [{self.start}:{self.end}]{count}>"
+
+    def __len__(self):
+        if self.count is not None:
+            return self.count
+        return len(self.children) if isinstance(self.children, dict) else 0
+
+    def __getitem__(self, key):
+        children = self.children
+        if isinstance(children, SizeIndex):
+            return children[key]
+        if children is None:
+            raise KeyError(f"{self.type_name} has no indexed components")
+        if isinstance(children, list) and key < 0:
+            key += len(children)
+        return children[key]
+
+    def __iter__(self):
+        children = self.children
+        if isinstance(children, SizeIndex):
+            return iter(children)
+        return iter(children or ())
+
+    def element_span(self, index):
+        """`(start, end)` of the sequence element at `index`."""
+        if self.count is None:
+            raise TypeError(f"{self.type_name} is not a sequence")
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"{self.type_name} index out of range")
+        if self.element_size is not None:
+            first = self.end - self.count * self.element_size
+            start = first + index * self.element_size
+            return start, start + self.element_size
+        return self.offsets[index], self.offsets[index + 1]
+
+    def raw(self, data):
+        """Encoded bytes of this value within `data`."""
+        return _as_buffer(data)[self.start:self.end]
+
+    def decode(self, data):
+        """Decode only this value out of `data` (the buffer the index was built on)."""
+        return compile_decoder(self.type_name, self.spec)(_as_buffer(data), self.start)[0]
+
+    def view(self, data):
+        """Lazy view of this value out of `data`."""
+        from .view import view
+        return view(self.type_name, data, self.start, self.spec)
+
+    def decode_element(self, data, index):
+        """Decode only the sequence element at `index`."""
+        start, _ = self.element_span(index)
+        element_type = resolve_type(self.type_name).sub_type
+        return compile_decoder(element_type, self.spec)(_as_buffer(data), start)[0]
+
+    def split(self, parts):
+        """
+        Split a sequence in up to `parts` contiguous chunks of similar encoded size.
+
+        Returns a list of `(first, last, start, end)` tuples: elements `first..last`
+        (last excluded) are encoded in `data[start:end]`.
+        """
+        if self.count is None:
+            raise TypeError(f"{self.type_name} is not a sequence")
+        count = self.count
+        if not count:
+            return []
+        parts = max(1, min(parts, count))
+        first = self.element_span(0)[0]
+        target = (self.end - first) / parts
+        chunks = []
+        chunk_first = 0
+        for part in range(1, parts):
+            bound = first + part * target
+            last = chunk_first + 1
+            while last < count - (parts - part - 1) and self.element_span(last)[0] < bound:
+                last += 1
+            if last >= count:
+                break
+            chunks.append((chunk_first, last, self.element_span(chunk_first)[0], self.element_span(last)[0]))
+            chunk_first = last
+        chunks.append((chunk_first, count, self.element_span(chunk_first)[0], self.end))
+        return chunks
+
+
+def _leaf_measurer(cls):
+    name = cls.__name__
+    spec = _active_spec()
+    skip = _compile_skip(cls)[1]
+
+    def measure_leaf(data, offset, depth):
+        return SizeIndex(name, offset, skip(data, offset), spec=spec)
+
+    return measure_leaf
+
+
+def _struct_measurer(cls):
+    name = cls.__name__
+    spec = _active_spec()
+    skip = _compile_skip(cls)[1]
+    fields = tuple((field, _measurer(type_string)) for field, type_string in cls.type_mapping)
+
+    def measure_struct(data, offset, depth):
+        if depth == 0:
+            return SizeIndex(name, offset, skip(data, offset), spec=spec)
+        start = offset
+        children = {}
+        for field, measure_field in fields:
+            node = measure_field(data, offset, depth - 1)
+            children[field] = node
+            offset = node.end
+        return SizeIndex(name, start, offset, children, spec=spec)
+
+    return measure_struct
+
+
+def _enum_measurer(cls):
+    name = cls.__name__
+    spec = _active_spec()
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    variants = [None] * 256
+    for index, (variant, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            variants[index] = (variant, None)
+        else:
+            variants[index] = (variant, _measurer(type_string))
+    skip = _compile_skip(cls)[1]
+
+    def measure_enum(data, offset, depth):
+        if depth == 0:
+            return SizeIndex(name, offset, skip(data, offset), spec=spec)
+        index = data[offset]
+        if variants[index] is None:
+            raise ValueError(f"Index '{index}' not present in Enum type mapping")
+        variant, measure_value = variants[index]
+        if measure_value is None:
+            return SizeIndex(name, offset, offset + 1, {variant: None}, spec=spec)
+        node = measure_value(data, offset + 1, depth - 1)
+        return SizeIndex(name, offset, node.end, {variant: node}, spec=spec)
+
+    return measure_enum
+
+
+def _is_composite(cls):
+    if issubclass(cls, (Struct, Option)) or (issubclass(cls, Enum) and cls.type_mapping):
+        return True
+    if issubclass(cls, FixedLengthArray):
+        return bool(_element_count(cls)) and not (issubclass(cls, ByteArray) or _is_u8(cls.sub_type))
+    return issubclass(cls, Vec) and not _is_u8(cls.sub_type)
+
+
+def _sequence_measurer(cls, fixed_count):
+    name = cls.__name__
+    spec = _active_spec()
+    element_size, skip_element = _compile_skip(cls.sub_type)
+    measure_element = _measurer(cls.sub_type) if _is_composite(resolve_type(cls.sub_type)) else None
+
+    def measure_sequence(data, offset, depth):
+        start = offset
+        if fixed_count is None:
+            count, offset = decode_compact(data, offset)
+        else:
+            count = fixed_count
+        if element_size is not None and (measure_element is None or depth == 0):
+            return SizeIndex(name, start, offset + count * element_size, None, count, element_size, spec=spec)
+        if measure_element is not None and depth != 0:
+            children = []
+            for _ in range(count):
+                node = measure_element(data, offset, depth - 1)
+                children.append(node)
+                offset = node.end
+            if element_size is not None:
+                return SizeIndex(name, start, offset, children, count, element_size, spec=spec)
+            offsets = array('Q', (node.start for node in children))
+            offsets.append(offset)
+            return SizeIndex(name, start, offset, children, count, None, offsets, spec=spec)
+        offsets = array('Q')
+        for _ in range(count):
+            offsets.append(offset)
+            offset = skip_element(data, offset)
+        offsets.append(offset)
+        return SizeIndex(name, start, offset, None, count, None, offsets, spec=spec)
+
+    return measure_sequence
+
+
+def _option_measurer(cls):
+    name = cls.__name__
+    spec = _active_spec()
+    measure_value = _measurer(cls.sub_type)
+    skip = _compile_skip(cls)[1]
+
+    def measure_option(data, offset, depth):
+        if data[offset] == 0:
+            return SizeIndex(name, offset, offset + 1, spec=spec)
+        if depth == 0:
+            return SizeIndex(name, offset, skip(data, offset), spec=spec)
+        node = measure_value(data, offset + 1, depth - 1)
+        return SizeIndex(name, offset, node.end, node, spec=spec)
+
+    return measure_option
+
+
+def _compile_measurer(cls):
+    if issubclass(cls, Struct):
+        return _struct_measurer(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _enum_measurer(cls)
+    if issubclass(cls, FixedLengthArray) and _is_composite(cls):
+        return _sequence_measurer(cls, _element_count(cls))
+    if issubclass(cls, Vec) and _is_composite(cls):
+        return _sequence_measurer(cls, None)
+    if issubclass(cls, Option) and cls.sub_type:
+        return _option_measurer(cls)
+    return _leaf_measurer(cls)
+
+
+def _measurer(type_string, spec=None):
+    return _cached(_measurers, _compile_measurer, type_string, spec)
+
+
+def encoded_length(cls, data, offset=0, spec=None):
+    """Length of the value of type `cls` encoded in `data` at `offset`, without decoding it."""
+    data = _as_buffer(data)
+    try:
+        end = _compile_skip(cls, spec)[1](data, offset)
+    except (IndexError, struct.error):
+        _truncated(getattr(cls, '__name__', cls))
+    if end > len(data):
+        _truncated(getattr(cls, '__name__', cls))
+    return end - offset
+
+
+def measure(cls, data, offset=0, depth=None, spec=None):
+    """
+    Build the `SizeIndex` of the value of type `cls` encoded in `data` at `offset`.
+
+    `depth` limits how many levels of components are indexed (None for all of them).
+    Sequences always index their elements offsets.
+    """
+    data = _as_buffer(data)
+    try:
+        node = _measurer(cls, spec)(data, offset, -1 if depth is None else depth)
+    except (IndexError, struct.error):
+        _truncated(getattr(cls, '__name__', cls))
+    if node.end > len(data):
+        _truncated(getattr(cls, '__name__', cls))
+    return node
@@ -0,0 +1,190 @@
+"""
+Indexed state key-values.
+
+`KeyValuesMap` is a read-only mapping over an encoded `KeyValues` (or the
+key-values of an encoded `RawState`), built straight from the wire bytes: only
+the keys are copied (as 31 bytes `bytes`, sorted for binary search), values are
+slices of the encoding decoded on access.
+
+    state = KeyValuesMap.from_raw_state(blob)
+    state[key]                      # value memoryview, key as bytes or '0x..' string
+    key in state, state.get(key), len(state)
+    for key, value in state.prefix(b'\\xff'):
+        ...
+    state.encode() == original      # the encoding is kept as is
+"""
+
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from .codec import _as_buffer, _truncated, decode_compact
+
+__all__ = [
+    'KeyValuesMap',
+]
+
+# Encoded size of `fuzzer.TrieKey`
+_TRIE_KEY_SIZE = 31
+
+
+def _scan_keyvals(data, offset):
+    """
+    Entries `(key, value_start, value_end)` of the `KeyValues` encoded in `data` at
+    `offset`, sorted by key, and the end offset of the encoding.
+    """
+    key_size = _TRIE_KEY_SIZE
+    copy_keys = isinstance(data, memoryview)
+    entries = []
+    append = entries.append
+    try:
+        count, offset = decode_compact(data, offset)
+        for _ in range(count):
+            start = offset + key_size
+            length = data[start]
+            if length < 0x80:
+                start += 1
+            else:
+                length, start = decode_compact(data, start)
+            key = data[offset:offset + key_size]
+            append((key.tobytes() if copy_keys else key, start, start + length))
+            offset = start + length
+    except IndexError:
+        _truncated('KeyValues')
+    if offset > len(data):
+        _truncated('KeyValues')
+    # Keys are expected sorted (as in traces and fuzzer messages), sort them otherwise
+    for index in range(1, len(entries)):
+        if entries[index - 1][0] >= entries[index][0]:
+            entries.sort()
+            break
+    return entries, offset
+
+
+def _as_key(key):
+    if isinstance(key, str):
+        key = bytes.fromhex(key[2:] if key.startswith('0x') else key)
+    elif not isinstance(key, bytes):
+        key = bytes(key)
+    return key
+
+
+def _is_fixed_key(key, tail):
+    """
+    Whether `key` is a state component key (`i 0 0 ..`) or a service account key
+    (`255 n0 0 n1 0 n2 0 n3 0 ..`): these also match the interleaved layout of
+    some service ids (below 256, and 255 for every account key).
+    """
+    return key[8:] == tail and (key[1:8] == bytes(7) or (key[0] == 255 and key[2:8:2] == b'\0\0\0'))
+
+
+class KeyValuesMap(Mapping):
+    """
+    Read-only mapping of the state keys (31 bytes) to their values.
+
+    Keys can be given as bytes-like or hex strings, iteration yields `bytes` keys
+    in ascending order and values are memoryview slices of the encoding.
+    """
+
+    def __init__(self, data, offset=0):
+        data = _as_buffer(data)
+        entries, end = _scan_keyvals(data, offset)
+        self._data = data
+        self._span = (offset, end)
+        self._keys = [key for key, _, _ in entries]
+        self._values = [(start, stop) for _, start, stop in entries]
+        self.state_root = None
+
+    @classmethod
+    def from_raw_state(cls, data, offset=0):
+        """Map of the key-values of the `RawState` encoded in `data`, with its `state_root`."""
+        data = _as_buffer(data)
+        if len(data) < offset + 32:
+            _truncated('RawState')
+        keyvals = cls(data, offset + 32)
+        keyvals.state_root = '0x' + data[offset:offset + 32].hex()
+        return keyvals
+
+    def _index(self, key):
+        key = _as_key(key)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+        return None
+
+    def __getitem__(self, key):
+        try:
+            index = self._index(key)
+        except (ValueError, TypeError):
+            # Not a key (e.g. malformed hex), missing as far as `Mapping.get` is concerned
+            raise KeyError(key) from None
+        if index is None:
+            raise KeyError(key)
+        start, stop = self._values[index]
+        return self._data[start:stop]
+
+    def __contains__(self, key):
+        try:
+            return self._index(key) is not None
+        except (ValueError, TypeError):
+            # Not a key (e.g. malformed hex)
+            return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __repr__(self):
+        return f"<KeyValuesMap len={len(self._keys)}>"
+
+    def range(self, start=None, stop=None):
+        """`(key, value)` pairs with `start <= key < stop` (None for unbounded), in key order."""
+        first = 0 if start is None else bisect_left(self._keys, _as_key(start))
+        last = len(self._keys) if stop is None else bisect_left(self._keys, _as_key(stop))
+        data = self._data
+        for index in range(first, last):
+            value_start, value_stop = self._values[index]
+            yield self._keys[index], data[value_start:value_stop]
+
+    def prefix(self, prefix):
+        """`(key, value)` pairs of the keys starting with `prefix`, in key order."""
+        prefix = _as_key(prefix)
+        keys = self._keys
+        data = self._data
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            value_start, value_stop = self._values[index]
+            yield keys[index], data[value_start:value_stop]
+            index += 1
+
+    def service_items(self, service_id):
+        """
+        `(key, value)` pairs of the service `service_id`: the account key and the
+        storage, preimage and lookup keys.
+
+        Service keys interleave the service id octets with the hashed key
+        (`n0 a0 n1 a1 n2 a2 n3 a3 a4..`), so they don't share a prefix and all the
+        keys are checked.
+        """
+        octets = service_id.to_bytes(4, 'little')
+        tail = bytes(_TRIE_KEY_SIZE - 8)
+        account = bytes((255, octets[0], 0, octets[1], 0, octets[2], 0, octets[3])) + tail
+        data = self._data
+        for index, key in enumerate(self._keys):
+            if key == account or (key[0:8:2] == octets and not _is_fixed_key(key, tail)):
+                value_start, value_stop = self._values[index]
+                yield key, data[value_start:value_stop]
+
+    def encode(self):
+        """The `KeyValues` encoding, as received."""
+        start, end = self._span
+        return bytes(self._data[start:end])
+
+    def to_list(self):
+        """Decoded `KeyValues` value (`[{'key': '0x..', 'value': '0x..'}]`), in key order."""
+        data = self._data
+        return [
+            {'key': '0x' + key.hex(), 'value': '0x' + data[start:stop].hex()}
+            for key, (start, stop) in zip(self._keys, self._values)
+        ]
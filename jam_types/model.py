@@ -0,0 +1,441 @@
+"""
+Typed object model.
+
+`decode_model` decodes into instances of classes generated from the types
+`type_mapping` instead of dicts, with octets kept as raw `bytes`:
+
+    step = decode_model(TraceStep, blob)
+    step.block.header.slot              # int
+    step.block.header.parent            # bytes
+    step.post_state.keyvals[0].key      # bytes
+    step.to_json() == decode(TraceStep, blob)
+
+Generated classes (one per type, see `model_class`):
+
+ * Struct: `__slots__` class with the struct fields as attributes, in order
+   (`_fields`), built with positional arguments.
+ * Enum: `__slots__` class with the `variant` name and its `value` (None for
+   variants with no value).
+
+Their values are:
+
+ * octets (hashes and other `ByteArray`s, octet arrays, `ByteSequence`s) as
+   `bytes`, availability bitfields as `bitfield.Bitfield`;
+ * integers (`U8`..`U64`, compacts) as `int`, `Bool`/`F32`/`F64` as `bool`/`float`;
+ * sequences as lists, options as None or their value;
+ * anything else (e.g. `String`) as `codec.decode` returns it.
+
+`to_json()` returns the value `codec.decode` gives for the same encoding.
+"""
+
+import struct
+
+from scalecodec import Bool, Compact, Enum, FixedLengthArray, HexBytes, Null, Option, Struct, Vec
+
+from .codec import (
+    _LAYOUT_HELPERS,
+    _active_spec,
+    _as_buffer,
+    _cached,
+    _compile,
+    _element_count,
+    _fn_name,
+    _is_u8,
+    _layout,
+    _lock,
+    _truncated,
+    decode_compact,
+    resolve_type,
+)
+from .bitfield import Bitfield
+from .simple import ByteArray
+from .spec import spec_params
+from .types import AvailabilityBitfield
+
+_classes = {}
+_model_decoders = {}
+
+
+class StructModel:
+    """Base class of the generated Struct classes."""
+    __slots__ = ()
+    _fields = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self._values() == other._values()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class EnumModel:
+    """Base class of the generated Enum classes."""
+    __slots__ = ('variant', 'value')
+
+    def __init__(self, variant, value=None):
+        self.variant = variant
+        self.value = value
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.variant == other.variant and self.value == other.value
+
+    def __repr__(self):
+        if self.value is None:
+            return f"{type(self).__name__}({self.variant!r})"
+        return f"{type(self).__name__}({self.variant!r}, {self.value!r})"
+
+
+def _is_octets(cls):
+    return issubclass(cls, FixedLengthArray) and (issubclass(cls, ByteArray) or _is_u8(cls.sub_type))
+
+
+def _json_expr(cls, src, depth=0):
+    """Source converting the model value `src` of type `cls` to its decoded value, None if it's the same."""
+    if issubclass(cls, (Struct, AvailabilityBitfield)) or (issubclass(cls, Enum) and cls.type_mapping):
+        return f"{src}.to_json()"
+    if _is_octets(cls):
+        # Empty arrays decode as lists
+        return f"('0x' + {src}.hex() if {src} else [])"
+    if issubclass(cls, HexBytes):
+        return f"'0x' + {src}.hex()"
+    if issubclass(cls, Vec) and _is_u8(cls.sub_type):
+        # Decoded by the codec
+        return None
+    if issubclass(cls, (FixedLengthArray, Vec)):
+        var = f"x{depth}"
+        element = _json_expr(resolve_type(cls.sub_type), var, depth + 1)
+        return f"list({src})" if element is None else f"[{element} for {var} in {src}]"
+    if issubclass(cls, Option) and cls.sub_type:
+        value = _json_expr(resolve_type(cls.sub_type), src, depth)
+        return None if value is None else f"(None if {src} is None else {value})"
+    return None
+
+
+def _struct_class(cls):
+    names = tuple(name for name, _ in cls.type_mapping)
+    values = []
+    for name, type_string in cls.type_mapping:
+        expr = _json_expr(resolve_type(type_string), f"self.{name}")
+        values.append(f"{name!r}: {expr or f'self.{name}'}")
+    namespace = {}
+    exec(f"def __init__(self, {', '.join(names)}):\n" +
+         "".join(f"    self.{name} = {name}\n" for name in names) +
+         ("" if names else "    pass\n") +
+         f"def to_json(self):\n"
+         f"    return {{{', '.join(values)}}}\n",
+         namespace)
+    return type(cls.__name__, (StructModel,), {
+        '__slots__': names,
+        '__module__': __name__,
+        '__doc__': f"Typed `{cls.__name__}` value.",
+        '_fields': names,
+        '_type': cls,
+        '__init__': namespace['__init__'],
+        'to_json': namespace['to_json'],
+    })
+
+
+def _enum_class(cls):
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    converters = {}
+    for _, (name, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            converters[name] = None
+            continue
+        expr = _json_expr(resolve_type(type_string), 'value')
+        converters[name] = eval(f"lambda value: {expr or 'value'}")
+
+    def to_json(self):
+        convert = converters[self.variant]
+        if convert is None:
+            return self.variant
+        return {self.variant: convert(self.value)}
+
+    return type(cls.__name__, (EnumModel,), {
+        '__slots__': (),
+        '__module__': __name__,
+        '__doc__': f"Typed `{cls.__name__}` value.",
+        '_type': cls,
+        'to_json': to_json,
+    })
+
+
+def model_class(cls):
+    """Generated class of the Struct or Enum `cls` (a class or a type name)."""
+    cls = resolve_type(cls)
+    model = _classes.get(cls)
+    if model is None:
+        with _lock:
+            model = _classes.get(cls)
+            if model is None:
+                if issubclass(cls, Struct):
+                    model = _struct_class(cls)
+                elif issubclass(cls, Enum) and cls.type_mapping:
+                    model = _enum_class(cls)
+                else:
+                    raise ValueError(f"<{cls.__name__}> is neither a Struct nor an Enum")
+                _classes[cls] = model
+    return model
+
+#
+# Decoders
+#
+# Same structure as the `codec` decoders (and the same fixed layouts, with model
+# values built out of the unpacked tuples), returning `(value, next_offset)`.
+#
+
+def _layout_lines(cls, var, k, namespace, indent):
+    """
+    Source lines setting `var` to the model value of the fixed layout `cls` out
+    of the unpacked tuple `t`, from item `k`.
+    """
+    if issubclass(cls, Null):
+        return [f"{indent}{var} = None"]
+    if issubclass(cls, Bool):
+        return [f"{indent}{var} = check_bool(t[{k}])"]
+    if issubclass(cls, AvailabilityBitfield):
+        namespace['Bitfield'] = Bitfield
+        size = spec_params(_active_spec())['core_count']
+        return [f"{indent}{var} = Bitfield._from_octets(t[{k}], {size})"]
+    if _is_octets(cls):
+        return [f"{indent}{var} = t[{k}]"]
+    if issubclass(cls, FixedLengthArray):
+        return [f"{indent}{var} = list(t[{k}:{k + _element_count(cls)}])"]
+    if issubclass(cls, Struct):
+        lines = []
+        fields = []
+        for j, (name, type_string) in enumerate(cls.type_mapping):
+            field_var = f"{var}_{j}"
+            lines += _layout_lines(resolve_type(type_string), field_var, k, namespace, indent)
+            fields.append((name, field_var))
+            k += _layout(type_string)[1]
+        return lines + _new_lines(cls, var, fields, namespace, indent)
+    return [f"{indent}{var} = t[{k}]"]
+
+
+def _new_lines(cls, var, fields, namespace, indent):
+    """Source lines setting `var` to a new `cls` model instance with `(name, value_var)` fields."""
+    # Setting the slots directly is cheaper than calling `__init__`
+    model = f"M{len(namespace)}"
+    namespace[model] = model_class(cls)
+    namespace['new'] = object.__new__
+    return [f"{indent}{var} = new({model})"] + [f"{indent}{var}.{name} = {value}" for name, value in fields]
+
+
+def _model_struct(cls):
+    fn_name = _fn_name('model_', cls)
+    lines = [f"def {fn_name}(data, offset):"]
+    namespace = dict(_LAYOUT_HELPERS, decode_compact=decode_compact)
+    fields = []
+    run = []
+
+    def flush_run():
+        if not run:
+            return
+        unpacker = struct.Struct('<' + ''.join(layout[0] for _, _, layout in run))
+        namespace[f"s{len(lines)}"] = unpacker.unpack_from
+        lines.append(f"    t = s{len(lines)}(data, offset)")
+        k = 0
+        for var, field_cls, layout in run:
+            lines.extend(_layout_lines(field_cls, var, k, namespace, "    "))
+            k += layout[1]
+        lines.append(f"    offset += {unpacker.size}")
+        run.clear()
+
+    for i, (name, type_string) in enumerate(cls.type_mapping):
+        var = f"v{i}"
+        fields.append((name, var))
+        layout = _layout(type_string)
+        if layout is not None:
+            run.append((var, resolve_type(type_string), layout))
+            continue
+        flush_run()
+        field_cls = resolve_type(type_string)
+        if issubclass(field_cls, (Compact, HexBytes)):
+            # Inlined single byte compacts (e.g. short octet sequences lengths)
+            lines.append(f"    {var} = data[offset]")
+            lines.append(f"    if {var} < 0x80:")
+            lines.append("        offset += 1")
+            lines.append("    else:")
+            lines.append(f"        {var}, offset = decode_compact(data, offset)")
+            if issubclass(field_cls, HexBytes):
+                lines.append(f"    end = offset + {var}")
+                lines.append("    if end > len(data):")
+                lines.append(f"        truncated({field_cls.__name__!r})")
+                lines.append(f"    {var} = bytes(data[offset:end])")
+                lines.append("    offset = end")
+            continue
+        namespace[f"f{i}"] = _model(type_string)
+        lines.append(f"    {var}, offset = f{i}(data, offset)")
+    flush_run()
+    lines.extend(_new_lines(cls, "value", fields, namespace, "    "))
+    lines.append("    return value, offset")
+    exec("\n".join(lines), namespace)
+    return namespace[fn_name]
+
+
+def _model_enum(cls):
+    model = model_class(cls)
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    variants = [None] * 256
+    for index, (name, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            variants[index] = (name, None)
+        else:
+            variants[index] = (name, _model(type_string))
+
+    def decode_enum(data, offset):
+        index = data[offset]
+        variant = variants[index]
+        if variant is None:
+            raise ValueError(f"Index '{index}' not present in Enum type mapping")
+        name, decode_value = variant
+        if decode_value is None:
+            return model(name), offset + 1
+        value, offset = decode_value(data, offset + 1)
+        return model(name, value), offset
+
+    return decode_enum
+
+
+def _model_sequence(element_type):
+    """Decoder of `count` consecutive elements: `decode_elements(data, offset, count)`."""
+    layout = _layout(element_type)
+    if layout is not None and layout[0]:
+        unpacker = struct.Struct('<' + layout[0])
+        namespace = dict(_LAYOUT_HELPERS, iter_unpack=unpacker.iter_unpack)
+        element_cls = resolve_type(element_type)
+        lines = _layout_lines(element_cls, 'value', 0, namespace, "        ")
+        exec(f"def decode_elements(data, offset, count):\n"
+             f"    end = offset + count * {unpacker.size}\n"
+             f"    if end > len(data):\n"
+             f"        truncated({element_cls.__name__!r})\n"
+             f"    result = []\n"
+             f"    append = result.append\n"
+             f"    for t in iter_unpack(data[offset:end]):\n" +
+             "\n".join(lines) + "\n"
+             "        append(value)\n"
+             "    return result, end",
+             namespace)
+        return namespace['decode_elements']
+
+    decode_element = _model(element_type)
+
+    def decode_elements(data, offset, count):
+        result = []
+        append = result.append
+        for _ in range(count):
+            value, offset = decode_element(data, offset)
+            append(value)
+        return result, offset
+
+    return decode_elements
+
+
+def _model_octets(cls, count):
+    def decode_octets(data, offset):
+        end = offset + count
+        if end > len(data):
+            _truncated(cls.__name__)
+        return bytes(data[offset:end]), end
+
+    return decode_octets
+
+
+def _model_bitfield(cls, count):
+    size = spec_params(_active_spec())['core_count']
+
+    def decode_bitfield(data, offset):
+        end = offset + count
+        if end > len(data):
+            _truncated(cls.__name__)
+        return Bitfield._from_octets(data[offset:end], size), end
+
+    return decode_bitfield
+
+
+def _model_fixed_array(cls):
+    count = _element_count(cls)
+    if not count:
+        return lambda data, offset: ([], offset)
+    if issubclass(cls, AvailabilityBitfield):
+        return _model_bitfield(cls, count)
+    if _is_octets(cls):
+        return _model_octets(cls, count)
+    decode_elements = _model_sequence(cls.sub_type)
+
+    def decode_array(data, offset):
+        return decode_elements(data, offset, count)
+
+    return decode_array
+
+
+def _model_vec(cls):
+    decode_elements = _model_sequence(cls.sub_type)
+
+    def decode_vec(data, offset):
+        count, offset = decode_compact(data, offset)
+        return decode_elements(data, offset, count)
+
+    return decode_vec
+
+
+def _model_hex_bytes(cls):
+    def decode_bytes(data, offset):
+        length, offset = decode_compact(data, offset)
+        end = offset + length
+        if end > len(data):
+            _truncated(cls.__name__)
+        return bytes(data[offset:end]), end
+
+    return decode_bytes
+
+
+def _model_option(cls):
+    decode_value = _model(cls.sub_type)
+
+    def decode_option(data, offset):
+        if data[offset] == 0:
+            return None, offset + 1
+        return decode_value(data, offset + 1)
+
+    return decode_option
+
+
+def _compile_model(cls):
+    if issubclass(cls, Struct):
+        return _model_struct(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _model_enum(cls)
+    if issubclass(cls, FixedLengthArray):
+        return _model_fixed_array(cls)
+    if issubclass(cls, HexBytes):
+        return _model_hex_bytes(cls)
+    if issubclass(cls, Vec) and not _is_u8(cls.sub_type):
+        return _model_vec(cls)
+    if issubclass(cls, Option) and cls.sub_type:
+        return _model_option(cls)
+    # Integers, bools, floats, strings...: same values as the codec ones
+    return _compile(cls)
+
+
+def _model(type_string, spec=None):
+    return _cached(_model_decoders, _compile_model, type_string, spec)
+
+
+def decode_model(cls, data, check_remaining=True, spec=None):
+    """Decode `data` (bytes-like or ScaleBytes) as `cls` into model values."""
+    data = _as_buffer(data)
+    try:
+        value, offset = _model(cls, spec)(data, 0)
+    except (IndexError, struct.error):
+        _truncated(getattr(cls, '__name__', cls))
+    if check_remaining and offset != len(data):
+        raise ValueError(f"Decoding <{getattr(cls, '__name__', cls)}> - Current offset: {offset} / length: {len(data)}")
+    return value
@@ -0,0 +1,116 @@
+"""
+Per-spec type registries.
+
+`specs` maps each spec name to an immutable namespace of the jam_types (and fuzzer)
+types bound to that spec, so values of different specs can be handled side by
+side without switching the global spec with `set_spec()`:
+
+    specs['full'].Block.decode(blob)
+    specs['tiny'].TraceStep.view(blob).block.header.slot
+    specs['tiny'].params['core_count']
+
+Codecs are compiled on first use and cached per spec, bound types are safe to
+use concurrently from multiple threads.
+"""
+
+import importlib
+from types import MappingProxyType
+
+from .codec import decode, encode, encode_into, encoded_size, fixed_size, resolve_type
+from .index import encoded_length, measure
+from .view import view
+from .spec import SPECS, spec_attribute, spec_params
+
+__all__ = [
+    'SpecType',
+    'SpecNamespace',
+    'specs',
+]
+
+
+class SpecType:
+    """A jam_types class bound to a spec."""
+    __slots__ = ('cls', 'spec')
+
+    def __init__(self, cls, spec):
+        object.__setattr__(self, 'cls', cls)
+        object.__setattr__(self, 'spec', spec)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"<{self.cls.__name__} [{self.spec}]>"
+
+    def attribute(self, name):
+        """Value of the class attribute `name` (e.g. 'element_count') for this spec."""
+        return spec_attribute(self.cls, name, self.spec)
+
+    def decode(self, data, check_remaining=True):
+        return decode(self.cls, data, check_remaining, spec=self.spec)
+
+    def encode(self, value):
+        return encode(self.cls, value, spec=self.spec)
+
+    def encode_into(self, value, buf, offset=0):
+        return encode_into(self.cls, value, buf, offset, spec=self.spec)
+
+    def encoded_size(self, value):
+        return encoded_size(self.cls, value, spec=self.spec)
+
+    def fixed_size(self):
+        return fixed_size(self.cls, spec=self.spec)
+
+    def view(self, data, offset=0):
+        return view(self.cls, data, offset, spec=self.spec)
+
+    def measure(self, data, offset=0, depth=None):
+        return measure(self.cls, data, offset, depth, spec=self.spec)
+
+    def encoded_length(self, data, offset=0):
+        return encoded_length(self.cls, data, offset, spec=self.spec)
+
+
+class SpecNamespace:
+    """Immutable namespace of the types of a spec, with the spec parameters in `params`."""
+
+    def __init__(self, name):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'params', MappingProxyType(spec_params(name)))
+        object.__setattr__(self, '_types', {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"<SpecNamespace '{self.name}'>"
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except ValueError as error:
+            raise AttributeError(str(error)) from None
+
+    def __getitem__(self, type_string):
+        """Bound type of `type_string`, a class name or any type string (e.g. 'Vec<U32>')."""
+        bound = self._types.get(type_string)
+        if bound is None:
+            bound = SpecType(_lookup(type_string), self.name)
+            self._types[type_string] = bound
+        return bound
+
+
+def _lookup(type_string):
+    for module_name in ('jam_types', 'jam_types.fuzzer'):
+        cls = getattr(importlib.import_module(module_name), type_string, None)
+        if isinstance(cls, type) and cls.__name__ == type_string:
+            return cls
+    return resolve_type(type_string)
+
+
+specs = MappingProxyType({name: SpecNamespace(name) for name in SPECS})
@@ -0,0 +1,411 @@
+"""
+Incremental state replay.
+
+`StateReplay` keeps a trace state in memory, indexed by key, and moves it from
+step to step applying only the changed key-values:
+
+    replay = StateReplay.from_genesis(map_file('traces/genesis.bin'))
+    for filename in step_files:
+        changes = replay.apply_step(map_file(filename))
+        for key, old, new in changes:       # None for absent keys
+            ...
+    replay.state[key], replay.state_root
+
+Each change is checked against the replayed state (the recorded old value must
+be the replayed one) and a step pre-state must be the replayed state: when it
+has the same encoding as the previous step post-state the check is a single
+bytes comparison, otherwise the states are compared by key. State roots are
+taken from the trace, `check_root` (or `check_roots` when replaying files and
+archives) checks them against the Merkle root of the replayed state, kept in a
+`trie.StateTrie` so that each step only re-hashes the changed paths.
+
+The changes of an encoded `TraceStep` are found scanning its two key-value
+lists as raw bytes, nothing is decoded. Archived traces (`jam_types.archive`)
+don't even need that: their states are lists of content-addressed blob ids, so
+`replay_archive` finds the changes comparing id runs, in time proportional to
+the changes.
+"""
+
+import os
+from collections import namedtuple
+from hmac import compare_digest
+
+from .archive import _TRACE_STEP_NAME
+from .block import Block
+from .codec import _as_buffer, _truncated, decode_compact, map_file
+from .fuzzer import Genesis
+from .index import encoded_length, measure
+from .keyvals import _TRIE_KEY_SIZE, _scan_keyvals
+from .trie import StateTrie
+
+Change = namedtuple('Change', ('key', 'old', 'new'))
+Change.__doc__ = """
+Change of the value of `key` (31 bytes) from `old` to `new` (bytes, None for
+an absent key).
+"""
+
+ReplayStep = namedtuple('ReplayStep', ('name', 'changes', 'replay'))
+ReplayStep.__doc__ = """
+A replayed trace step: file name, list of `Change` and the `StateReplay`, at
+the step post-state until the next step is replayed.
+"""
+
+
+# Equality of two bytes-like objects, compared as bytes: memoryviews are
+# otherwise compared item by item, much slower than a copy
+_equal = compare_digest
+
+
+def _hex(data):
+    return '0x' + bytes(data).hex()
+
+
+def _scan(data):
+    entries, end = _scan_keyvals(data, 0)
+    if end != len(data):
+        raise ValueError("Decoding <KeyValues> - trailing bytes")
+    return entries
+
+
+def _keyvals_changes(old_data, old_entries, new_data, new_entries):
+    """`Change` list between two scanned `KeyValues` encodings, comparing values as raw bytes."""
+    changes = []
+    i = j = 0
+    while i < len(old_entries) and j < len(new_entries):
+        old_key, old_start, old_stop = old_entries[i]
+        new_key, new_start, new_stop = new_entries[j]
+        if old_key == new_key:
+            old_value = old_data[old_start:old_stop]
+            new_value = new_data[new_start:new_stop]
+            if not _equal(old_value, new_value):
+                changes.append(Change(bytes(old_key), bytes(old_value), bytes(new_value)))
+            i += 1
+            j += 1
+        elif old_key < new_key:
+            changes.append(Change(bytes(old_key), bytes(old_data[old_start:old_stop]), None))
+            i += 1
+        else:
+            changes.append(Change(bytes(new_key), None, bytes(new_data[new_start:new_stop])))
+            j += 1
+    for key, start, stop in old_entries[i:]:
+        changes.append(Change(bytes(key), bytes(old_data[start:stop]), None))
+    for key, start, stop in new_entries[j:]:
+        changes.append(Change(bytes(key), None, bytes(new_data[start:stop])))
+    return changes
+
+
+class StateReplay:
+    """
+    In-memory state (`state`, a dict of 31 bytes keys to bytes values) and its
+    `state_root` (bytes, None if unknown), moved forward by changes.
+    """
+
+    def __init__(self, state=None, state_root=None):
+        self.state = dict(state or {})
+        self.state_root = state_root
+        # Encoded (and scanned) key-values of the replayed state when known, for
+        # quick pre-state checks
+        self._keyvals = None
+        self._entries = None
+        # `StateTrie` of the state, built on the first root computation
+        self._trie = None
+
+    @classmethod
+    def from_raw_state(cls, data, offset=0):
+        """Replay starting from the `RawState` encoded in `data` at `offset`."""
+        data = _as_buffer(data)
+        if len(data) < offset + 32:
+            _truncated('RawState')
+        start = offset + 32
+        entries, end = _scan_keyvals(data, start)
+        replay = cls({key: bytes(data[value_start:value_stop]) for key, value_start, value_stop in entries},
+                     bytes(data[offset:start]))
+        replay._keyvals = data[start:end]
+        replay._entries = [(key, value_start - start, value_stop - start) for key, value_start, value_stop in entries]
+        return replay
+
+    @classmethod
+    def from_genesis(cls, data, spec=None):
+        """Replay starting from the state of the `Genesis` encoded in `data`."""
+        data = _as_buffer(data)
+        index = measure(Genesis, data, depth=1, spec=spec)
+        return cls.from_raw_state(data, index['state'].start)
+
+    def apply(self, changes, state_root=None, verify=True):
+        """
+        Apply `changes` (`Change` values or `(key, old, new)` tuples) and set the
+        new `state_root`. With `verify`, each `old` value must match the replayed one.
+        """
+        state = self.state
+        if verify:
+            for key, old, _ in changes:
+                if state.get(key) != (None if old is None else bytes(old)):
+                    raise ValueError(f"State mismatch at key {_hex(key)}")
+        for key, _, new in changes:
+            if new is None:
+                state.pop(key, None)
+            else:
+                state[key] = bytes(new)
+        if self._trie is not None:
+            self._trie.apply(changes)
+        self.state_root = state_root
+        self._keyvals = self._entries = None
+
+    def compute_root(self):
+        """
+        Merkle root (bytes) of the replayed state. The state trie is built on the
+        first call and then updated by each change, hashing the changed paths only.
+        """
+        if self._trie is None:
+            self._trie = StateTrie(self.state)
+        return self._trie.root()
+
+    def check_root(self):
+        """Raise ValueError unless the computed state root is the recorded `state_root`."""
+        root = self.compute_root()
+        if root != self.state_root:
+            raise ValueError(f"State root mismatch: computed {_hex(root)}, recorded {_hex(self.state_root)}")
+
+    def check_keyvals(self, data):
+        """Raise ValueError unless the `KeyValues` encoded in `data` are the replayed state."""
+        data = _as_buffer(data)
+        if self._keyvals is None or not _equal(self._keyvals, data):
+            self._check_entries(data, _scan(data))
+
+    def _check_entries(self, data, entries):
+        state = self.state
+        for key, start, stop in entries:
+            value = state.get(key)
+            if value is None or not _equal(value, data[start:stop]):
+                raise ValueError(f"State mismatch at key {_hex(key)}")
+        if len(entries) != len(state):
+            keys = {entry[0] for entry in entries}
+            missing = next(key for key in sorted(state) if key not in keys)
+            raise ValueError(f"State mismatch at key {_hex(missing)}")
+
+    def _entries_changes(self, data, entries):
+        """`Change` list from the replayed state to the key-values `entries` of `data`."""
+        state = self.state
+        changes = []
+        for key, start, stop in entries:
+            value = state.get(key)
+            if value is None or not _equal(value, data[start:stop]):
+                changes.append(Change(bytes(key), value, bytes(data[start:stop])))
+        if len(entries) - sum(change.old is None for change in changes) != len(state):
+            keys = {bytes(entry[0]) for entry in entries}
+            changes += [Change(key, value, None) for key, value in state.items() if key not in keys]
+            changes.sort()
+        return changes
+
+    def apply_step(self, data, spec=None, verify=True):
+        """
+        Move to the post-state of the `TraceStep` encoded in `data`, returning the
+        list of `Change`. With `verify`, the step pre-state must be the replayed state.
+
+        The post-state key-values are not copied: `data` is referred, and must not
+        be modified, until the next step.
+        """
+        data = _as_buffer(data)
+        if len(data) < 32:
+            _truncated('TraceStep')
+        pre_root = data[:32]
+        if verify and self.state_root is not None and self.state_root != pre_root:
+            raise ValueError(f"State root mismatch: {_hex(self.state_root)} != {_hex(pre_root)}")
+        known = self._keyvals
+        if known is not None and _equal(data[32:32 + len(known)], known):
+            # Same encoding as the replayed state (a `KeyValues` encoding can't be a prefix of another)
+            pre_data, pre_entries, pre_end = known, self._entries, 32 + len(known)
+        else:
+            pre_entries, pre_end = _scan_keyvals(data, 32)
+            pre_data = data
+            if verify:
+                self._check_entries(data, pre_entries)
+            else:
+                # Adopt the recorded pre-state, the step changes are relative to it
+                adopt = self._entries_changes(data, pre_entries)
+                if adopt:
+                    self.apply(adopt, bytes(pre_root), verify=False)
+        post_start = pre_end + encoded_length(Block, data, pre_end, spec)
+        if len(data) < post_start + 32:
+            _truncated('TraceStep')
+        # Kept as a slice of `data` (nothing copied) for the next step pre-state check
+        post_keyvals = data[post_start + 32:]
+        post_entries = _scan(post_keyvals)
+        changes = _keyvals_changes(pre_data, pre_entries, post_keyvals, post_entries)
+        # The changes come out of the checked pre-state itself
+        self.apply(changes, bytes(data[post_start:post_start + 32]), verify=False)
+        self._keyvals, self._entries = post_keyvals, post_entries
+        return changes
+
+    def keyvals(self):
+        """Replayed state as a `KeyValues` value, in key order."""
+        state = self.state
+        return [{'key': _hex(key), 'value': _hex(state[key])} for key in sorted(state)]
+
+
+def replay_files(filenames, spec=None, verify=True, check_roots=False):
+    """
+    Replay `genesis.bin` (if given) and the `NNNNNNNN.bin` trace steps among
+    `filenames`, in name order, yielding a `ReplayStep` per step. Without a
+    genesis the replay starts from the first step pre-state. With `check_roots`
+    the recorded state roots are checked against the computed ones.
+    """
+    replay = None
+    filenames = sorted(filenames, key=os.path.basename)
+    for filename in filenames:
+        if os.path.basename(filename) == 'genesis.bin':
+            data = map_file(filename)
+            try:
+                replay = StateReplay.from_genesis(data, spec)
+            finally:
+                data.release()
+            if check_roots:
+                replay.check_root()
+    for filename in filenames:
+        name = os.path.basename(filename)
+        if not _TRACE_STEP_NAME.match(name):
+            continue
+        data = map_file(filename)
+        try:
+            if replay is None:
+                replay = StateReplay.from_raw_state(data)
+                if check_roots:
+                    replay.check_root()
+            changes = replay.apply_step(data, spec, verify)
+        finally:
+            data.release()
+        if check_roots:
+            replay.check_root()
+        yield ReplayStep(name, changes, replay)
+
+
+def _entry(blob):
+    """Key and value of an encoded `KeyValue`."""
+    length, start = decode_compact(blob, _TRIE_KEY_SIZE)
+    return bytes(blob[:_TRIE_KEY_SIZE]), bytes(blob[start:start + length])
+
+
+def _common_prefix(a, i, b, j):
+    """Length of the common prefix of `a[i:]` and `b[j:]`, galloping with slice comparisons."""
+    limit = min(len(a) - i, len(b) - j)
+    length, step, grow = 0, 1, True
+    while step and length < limit:
+        size = min(step, limit - length)
+        if a[i + length:i + length + size] == b[j + length:j + length + size]:
+            length += size
+            if grow:
+                step *= 2
+        else:
+            grow = False
+            step //= 2
+    return length
+
+
+def _runs_changes(archive, old, new):
+    """
+    `Change` list between two archived states, given as `(firsts, counts)` blob
+    id runs. Equal ids are equal entries, so common runs are skipped at once.
+    """
+    old_firsts, old_counts = old
+    new_firsts, new_counts = new
+    blob = archive.blob
+    changes = []
+    r = s = 0
+    k = l = 0
+    while r < len(old_firsts) and s < len(new_firsts):
+        if k == 0 and l == 0 and old_firsts[r] == new_firsts[s] and old_counts[r] == new_counts[s]:
+            # Skip the whole stretch of equal runs
+            skip = min(_common_prefix(old_firsts, r, new_firsts, s), _common_prefix(old_counts, r, new_counts, s))
+            r += skip
+            s += skip
+            continue
+        old_id = old_firsts[r] + k
+        new_id = new_firsts[s] + l
+        if old_id == new_id:
+            skip = min(old_counts[r] - k, new_counts[s] - l)
+            k += skip
+            l += skip
+        else:
+            old_key, old_value = _entry(blob(old_id))
+            new_key, new_value = _entry(blob(new_id))
+            if old_key == new_key:
+                changes.append(Change(old_key, old_value, new_value))
+                k += 1
+                l += 1
+            elif old_key < new_key:
+                changes.append(Change(old_key, old_value, None))
+                k += 1
+            else:
+                changes.append(Change(new_key, None, new_value))
+                l += 1
+        if k == old_counts[r]:
+            r, k = r + 1, 0
+        if l == new_counts[s]:
+            s, l = s + 1, 0
+    for firsts, counts, run, offset, removed in ((old_firsts, old_counts, r, k, True),
+                                                 (new_firsts, new_counts, s, l, False)):
+        for index in range(run, len(firsts)):
+            for blob_id in range(firsts[index] + (offset if index == run else 0), firsts[index] + counts[index]):
+                key, value = _entry(blob(blob_id))
+                changes.append(Change(key, value, None) if removed else Change(key, None, value))
+    if len(changes) > 1 and any(changes[i - 1].key > changes[i].key for i in range(1, len(changes))):
+        changes.sort()
+    return changes
+
+
+def _archive_state(archive, blob_id):
+    root, firsts, counts = archive.state_runs(blob_id)
+    state = {}
+    for first, count in zip(firsts, counts):
+        for entry in range(first, first + count):
+            key, value = _entry(archive.blob(entry))
+            state[key] = value
+    return StateReplay(state, bytes(root)), (firsts, counts)
+
+
+def replay_archive(archive, verify=True, check_roots=False):
+    """
+    Replay the trace steps of a `TraceArchive` (from its genesis if any, from
+    the first step pre-state otherwise), yielding a `ReplayStep` per step.
+
+    States are compared by blob id: a step pre-state is the replayed state when
+    it is the same blob. Changes are found comparing runs of key-value ids, in
+    time proportional to the changes. With `check_roots` the recorded state
+    roots are checked against the computed ones.
+    """
+    files = [(file['name'],) + next(iter(file['content'].items())) for file in archive.files]
+    replay = current = runs = None
+    for _, kind, value in files:
+        if kind == 'genesis':
+            current = value['state']
+            replay, runs = _archive_state(archive, current)
+            if check_roots:
+                replay.check_root()
+    for name, kind, value in files:
+        if kind != 'trace_step':
+            continue
+        pre_state, post_state = value['pre_state'], value['post_state']
+        if replay is None:
+            current = pre_state
+            replay, runs = _archive_state(archive, current)
+            if check_roots:
+                replay.check_root()
+        elif pre_state != current:
+            pre_root, pre_firsts, pre_counts = archive.state_runs(pre_state)
+            pre_runs = (pre_firsts, pre_counts)
+            mismatch = _runs_changes(archive, runs, pre_runs)
+            if verify:
+                if mismatch:
+                    raise ValueError(f"State mismatch at key {_hex(mismatch[0].key)}")
+                raise ValueError(f"State root mismatch: {_hex(replay.state_root)} != {_hex(pre_root)}")
+            # Adopt the recorded pre-state, the step changes are relative to it
+            replay.apply(mismatch, bytes(pre_root), verify=False)
+            current, runs = pre_state, pre_runs
+        post_root, post_firsts, post_counts = archive.state_runs(post_state)
+        post_runs = (post_firsts, post_counts)
+        changes = _runs_changes(archive, runs, post_runs)
+        replay.apply(changes, bytes(post_root), verify=False)
+        current, runs = post_state, post_runs
+        if check_roots:
+            replay.check_root()
+        yield ReplayStep(name, changes, replay)
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 from jam_types.fuzzer import Genesis, TraceStep, FuzzerMessage, FuzzerWireMessage, FuzzerReport
-from jam_types import spec, ScaleBytes
+from jam_types import spec
+from jam_types.codec import decode, decode_file, map_file
+from jam_types.select import parse_path, select_paths
 import jam_types.simple
 import jam_types.crypto
 import jam_types.types
@@ -11,11 +13,25 @@ import jam_types.history
 import jam_types.fuzzer
 import json
 import argparse
+import glob
+import multiprocessing
 import os
 import re
+import struct
 import sys
 import inspect
 
+TYPE_MAPPING = {
+    'genesis': Genesis,
+    'trace_step': TraceStep,
+    'message': FuzzerMessage,
+    'wire_message': FuzzerWireMessage,
+    'report': FuzzerReport,
+}
+
+# File names decoded by the batch mode when walking a directory
+BATCH_FILE_PATTERN = re.compile(r'^(genesis|report|\d{8})\.bin$')
+
 def process_hex_string(hex_string):
     """Process hex string by removing whitespace and optional '0x' prefix"""
     hex_string = hex_string.strip()
@@ -26,21 +42,36 @@ def process_hex_string(hex_string):
     return bytes.fromhex(hex_string)
 
 
-def convert_to_json(filename, subsystem_type, is_hex=False, hex_data=None):
-    if hex_data:
-        # Process hex data directly
-        blob = process_hex_string(hex_data)
-    elif is_hex:
-        with open(filename, 'r') as file:
-            hex_string = file.read()
-            blob = process_hex_string(hex_string)
+def select_values(subsystem_type, data, paths):
+    """Values at `paths` in `data`: the value itself for a single path, else a `{path: value}` dict"""
+    values = select_paths(subsystem_type, data, paths)
+    return values[paths[0]] if len(paths) == 1 else values
+
+
+def select_file(subsystem_type, filename, paths):
+    """`select_values` on the memory mapped file"""
+    data = map_file(filename)
+    try:
+        return select_values(subsystem_type, data, paths)
+    finally:
+        data.release()
+
+
+def convert_to_json(filename, subsystem_type, is_hex=False, hex_data=None, paths=None):
+    if hex_data or is_hex:
+        if hex_data:
+            # Process hex data directly
+            data = process_hex_string(hex_data)
+        else:
+            with open(filename, 'r') as file:
+                data = process_hex_string(file.read())
+        decoded = select_values(subsystem_type, data, paths) if paths else decode(subsystem_type, data)
+    elif paths:
+        # Only decode the selected values, skipping everything else
+        decoded = select_file(subsystem_type, filename, paths)
     else:
-        with open(filename, 'rb') as file:
-            blob = file.read()
-    
-    scale_bytes = ScaleBytes(blob)
-    dump = subsystem_type(data=scale_bytes)
-    decoded = dump.decode()
+        # Decode straight from the memory mapped file
+        decoded = decode_file(subsystem_type, filename)
     print(json.dumps(decoded, indent=4))
 
 
@@ -80,15 +111,117 @@ def find_type_in_modules(type_name):
     return None
 
 
+def infer_type_name(filename):
+    """Infer the type name from the file name (`genesis`, `report` or `trace_step`), None if unknown"""
+    inferred_type = os.path.splitext(os.path.basename(filename))[0]
+    if re.match(r'^\d{8}$', inferred_type):
+        inferred_type = 'trace_step'
+    return inferred_type if inferred_type in TYPE_MAPPING else None
+
+
+def resolve_decode_type(type_name):
+    """Get the type to decode from a predefined name or a jam_types type name"""
+    if type_name in TYPE_MAPPING:
+        return TYPE_MAPPING[type_name]
+    return find_type_in_modules(type_name)
+
+
+def expand_batch_paths(paths):
+    """Expand directories and glob patterns into a sorted, de-duplicated list of files"""
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if BATCH_FILE_PATTERN.match(name))
+            matches = [os.path.join(path, name) for name in names]
+        elif glob.has_magic(path):
+            matches = sorted(match for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+        else:
+            matches = [path]
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                files.append(match)
+    return files
+
+
+def _init_batch_worker(spec_name):
+    spec.set_spec(spec_name)
+
+
+def _decode_batch_file(job):
+    """Decode one batch file (only the `paths` values if any), returning `(filename, type_name, value, error)`"""
+    filename, type_name, paths = job
+    try:
+        decode_type = resolve_decode_type(type_name)
+        value = select_file(decode_type, filename, paths) if paths else decode_file(decode_type, filename)
+        return filename, type_name, value, None
+    except (OSError, ValueError, IndexError, struct.error) as error:
+        # Reported per file, the batch goes on
+        return filename, type_name, None, str(error)
+
+
+def decode_batch(paths, type_name=None, spec_name='tiny', jobs=None, out_dir=None, output=None, select=None):
+    """
+    Decode all the files in `paths` (files, directories or glob patterns) in a process pool,
+    or only the values at the `select` paths in each of them.
+
+    Results are written in input order, either as NDJSON lines to `output` (default:
+    `sys.stdout`) or as one `<name>.json` file per input in `out_dir`. Returns the
+    number of failures.
+    """
+    if output is None:
+        output = sys.stdout
+    jobs_list = []
+    for filename in expand_batch_paths(paths):
+        file_type = type_name or infer_type_name(filename)
+        if file_type is None:
+            print(f"Error: Cannot infer type from filename '{filename}'. Please specify a type.", file=sys.stderr)
+            return 1
+        jobs_list.append((filename, file_type, select))
+
+    if out_dir is not None:
+        outputs = {}
+        for filename, _, _ in jobs_list:
+            out_name = os.path.join(out_dir, os.path.splitext(os.path.basename(filename))[0] + '.json')
+            if out_name in outputs:
+                print(f"Error: '{filename}' and '{outputs[out_name]}' both map to '{out_name}'", file=sys.stderr)
+                return 1
+            outputs[out_name] = filename
+        os.makedirs(out_dir, exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(jobs_list) <= 1:
+        spec.set_spec(spec_name)
+        results = map(_decode_batch_file, jobs_list)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs, _init_batch_worker, (spec_name,))
+        results = pool.imap(_decode_batch_file, jobs_list, chunksize=max(1, min(64, len(jobs_list) // (4 * jobs))))
+
+    failures = 0
+    try:
+        for filename, file_type, value, error in results:
+            if error is not None:
+                failures += 1
+                print(f"Error: Decoding '{filename}' as '{file_type}' failed: {error}", file=sys.stderr)
+            if out_dir is not None:
+                if error is None:
+                    out_name = os.path.join(out_dir, os.path.splitext(os.path.basename(filename))[0] + '.json')
+                    with open(out_name, 'w') as file:
+                        json.dump(value, file, indent=4)
+            elif error is None:
+                output.write(json.dumps({'file': filename, 'type': file_type, 'value': value}) + '\n')
+            else:
+                output.write(json.dumps({'file': filename, 'type': file_type, 'error': error}) + '\n')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failures
+
+
 def main():
-    type_mapping = {
-        'genesis': Genesis,
-        'trace_step': TraceStep,
-        'message': FuzzerMessage,
-        'wire_message': FuzzerWireMessage,
-        'report': FuzzerReport,
-    }
-    
     parser = argparse.ArgumentParser(description='Decode binary files to JSON', 
                                    formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument('-x', '--hex', action='store_true', 
@@ -99,6 +232,18 @@ def main():
                        help='Binary file to decode')
     parser.add_argument('--spec', type=str, default='tiny', choices=['tiny', 'full'],
                        help='Specification to use (default: tiny)')
+    parser.add_argument('-b', '--batch', nargs='+', metavar='PATH',
+                       help='Batch mode: decode all the files, directories (genesis.bin, report.bin\n'
+                            'and NNNNNNNN.bin files) and glob patterns given, as NDJSON lines')
+    parser.add_argument('-j', '--jobs', type=int,
+                       help='Batch mode: number of decoding processes (default: CPU count)')
+    parser.add_argument('-o', '--out-dir', type=str,
+                       help='Batch mode: write one <name>.json file per input in this directory\n'
+                            'instead of NDJSON to stdout')
+    parser.add_argument('--select', action='append', metavar='PATH',
+                       help='Only decode the value at PATH (e.g. block.header.slot,\n'
+                            'extrinsic.guarantees[*].report, post_state.keyvals[-1]).\n'
+                            'Repeat for several values, output as a {PATH: value} object')
 
     type_help = "Type to use for decoding:\n"
     type_help += " * Report: fuzzer report (generally `report.bin`)\n"
@@ -113,7 +258,25 @@ def main():
     args = parser.parse_args()
     
     spec.set_spec(args.spec)
-    
+
+    for path in args.select or ():
+        try:
+            parse_path(path)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.batch:
+        if args.data or args.filename or args.hex:
+            print("Error: --batch cannot be used with --file, --data or --hex options", file=sys.stderr)
+            sys.exit(1)
+        if args.type and resolve_decode_type(args.type) is None:
+            print(f"Error: Unknown type '{args.type}'. Please specify a valid type.", file=sys.stderr)
+            sys.exit(1)
+        failures = decode_batch(args.batch, args.type, args.spec, args.jobs, args.out_dir,
+                                select=args.select)
+        sys.exit(1 if failures else 0)
+
     # Validate input arguments
     if not args.data and not args.filename:
         print("Error: Must specify either --file or --data option", file=sys.stderr)
@@ -133,26 +296,26 @@ def main():
             sys.exit(1)
         
         filename = os.path.basename(args.filename)
-        inferred_type = os.path.splitext(filename)[0]
-        if re.match(r'^\d{8}$', inferred_type):
-            inferred_type = 'trace_step'
-        print(f"No type specified, attempting to decode as '{inferred_type}' based on filename", file=sys.stderr)
-        if inferred_type not in type_mapping:
+        inferred_type = infer_type_name(filename)
+        print(f"No type specified, attempting to decode as '{inferred_type or os.path.splitext(filename)[0]}' based on filename", file=sys.stderr)
+        if inferred_type is None:
             print(f"Error: Cannot infer type from filename '{filename}'. Please specify a type.", file=sys.stderr)
             sys.exit(1)
         args.type = inferred_type
 
-    # Try predefined types first
-    if args.type in type_mapping:
-        decode_type = type_mapping[args.type]
-    else:
-        # Try to find the type dynamically in jam_types modules
-        decode_type = find_type_in_modules(args.type)
-        if decode_type is None:
-            print(f"Error: Unknown type '{args.type}'. Please specify a valid type.", file=sys.stderr)
-            sys.exit(1)
+    # Try predefined types first, then jam_types modules
+    decode_type = resolve_decode_type(args.type)
+    if decode_type is None:
+        print(f"Error: Unknown type '{args.type}'. Please specify a valid type.", file=sys.stderr)
+        sys.exit(1)
    
-    convert_to_json(args.filename, decode_type, args.hex, args.data)
+    try:
+        convert_to_json(args.filename, decode_type, args.hex, args.data, args.select)
+    except ValueError as e:
+        if not args.select:
+            raise
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
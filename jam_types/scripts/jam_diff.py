@@ -2,39 +2,32 @@
 
 import argparse
 import json
-import subprocess
 import sys
 import difflib
 
-def run_jam_decode(input_type, input_value, type_arg, spec_name=None):
-    """Run jam_decode and return the JSON output."""
-    cmd = [sys.executable, "-m", "jam_types.scripts.jam_decode"]
-    
-    if input_type == "data":
-        cmd.extend(["-d", input_value])
-    elif input_type == "file":
-        cmd.extend(["-f", input_value])
-    
-    cmd.extend(["-t", type_arg])
-    
-    if spec_name:
-        cmd.extend(["-s", spec_name])
-    
+from jam_types import spec
+from jam_types.codec import decode, encode, map_file
+from jam_types.diff import (Difference, _keyvals_changes, _state_changes, _state_diff_value, _whole_view, diff,
+                            format_path, unified_diff)
+from jam_types.fuzzer import Genesis, KeyValues, RawState, StateDiff, TraceStep
+from jam_types.scripts.jam_decode import process_hex_string, resolve_decode_type
+
+def load_input(input_type, input_value):
+    """Get the encoded bytes of an input."""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running jam_decode: {e.stderr}", file=sys.stderr)
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON output: {e}", file=sys.stderr)
+        if input_type == "data":
+            return process_hex_string(input_value)
+        # Memory mapped: the structural diff only reads the differing parts
+        return map_file(input_value)
+    except (OSError, ValueError) as e:
+        print(f"Error reading input '{input_value}': {e}", file=sys.stderr)
         sys.exit(1)
 
 def colorize_diff_line(line):
     """Add color to diff lines."""
-    if line.startswith('+ '):
+    if line.startswith('+'):
         return f"\033[32m{line}\033[0m"  # Green for additions
-    elif line.startswith('- '):
+    elif line.startswith('-'):
         return f"\033[31m{line}\033[0m"  # Red for deletions
     elif line.startswith('? '):
         return f"\033[33m{line}\033[0m"  # Yellow for hints
@@ -43,90 +36,111 @@ def colorize_diff_line(line):
     else:
         return line
 
-def print_colored_diff(json1, json2, label1="Input 1", label2="Input 2", verbose=False):
-    """Print a colored diff of two JSON objects."""
-    # Pretty print JSON with consistent formatting
-    json1_str = json.dumps(json1, indent=2)
-    json2_str = json.dumps(json2, indent=2)
-    
-    if verbose:
-        # In verbose mode, show full content with inline diff markers
-        lines1 = json1_str.splitlines()
-        lines2 = json2_str.splitlines()
-        
-        # Use SequenceMatcher to find differences
-        matcher = difflib.SequenceMatcher(None, lines1, lines2)
-        
-        has_diff = False
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'equal':
-                # Lines are the same, print without markers
-                for line in lines1[i1:i2]:
-                    print(f"   {line}")
-            elif tag == 'delete':
-                # Lines only in first file
-                has_diff = True
-                for line in lines1[i1:i2]:
-                    print(colorize_diff_line(f"-  {line}"))
-            elif tag == 'insert':
-                # Lines only in second file
-                has_diff = True
-                for line in lines2[j1:j2]:
-                    print(colorize_diff_line(f"+  {line}"))
-            elif tag == 'replace':
-                # Lines differ between files
-                has_diff = True
-                for line in lines1[i1:i2]:
-                    print(colorize_diff_line(f"-  {line}"))
-                for line in lines2[j1:j2]:
-                    print(colorize_diff_line(f"+  {line}"))
-        
-        if not has_diff:
-            print("No differences found.")
-    else:
-        # Original behavior - show unified diff
-        lines1 = json1_str.splitlines(keepends=True)
-        lines2 = json2_str.splitlines(keepends=True)
-        
-        # Generate unified diff
-        diff = difflib.unified_diff(
-            lines1, lines2,
-            fromfile=label1,
-            tofile=label2,
-            lineterm=''
-        )
-        
-        # Print with colors
-        has_diff = False
-        for line in diff:
-            has_diff = True
-            print(colorize_diff_line(line), end='')
-        
-        if not has_diff:
-            print("No differences found.")
+def print_colored_diff(json1, json2):
+    """Print the full content of two JSON objects with inline diff markers."""
+    lines1 = json.dumps(json1, indent=2).splitlines()
+    lines2 = json.dumps(json2, indent=2).splitlines()
+
+    # Use SequenceMatcher to find differences
+    matcher = difflib.SequenceMatcher(None, lines1, lines2)
+
+    has_diff = False
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            # Lines are the same, print without markers
+            for line in lines1[i1:i2]:
+                print(f"   {line}")
+            continue
+        # Lines only in the first file, only in the second one, or replaced
+        has_diff = True
+        for line in lines1[i1:i2]:
+            print(colorize_diff_line(f"-  {line}"))
+        for line in lines2[j1:j2]:
+            print(colorize_diff_line(f"+  {line}"))
+
+    if not has_diff:
+        print("No differences found.")
+
+def print_differences(differences, output_format, label1="Input 1", label2="Input 2"):
+    """Print structural differences as unified diff hunks, path lines or JSON."""
+    if output_format == "json":
+        print(json.dumps([
+            {"path": format_path(d.path), "kind": d.kind, "exp": d.exp, "got": d.got}
+            for d in differences
+        ], indent=2))
+        return
+    if not differences:
+        print("No differences found.")
+        return
+    if output_format == "paths":
+        for d in differences:
+            exp = "-" if d.kind == "added" else json.dumps(d.exp)
+            got = "-" if d.kind == "removed" else json.dumps(d.got)
+            print(f"{format_path(d.path)}: {exp} -> {got}")
+        return
+    for line in unified_diff(differences, label1, label2):
+        print(colorize_diff_line(line))
+
+def compute_state_changes(decode_type, blobs):
+    """
+    `(roots, changes)` between the states in the two inputs (RawState, KeyValues,
+    TraceStep post-state or Genesis state), values None where a key is missing.
+    """
+    if decode_type is KeyValues:
+        return (bytes(32), bytes(32)), _keyvals_changes(*blobs)
+    if decode_type is TraceStep:
+        blobs = [_whole_view(TraceStep, blob, None).post_state._raw for blob in blobs]
+    elif decode_type is Genesis:
+        blobs = [_whole_view(Genesis, blob, None).state._raw for blob in blobs]
+    elif decode_type is not RawState:
+        print("Error: --state requires a RawState, KeyValues, TraceStep or Genesis type", file=sys.stderr)
+        sys.exit(1)
+    return _state_changes(*blobs)
+
+def state_differences(roots, changes):
+    """Differences between two states, addressed by state key."""
+    differences = []
+    if roots[0] != roots[1]:
+        differences.append(Difference(('state_root',), 'changed', '0x' + roots[0].hex(), '0x' + roots[1].hex()))
+    for key, exp, got in changes:
+        kind = 'added' if exp is None else 'removed' if got is None else 'changed'
+        differences.append(Difference(('0x' + key.hex(),), kind,
+                                      None if exp is None else '0x' + exp.hex(),
+                                      None if got is None else '0x' + got.hex()))
+    return differences
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Compare JAM type decodings using jam_decode",
+        description="Compare JAM type decodings",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   jam_diff -d "0x1234" -d "0x5678" -t Block
   jam_diff -f file1.bin -f file2.bin -t Header
   jam_diff -d "0x1234" -f data.bin -t WorkPackage -s tiny
+  jam_diff -f 00000001.bin -f 00000002.bin -t trace_step --format paths
+  jam_diff -f exp_state.bin -f got_state.bin -t RawState --state -o state_diff.bin
         """
     )
     
     parser.add_argument("-v", "--verbose", action="store_true",
                        help="Show full decoded content with inline diff markers")
+    parser.add_argument("--format", choices=["unified", "paths", "json"], default="unified",
+                       help="Output of the structural diff: unified diff hunks (default),\n"
+                            "one 'path: exp -> got' line per difference or a JSON list")
     parser.add_argument("-d", "--data", action="append", dest="data_inputs",
                        help="Hex data to decode (can be used up to 2 times)")
     parser.add_argument("-f", "--file", action="append", dest="file_inputs", 
                        help="File containing binary data to decode (can be used up to 2 times)")
+    parser.add_argument("--state", action="store_true",
+                       help="Compare states by key (RawState, KeyValues, TraceStep post-state or\n"
+                            "Genesis state), the JSON format prints the StateDiff value")
+    parser.add_argument("-o", "--output",
+                       help="With --state, also write the encoded StateDiff to this file")
     parser.add_argument("-t", "--type", required=True,
                        help="Type name to decode as")
-    parser.add_argument("-s", "--spec", 
-                       help="Specification name (e.g., 'full', 'tiny')")
+    parser.add_argument("-s", "--spec", default="tiny", choices=["tiny", "full"],
+                       help="Specification name (default: tiny)")
     
     args = parser.parse_args()
     
@@ -146,21 +160,47 @@ Examples:
         print("Error: Exactly 2 inputs required (combination of -d and -f)", file=sys.stderr)
         sys.exit(1)
     
-    # Decode both inputs
-    results = []
+    spec.set_spec(args.spec)
+    decode_type = resolve_decode_type(args.type)
+    if decode_type is None:
+        print(f"Error: Unknown type '{args.type}'. Please specify a valid type.", file=sys.stderr)
+        sys.exit(1)
+
+    # Load both inputs
+    blobs = []
     labels = []
     
-    for i, (input_type, input_value) in enumerate(inputs):
-        result = run_jam_decode(input_type, input_value, args.type, args.spec)
-        results.append(result)
+    for input_type, input_value in inputs:
+        blobs.append(load_input(input_type, input_value))
         
         if input_type == "data":
             labels.append(f"Data: {input_value}")
         else:
             labels.append(f"File: {input_value}")
     
-    # Print the diff
-    print_colored_diff(results[0], results[1], labels[0], labels[1], args.verbose)
+    try:
+        if args.state:
+            roots, changes = compute_state_changes(decode_type, blobs)
+            if args.output or args.format == "json":
+                value = _state_diff_value(roots, changes)
+            if args.output:
+                with open(args.output, 'wb') as file:
+                    file.write(encode(StateDiff, value))
+            if args.format == "json":
+                print(json.dumps(value, indent=2))
+            else:
+                print_differences(state_differences(roots, changes), args.format, labels[0], labels[1])
+        elif args.verbose:
+            # Full content, decoded in-process
+            results = [decode(decode_type, blob) for blob in blobs]
+            print_colored_diff(results[0], results[1])
+        else:
+            # Structural diff, equal subtrees are skipped without being decoded
+            differences = diff(decode_type, blobs[0], blobs[1])
+            print_differences(differences, args.format, labels[0], labels[1])
+    except ValueError as e:
+        print(f"Error decoding inputs: {e}", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+JAM trace archive tool: pack trace directories into a deduplicated archive and
+get the original files back.
+"""
+
+import argparse
+import sys
+
+from jam_types import spec
+from jam_types.archive import TraceArchive, create_archive
+from jam_types.scripts.jam_decode import expand_batch_paths
+
+
+def cmd_create(args):
+    filenames = expand_batch_paths(args.paths)
+    if not filenames:
+        print("Error: No input files", file=sys.stderr)
+        sys.exit(1)
+    writer = create_archive(args.archive, filenames, args.spec)
+    ratio = writer.size / writer.input_size if writer.input_size else 0
+    print(f"{len(filenames)} files, {writer.input_size} -> {writer.size} bytes ({ratio:.1%})")
+
+
+def cmd_list(args):
+    with TraceArchive(args.archive) as archive:
+        print(f"spec {archive.spec}, {len(archive)} files, {archive.blob_count} blobs")
+        for file in archive.files:
+            kind = next(iter(file['content']))
+            print(f"{file['name']:20} {kind:12} {file['size']:12}")
+
+
+def cmd_extract(args):
+    with TraceArchive(args.archive) as archive:
+        names = args.names or None
+        for name in names or ():
+            if name not in archive:
+                print(f"Error: '{name}' not in archive", file=sys.stderr)
+                sys.exit(1)
+        archive.extract(args.directory, names)
+
+
+def cmd_cat(args):
+    with TraceArchive(args.archive) as archive:
+        if args.name not in archive:
+            print(f"Error: '{args.name}' not in archive", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.buffer.write(archive.read(args.name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deduplicated trace archives')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help='Archive trace files')
+    create.add_argument('archive', help='Archive file to write')
+    create.add_argument('paths', nargs='+',
+                        help='Files, directories (genesis.bin, report.bin and NNNNNNNN.bin files) and glob patterns')
+    create.add_argument('--spec', type=str, default='tiny', choices=['tiny', 'full'],
+                        help='Specification of the trace files (default: tiny)')
+    create.set_defaults(run=cmd_create)
+
+    list_ = commands.add_parser('list', help='List the archived files')
+    list_.add_argument('archive')
+    list_.set_defaults(run=cmd_list)
+
+    extract = commands.add_parser('extract', help='Write the archived files into a directory')
+    extract.add_argument('archive')
+    extract.add_argument('directory')
+    extract.add_argument('names', nargs='*', help='Files to extract (default: all)')
+    extract.set_defaults(run=cmd_extract)
+
+    cat = commands.add_parser('cat', help='Write an archived file to stdout')
+    cat.add_argument('archive')
+    cat.add_argument('name')
+    cat.set_defaults(run=cmd_cat)
+
+    args = parser.parse_args()
+    if args.command == 'create':
+        spec.set_spec(args.spec)
+    try:
+        args.run(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
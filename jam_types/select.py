@@ -0,0 +1,113 @@
+"""
+Path-selective decoding.
+
+A path picks values out of an encoded value without decoding it whole: the
+selection walks a `view` of the encoding, so only the selected values are
+decoded, everything else is skipped by length.
+
+    select(TraceStep, blob, 'block.header.slot')                      # 42
+    select(Block, blob, 'extrinsic.guarantees[*].report.core_index')  # [0, 3]
+    select_paths(Block, blob, ['header.slot', 'header.author_index'])
+
+Paths are dot separated struct field names, with `[i]` to take an element of
+a sequence (negative from the end), `[i:j]` a slice of it and `[*]` all its
+elements. Slices and `[*]` give lists, the rest of the path is selected in
+each of their elements. Enum variants are selected by name, like fields: a
+value which is another variant, or an empty `Option`, selects None.
+"""
+
+import re
+
+from .view import EnumView, SequenceView, StructView, view
+
+# `select` itself is left out, so that `jam_types.select` stays the module
+__all__ = [
+    'parse_path',
+    'select_paths',
+]
+
+_STEP = re.compile(r'(\.?)([A-Za-z_]\w*)|\[\s*(?:(\*)|(-?\d+)|(-?\d*)\s*:\s*(-?\d*))\s*\]')
+
+_VIEWS = (StructView, SequenceView, EnumView)
+
+
+def _kind(node):
+    return f"<{node._layout.name}>" if isinstance(node, _VIEWS) else type(node).__name__
+
+
+def parse_path(path):
+    """
+    Steps of `path`: names (str), indices (int) and slices (`slice`, `[*]` being
+    `slice(None)`). An empty path (or '.') selects the whole value.
+    """
+    path = path.strip()
+    if path == '.':
+        return ()
+    steps = []
+    offset = 0
+    while offset < len(path):
+        match = _STEP.match(path, offset)
+        # Names are dot separated, the first one may have a leading dot
+        if match is None or (match.group(2) and offset and not match.group(1)):
+            raise ValueError(f"Invalid path '{path}' at offset {offset}")
+        name, star, index, start, stop = match.group(2, 3, 4, 5, 6)
+        if name:
+            steps.append(name)
+        elif star:
+            steps.append(slice(None))
+        elif index is not None:
+            steps.append(int(index))
+        else:
+            steps.append(slice(int(start) if start else None, int(stop) if stop else None))
+        offset = match.end()
+    return tuple(steps)
+
+
+def _walk(node, steps, at, path):
+    if at == len(steps):
+        return node._decode() if isinstance(node, _VIEWS) else node
+    if node is None:
+        return None
+    step = steps[at]
+    if isinstance(step, str):
+        if isinstance(node, StructView):
+            if step not in node:
+                raise ValueError(f"Path '{path}': <{node._layout.name}> has no field '{step}'")
+            return _walk(node[step], steps, at + 1, path)
+        if isinstance(node, EnumView):
+            if step != node._variant:
+                if all(variant is None or variant[0] != step for variant in node._layout.variants):
+                    raise ValueError(f"Path '{path}': <{node._layout.name}> has no variant '{step}'")
+                return None
+            return _walk(node._value, steps, at + 1, path)
+        if isinstance(node, dict):
+            if step not in node:
+                raise ValueError(f"Path '{path}': no field '{step}'")
+            return _walk(node[step], steps, at + 1, path)
+        raise ValueError(f"Path '{path}': can't select '{step}' in {_kind(node)}")
+    if not isinstance(node, (SequenceView, list)):
+        raise ValueError(f"Path '{path}': can't index {_kind(node)}")
+    if isinstance(step, slice):
+        return [_walk(node[i], steps, at + 1, path) for i in range(*step.indices(len(node)))]
+    index = step + len(node) if step < 0 else step
+    if not 0 <= index < len(node):
+        raise ValueError(f"Path '{path}': index {step} out of range (length {len(node)})")
+    return _walk(node[index], steps, at + 1, path)
+
+
+def _steps(path):
+    return parse_path(path) if isinstance(path, str) else tuple(path)
+
+
+def select(cls, data, path, spec=None):
+    """
+    Value at `path` (a string or `parse_path` steps) in the value of type `cls`
+    encoded in `data`, decoded like `codec.decode` would.
+    """
+    return _walk(view(cls, data, spec=spec), _steps(path), 0, path)
+
+
+def select_paths(cls, data, paths, spec=None):
+    """`{path: value}` of the values at `paths`, sharing a single view of `data`."""
+    node = view(cls, data, spec=spec)
+    return {path: _walk(node, _steps(path), 0, path) for path in paths}
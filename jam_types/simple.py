@@ -14,6 +14,7 @@ from scalecodec import (
     Struct,
     Vec,
     String,
+    ScaleBytes,
 )
 
 from .spec import hash_size 
@@ -28,8 +29,26 @@ class ByteSequence(HexBytes):
     pass
 
 class ByteArray(FixedLengthArray):
+    """Fixed length octets sequence, read and written as a single slice."""
     sub_type = n(U8)
-    
+
+    def process(self):
+        self.value_object = self.get_next_bytes(self.element_count)
+        if len(self.value_object) != self.element_count:
+            raise ValueError(f"{self.__class__.__name__}: expected {self.element_count} bytes, got {len(self.value_object)}")
+        return '0x{}'.format(self.value_object.hex())
+
+    def process_encode(self, value):
+        if type(value) is str and value[0:2] == '0x':
+            value = bytes.fromhex(value[2:])
+        elif type(value) in (bytearray, memoryview, list):
+            value = bytes(value)
+        if type(value) is not bytes:
+            raise ValueError(f"{self.__class__.__name__}: value should be a hex-string (0x..) or bytes")
+        if len(value) != self.element_count:
+            raise ValueError(f"{self.__class__.__name__}: value should be {self.element_count} bytes long")
+        return ScaleBytes(bytearray(value))
+
 # Basic types
 
 class EpochIndex(U32):
@@ -49,32 +49,51 @@ def get_current_spec():
     """Get the name of the current spec."""
     return _current_spec
 
-def _update_globals():
-    """Update all derived globals based on current spec."""
-    global validators_count, epoch_length, max_tickets_per_block
-    global validators_per_core, core_count, validators_super_majority, avail_bitfield_bytes
-    global auth_pool_max_size, auth_queue_size, hash_size
-    global recent_blocks_max_size
-    
-    logging.debug("Using JAM spec: %s", _current_spec)
-    spec = SPECS[_current_spec]
+def spec_params(spec_name):
+    """Get all the base and derived parameters of a spec."""
+    if spec_name not in SPECS:
+        raise ValueError(f"Unknown spec: {spec_name}. Available specs: {list(SPECS.keys())}")
+    spec = SPECS[spec_name]
     
-    # Base globals from spec
-    validators_count = spec['validators_count']
-    epoch_length = spec['epoch_length']
-    max_tickets_per_block = spec['max_tickets_per_block']
+    # Base values from spec
+    params = {
+        'validators_count': spec['validators_count'],
+        'epoch_length': spec['epoch_length'],
+        'max_tickets_per_block': spec['max_tickets_per_block'],
+    }
     
     # Derived values
-    validators_per_core = 3
-    core_count = validators_count // validators_per_core
-    validators_super_majority = validators_count // 3 * 2 + 1
-    avail_bitfield_bytes = (core_count + 7) // 8
+    params['validators_per_core'] = 3
+    params['core_count'] = params['validators_count'] // params['validators_per_core']
+    params['validators_super_majority'] = params['validators_count'] // 3 * 2 + 1
+    params['avail_bitfield_bytes'] = (params['core_count'] + 7) // 8
     
     # Fixed values
-    auth_pool_max_size = 8
-    auth_queue_size = 80
-    hash_size = 32
-    recent_blocks_max_size = 8
+    params['auth_pool_max_size'] = 8
+    params['auth_queue_size'] = 80
+    params['hash_size'] = 32
+    params['recent_blocks_max_size'] = 8
+    return params
+
+def spec_attribute(cls, attr_name, spec_name):
+    """Get the value of a class attribute for the given spec.
+
+    Attributes registered as spec-dependent (see `spec_metaclass`) are taken from
+    the spec parameters instead of the class, which only holds the value of the
+    current spec.
+    """
+    for klass in cls.__mro__:
+        if attr_name in vars(klass):
+            glob_name = vars(klass).get('_spec_attributes', {}).get(attr_name)
+            if glob_name is None:
+                break
+            return spec_params(spec_name)[glob_name]
+    return getattr(cls, attr_name)
+
+def _update_globals():
+    """Update all derived globals based on current spec."""
+    logging.debug("Using JAM spec: %s", _current_spec)
+    globals().update(spec_params(_current_spec))
 
 def _update_type_classes():
     """Update all registered spec-dependent classes."""
@@ -0,0 +1,237 @@
+"""
+State trie Merklization (Gray Paper, appendix D).
+
+The state root is the root hash of a binary Patricia Merkle trie over the 31
+bytes state keys (bits taken most significant first), with 64 bytes nodes
+hashed with blake2b-256:
+
+ * branch: `0` bit, left child hash without its first bit, right child hash;
+ * embedded leaf (values up to 32 bytes): `0b10` bits, 6 bits value length,
+   key, value zero padded to 32 bytes;
+ * regular leaf: `0b11000000`, key, value hash.
+
+A subtree holding a single key is its leaf, an empty subtree hashes to 32 zero
+bytes.
+
+`merkle_root` computes the root of a whole state. `StateTrie` keeps the trie
+nodes with their hashes, so that after changing a few keys only the nodes on
+their paths are hashed again:
+
+    trie = StateTrie(KeyValuesMap.from_raw_state(blob))
+    trie.root() == blob[:32]
+    trie[key] = value; del trie[other_key]
+    trie.root()                     # re-hashes the changed paths only
+"""
+
+from hashlib import blake2b
+from collections.abc import Mapping, MutableMapping
+
+from .keyvals import _TRIE_KEY_SIZE, _as_key
+
+ZERO_HASH = bytes(32)
+
+
+def _hash(data):
+    return blake2b(data, digest_size=32).digest()
+
+
+def _leaf_hash(key, value):
+    if len(value) <= 32:
+        return _hash(bytes((0x80 | len(value),)) + key + value + bytes(32 - len(value)))
+    return _hash(b'\xc0' + key + _hash(value))
+
+
+def _branch_hash(left, right):
+    return _hash(bytes((left[0] & 0x7f,)) + left[1:] + right)
+
+
+def _bit(key, depth):
+    return key[depth >> 3] & (0x80 >> (depth & 7))
+
+
+def _split(keys, lo, hi, depth):
+    """First index in `keys[lo:hi]` (sorted, sharing the first `depth` bits) with the bit `depth` set."""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _bit(keys[mid], depth):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _items(items):
+    """`(key, value)` bytes pairs of a mapping, `KeyValues` value or pairs iterable."""
+    if isinstance(items, Mapping):
+        items = items.items()
+    pairs = []
+    for item in items:
+        key, value = (item['key'], item['value']) if isinstance(item, dict) else item
+        if type(key) is not bytes:
+            key = _as_key(key)
+        if len(key) != _TRIE_KEY_SIZE:
+            raise ValueError(f"Invalid state key length {len(key)}")
+        pairs.append((key, value if type(value) is bytes else _as_key(value)))
+    return pairs
+
+
+def merkle_root(items):
+    """
+    State root (32 bytes) of `items`: a mapping (e.g. `KeyValuesMap`, dict), a
+    `KeyValues` value or `(key, value)` pairs, as bytes-like or hex strings.
+    """
+    pairs = sorted(_items(items))
+    keys = [key for key, _ in pairs]
+    values = [value for _, value in pairs]
+
+    def merkle(lo, hi, depth):
+        if hi - lo == 1:
+            return _leaf_hash(keys[lo], values[lo])
+        if lo == hi:
+            return ZERO_HASH
+        # Inlined `_split` and `_branch_hash`, called for every branch
+        index, mask = depth >> 3, 0x80 >> (depth & 7)
+        first, last = lo, hi
+        while first < last:
+            mid = (first + last) // 2
+            if keys[mid][index] & mask:
+                last = mid
+            else:
+                first = mid + 1
+        left = merkle(lo, first, depth + 1)
+        return blake2b(bytes((left[0] & 0x7f,)) + left[1:] + merkle(first, hi, depth + 1), digest_size=32).digest()
+
+    return merkle(0, len(keys), 0)
+
+
+class _Leaf:
+    __slots__ = ('key', 'value', 'hash')
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.hash = None
+
+
+class _Branch:
+    __slots__ = ('left', 'right', 'hash')
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.hash = None
+
+
+def _node_hash(node):
+    if node is None:
+        return ZERO_HASH
+    if node.hash is None:
+        if isinstance(node, _Leaf):
+            node.hash = _leaf_hash(node.key, node.value)
+        else:
+            node.hash = _branch_hash(_node_hash(node.left), _node_hash(node.right))
+    return node.hash
+
+
+def _build(keys, values, lo, hi, depth):
+    if hi - lo == 1:
+        return _Leaf(keys[lo], values[lo])
+    if lo == hi:
+        return None
+    split = _split(keys, lo, hi, depth)
+    return _Branch(_build(keys, values, lo, split, depth + 1), _build(keys, values, split, hi, depth + 1))
+
+
+def _join(leaf, other, depth):
+    """Subtree at `depth` holding two leaves with different keys."""
+    leaf_bit = _bit(leaf.key, depth)
+    if leaf_bit != _bit(other.key, depth):
+        return _Branch(other, leaf) if leaf_bit else _Branch(leaf, other)
+    child = _join(leaf, other, depth + 1)
+    return _Branch(None, child) if leaf_bit else _Branch(child, None)
+
+
+def _insert(node, leaf, depth):
+    if node is None:
+        return leaf
+    if isinstance(node, _Leaf):
+        return leaf if node.key == leaf.key else _join(leaf, node, depth)
+    node.hash = None
+    if _bit(leaf.key, depth):
+        node.right = _insert(node.right, leaf, depth + 1)
+    else:
+        node.left = _insert(node.left, leaf, depth + 1)
+    return node
+
+
+def _remove(node, key, depth):
+    if isinstance(node, _Leaf):
+        return None
+    node.hash = None
+    if _bit(key, depth):
+        node.right = _remove(node.right, key, depth + 1)
+    else:
+        node.left = _remove(node.left, key, depth + 1)
+    # A subtree left with a single key is its leaf
+    left, right = node.left, node.right
+    if left is None and (right is None or isinstance(right, _Leaf)):
+        return right
+    if right is None and isinstance(left, _Leaf):
+        return left
+    return node
+
+
+class StateTrie(MutableMapping):
+    """
+    State trie caching the node hashes, indexed by key (31 bytes, bytes-like or
+    hex string) like a dict of bytes values.
+
+    Setting or deleting a key only clears the hashes on its path, `root()`
+    hashes again just the cleared nodes.
+    """
+
+    def __init__(self, items=()):
+        pairs = sorted(_items(items))
+        keys = [key for key, _ in pairs]
+        values = [value for _, value in pairs]
+        self._values = dict(pairs)
+        self._root = _build(keys, values, 0, len(keys), 0)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return _as_key(key) in self._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, key):
+        return self._values[_as_key(key)]
+
+    def __setitem__(self, key, value):
+        key, value = _as_key(key), _as_key(value)
+        if len(key) != _TRIE_KEY_SIZE:
+            raise ValueError(f"Invalid state key length {len(key)}")
+        if self._values.get(key) == value:
+            return
+        self._values[key] = value
+        self._root = _insert(self._root, _Leaf(key, value), 0)
+
+    def __delitem__(self, key):
+        key = _as_key(key)
+        del self._values[key]
+        self._root = _remove(self._root, key, 0)
+
+    def apply(self, changes):
+        """Apply `(key, old, new)` changes (e.g. `replay.Change`), `new` None to remove the key."""
+        for key, _, new in changes:
+            if new is None:
+                if key in self:
+                    del self[key]
+            else:
+                self[key] = new
+
+    def root(self):
+        """State root (32 bytes)."""
+        return _node_hash(self._root)
@@ -0,0 +1,386 @@
+"""
+Lazy, zero-copy views over encoded values.
+
+A view wraps a memoryview of the encoded bytes and decodes only what is accessed.
+Fields are located by skipping the preceding ones, which only requires their
+encoded length. Nested structs, sequences and enums are returned as views
+themselves, any other value is decoded on access.
+
+View helpers are underscore prefixed (as in `namedtuple`) so they never clash
+with field names:
+
+    step = view(TraceStep, blob)
+    step.block.header.slot
+    step.post_state.state_root
+    step['block']['extrinsic']._raw
+"""
+
+import struct
+
+from scalecodec import Enum, FixedLengthArray, Null, Option, Struct, Vec
+
+from .codec import (
+    _as_buffer,
+    _cached,
+    _compile,
+    _compile_skip,
+    _element_count,
+    _is_u8,
+    _truncated,
+    decode_compact,
+    resolve_type,
+)
+from .simple import ByteArray
+
+# `view` itself is left out, so that `jam_types.view` stays the module
+__all__ = [
+    'StructView',
+    'SequenceView',
+    'EnumView',
+]
+
+_viewers = {}
+
+
+def _end_within(view, end):
+    """`end`, checked to be within the data of `view`."""
+    if end > len(view._data):
+        _truncated(view._layout.name)
+    return end
+
+
+class StructView:
+    """Lazy view of an encoded Struct."""
+    __slots__ = ('_layout', '_data', '_offsets', '_cache')
+
+    def __init__(self, layout, data, offset):
+        self._layout = layout
+        self._data = data
+        self._offsets = [offset]
+        self._cache = {}
+
+    def _offset(self, index):
+        """Start offset of the field at `index` (end of the struct for `index == len`)."""
+        static = self._layout.static[index]
+        if static is not None:
+            return self._offsets[0] + static
+        offsets = self._offsets
+        skips = self._layout.skips
+        while len(offsets) <= index:
+            i = len(offsets) - 1
+            offsets.append(skips[i](self._data, offsets[i]))
+        return offsets[index]
+
+    def __getitem__(self, name):
+        value = self._cache.get(name)
+        if value is None and name not in self._cache:
+            index = self._layout.index[name]
+            try:
+                value = self._layout.viewers[index](self._data, self._offset(index))
+            except (IndexError, struct.error):
+                _truncated(self._layout.name)
+            self._cache[name] = value
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(f"'{self._layout.name}' has no field '{name}'") from None
+
+    def __iter__(self):
+        return iter(self._layout.names)
+
+    def __len__(self):
+        return len(self._layout.names)
+
+    def __contains__(self, name):
+        return name in self._layout.index
+
+    def __repr__(self):
+        return f"<{self._layout.name} view @{self._start}>"
+
+    @property
+    def _fields(self):
+        return self._layout.names
+
+    @property
+    def _start(self):
+        return self._offsets[0]
+
+    @property
+    def _end(self):
+        try:
+            end = self._offset(len(self._layout.names))
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+        return _end_within(self, end)
+
+    @property
+    def _raw(self):
+        """Encoded bytes of the whole struct."""
+        return self._data[self._start:self._end]
+
+    def _span(self, name):
+        """`(start, end)` offsets of the encoded field `name`."""
+        index = self._layout.index[name]
+        try:
+            start, end = self._offset(index), self._offset(index + 1)
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+        return start, _end_within(self, end)
+
+    def _raw_field(self, name):
+        """Encoded bytes of the field `name`."""
+        start, end = self._span(name)
+        return self._data[start:end]
+
+    def _items(self):
+        return ((name, self[name]) for name in self._layout.names)
+
+    def _decode(self):
+        """Fully decode the struct (same value as `codec.decode`)."""
+        try:
+            return self._layout.decode(self._data, self._start)[0]
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+
+
+class SequenceView:
+    """Lazy view of an encoded Vec or FixedLengthArray."""
+    __slots__ = ('_layout', '_data', '_start', '_count', '_offsets')
+
+    def __init__(self, layout, data, offset):
+        self._layout = layout
+        self._data = data
+        self._start = offset
+        if layout.count is None:
+            self._count, offset = decode_compact(data, offset)
+        else:
+            self._count = layout.count
+        self._offsets = [offset]
+
+    def _offset(self, index):
+        """Start offset of the element at `index` (end of the sequence for `index == len`)."""
+        element_size = self._layout.element_size
+        if element_size is not None:
+            return self._offsets[0] + index * element_size
+        offsets = self._offsets
+        skip = self._layout.skip
+        while len(offsets) <= index:
+            offsets.append(skip(self._data, offsets[-1]))
+        return offsets[index]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"{self._layout.name} index out of range")
+        try:
+            return self._layout.viewer(self._data, self._offset(index))
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def __repr__(self):
+        return f"<{self._layout.name} view @{self._start} len={self._count}>"
+
+    @property
+    def _end(self):
+        try:
+            end = self._offset(self._count)
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+        return _end_within(self, end)
+
+    @property
+    def _raw(self):
+        """Encoded bytes of the whole sequence (length prefix included)."""
+        return self._data[self._start:self._end]
+
+    def _span(self, index):
+        """`(start, end)` offsets of the encoded element at `index`."""
+        try:
+            start, end = self._offset(index), self._offset(index + 1)
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+        return start, _end_within(self, end)
+
+    def _raw_element(self, index):
+        """Encoded bytes of the element at `index`."""
+        start, end = self._span(index)
+        return self._data[start:end]
+
+    def _decode(self):
+        """Fully decode the sequence (same value as `codec.decode`)."""
+        try:
+            return self._layout.decode(self._data, self._start)[0]
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+
+
+class EnumView:
+    """Lazy view of an encoded Enum."""
+    __slots__ = ('_layout', '_data', '_start', '_index', '_variant', '_value')
+
+    def __init__(self, layout, data, offset):
+        self._layout = layout
+        self._data = data
+        self._start = offset
+        self._index = data[offset]
+        variant = layout.variants[self._index]
+        if variant is None:
+            raise ValueError(f"Index '{self._index}' not present in Enum type mapping")
+        self._variant, viewer = variant
+        self._value = None if viewer is None else viewer(data, offset + 1)
+
+    def __getitem__(self, name):
+        if name != self._variant:
+            raise KeyError(name)
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(f"'{self._layout.name}' variant is '{self._variant}', not '{name}'") from None
+
+    def __repr__(self):
+        return f"<{self._layout.name}::{self._variant} view @{self._start}>"
+
+    @property
+    def _end(self):
+        try:
+            end = self._layout.skip(self._data, self._start)
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+        return _end_within(self, end)
+
+    @property
+    def _raw(self):
+        """Encoded bytes of the whole enum (discriminant included)."""
+        return self._data[self._start:self._end]
+
+    def _decode(self):
+        """Fully decode the enum (same value as `codec.decode`)."""
+        try:
+            return self._layout.decode(self._data, self._start)[0]
+        except (IndexError, struct.error):
+            _truncated(self._layout.name)
+
+
+class _Layout:
+    """Per type data shared by all the views of that type."""
+
+    def __init__(self, cls):
+        self.name = cls.__name__
+        self.decode = _compile(cls)
+        self.skip = _compile_skip(cls)[1]
+
+
+def _struct_viewer(cls):
+    layout = _Layout(cls)
+    layout.names = tuple(name for name, _ in cls.type_mapping)
+    layout.index = {name: i for i, name in enumerate(layout.names)}
+    skippers = [_compile_skip(type_string) for _, type_string in cls.type_mapping]
+    layout.skips = tuple(skip for _, skip in skippers)
+    # Offsets relative to the struct start, known up to the first variable size field
+    static = [0]
+    for fixed, _ in skippers:
+        static.append(None if fixed is None or static[-1] is None else static[-1] + fixed)
+    layout.static = tuple(static)
+    layout.viewers = tuple(_viewer(type_string) for _, type_string in cls.type_mapping)
+
+    def view_struct(data, offset):
+        return StructView(layout, data, offset)
+
+    return view_struct
+
+
+def _sequence_viewer(cls, count):
+    layout = _Layout(cls)
+    layout.count = count
+    layout.element_size, layout.skip = _compile_skip(cls.sub_type)
+    layout.viewer = _viewer(cls.sub_type)
+
+    def view_sequence(data, offset):
+        return SequenceView(layout, data, offset)
+
+    return view_sequence
+
+
+def _enum_viewer(cls):
+    layout = _Layout(cls)
+    type_mapping = cls.type_mapping
+    items = type_mapping.items() if isinstance(type_mapping, dict) else enumerate(type_mapping)
+    layout.variants = [None] * 256
+    for index, (name, type_string) in items:
+        if type_string is None or issubclass(resolve_type(type_string), Null):
+            layout.variants[index] = (name, None)
+        else:
+            layout.variants[index] = (name, _viewer(type_string))
+
+    def view_enum(data, offset):
+        return EnumView(layout, data, offset)
+
+    return view_enum
+
+
+def _option_viewer(cls):
+    view_value = _viewer(cls.sub_type)
+
+    def view_option(data, offset):
+        if data[offset] == 0:
+            return None
+        return view_value(data, offset + 1)
+
+    return view_option
+
+
+def _compile_viewer(cls):
+    if issubclass(cls, Struct):
+        return _struct_viewer(cls)
+    if issubclass(cls, Enum) and cls.type_mapping:
+        return _enum_viewer(cls)
+    if issubclass(cls, FixedLengthArray) and _element_count(cls) and \
+            not (issubclass(cls, ByteArray) or _is_u8(cls.sub_type)):
+        return _sequence_viewer(cls, _element_count(cls))
+    if issubclass(cls, Vec) and not _is_u8(cls.sub_type):
+        return _sequence_viewer(cls, None)
+    if issubclass(cls, Option) and cls.sub_type:
+        return _option_viewer(cls)
+    decode_value = _compile(cls)
+
+    def view_value(data, offset):
+        return decode_value(data, offset)[0]
+
+    return view_value
+
+
+def _viewer(type_string, spec=None):
+    return _cached(_viewers, _compile_viewer, type_string, spec)
+
+
+def view(cls, data, offset=0, spec=None):
+    """
+    Lazy view of the value of type `cls` encoded in `data` (bytes-like or ScaleBytes).
+
+    Structs, sequences and enums are returned as views, other types as decoded values.
+    """
+    data = _as_buffer(data)
+    try:
+        return _viewer(cls, spec)(data, offset)
+    except (IndexError, struct.error):
+        _truncated(getattr(cls, '__name__', cls))
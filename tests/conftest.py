@@ -0,0 +1,11 @@
+import pytest
+
+from jam_types import spec
+
+
+@pytest.fixture(autouse=True)
+def tiny_spec():
+    """Run each test with the tiny spec, whatever spec the previous one left."""
+    spec.set_spec('tiny')
+    yield
+    spec.set_spec('tiny')
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from jam_types.archive import TraceArchive, TraceArchiveWriter, create_archive
+
+from values import write_trace
+
+
+@pytest.fixture
+def trace(tmp_path):
+    directory = tmp_path / 'trace'
+    directory.mkdir()
+    paths, _ = write_trace(random.Random(0), directory, steps=5)
+    # Not a trace file, stored as a single blob
+    notes = directory / 'notes.txt'
+    notes.write_bytes(b'not a trace step\n')
+    return paths + [notes]
+
+
+def test_extract_identical(tmp_path, trace):
+    writer = create_archive(tmp_path / 'trace.jar', trace, spec='tiny')
+    # Consecutive steps share their states
+    assert writer.size < writer.input_size
+    with TraceArchive(tmp_path / 'trace.jar') as archive:
+        assert sorted(archive.names()) == sorted(path.name for path in trace)
+        extracted = archive.extract(tmp_path / 'out')
+        assert archive.read(0) == (tmp_path / 'out' / archive.names()[0]).read_bytes()
+    assert len(extracted) == len(trace)
+    for path in trace:
+        assert (tmp_path / 'out' / path.name).read_bytes() == path.read_bytes()
+
+
+def test_unsplittable_step(tmp_path, trace):
+    # Trailing bytes: the step can't be rebuilt from its components, it's kept whole
+    data = trace[1].read_bytes() + b'\0'
+    with TraceArchiveWriter(tmp_path / 'trace.jar', spec='tiny') as writer:
+        writer.add(trace[1].name, data)
+    with TraceArchive(tmp_path / 'trace.jar') as archive:
+        assert 'raw' in archive.file(trace[1].name)['content']
+        assert archive.read(trace[1].name) == data
+
+
+def test_extract_rejects_escaping_names(tmp_path):
+    with TraceArchiveWriter(tmp_path / 'evil.jar', spec='tiny') as writer:
+        writer.add('../escaped.bin', b'data')
+    with TraceArchive(tmp_path / 'evil.jar') as archive:
+        with pytest.raises(ValueError):
+            archive.extract(tmp_path / 'out')
+    assert not (tmp_path / 'escaped.bin').exists()
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'bad.jar'
+    path.write_bytes(b'JAMTRACX' + bytes(28))
+    with pytest.raises(ValueError):
+        TraceArchive(path)
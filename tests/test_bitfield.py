@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from jam_types import spec
+from jam_types.bitfield import Bitfield, available_cores, core_assurances
+from jam_types.block import AssurancesXt
+from jam_types.codec import decode, encode
+from jam_types.model import decode_model
+from jam_types.spec import spec_params
+from jam_types.types import AvailabilityBitfield
+
+from values import random_value
+
+
+def test_sets():
+    a = Bitfield.from_cores([0, 3, 340], 341)
+    assert a == Bitfield.from_bytes(a.to_json(), 341)
+    assert a.popcount() == 3 and a.cores() == [0, 3, 340] and list(a) == [0, 3, 340]
+    assert 3 in a and 4 not in a and a[340] and not a[339]
+    b = Bitfield.from_cores([3, 4], 341)
+    assert (a & b).cores() == [3] and (a | b).cores() == [0, 3, 4, 340] and (a ^ b).cores() == [0, 4, 340]
+    assert (~a).popcount() == 338
+    # Empty bitfields are still bitfields
+    assert Bitfield(0, 8)
+    with pytest.raises(TypeError):
+        len(a)
+
+
+def test_bits_above_size():
+    with pytest.raises(ValueError):
+        Bitfield(1 << 341, 341)
+    with pytest.raises(ValueError):
+        Bitfield(-1, 8)
+    with pytest.raises(ValueError):
+        Bitfield.from_cores([341], 341)
+    with pytest.raises(ValueError):
+        Bitfield.from_bytes(bytes(42), 341)
+
+
+def test_padding():
+    """Padding bits aren't cores, but are encoded back as read."""
+    spec.set_spec('full')
+    octets = b'\xff' * 43
+    bits = Bitfield.from_bytes(octets, 341)
+    assert bits.popcount() == 341 and bits == Bitfield.from_cores(range(341), 341)
+    assert bits.to_bytes() == octets
+    assert (bits & bits).to_bytes() == b'\xff' * 42 + b'\x1f'
+    model = decode_model(AvailabilityBitfield, octets)
+    assert model == bits and model.to_json() == decode(AvailabilityBitfield, octets)
+
+
+@pytest.mark.parametrize('spec_name', ['tiny', 'full'])
+def test_core_assurances(spec_name):
+    spec.set_spec(spec_name)
+    params = spec_params(spec_name)
+    rnd = random.Random(spec_name)
+    assurances = [random_value('AvailAssurance', rnd) for _ in range(params['validators_count'])]
+    blob = encode(AssurancesXt, assurances)
+    assurances = decode(AssurancesXt, blob)
+    counts = [0] * params['core_count']
+    for assurance in assurances:
+        for core in Bitfield.from_bytes(assurance['bitfield'], params['core_count']):
+            counts[core] += 1
+    assert core_assurances(assurances) == counts
+    assert core_assurances(blob) == counts
+    threshold = params['validators_super_majority']
+    assert available_cores(blob).cores() == [core for core, count in enumerate(counts) if count >= threshold]
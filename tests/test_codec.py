@@ -0,0 +1,76 @@
+"""Compiled codec, lazy views and size index against the scalecodec classes."""
+
+import json
+import random
+
+import pytest
+from scalecodec.base import ScaleBytes
+
+from jam_types import spec
+from jam_types.codec import decode, decode_many, encode, encode_many, encoded_size
+from jam_types.index import measure
+from jam_types.view import EnumView, SequenceView, StructView, view
+
+from values import random_value, resolve
+
+TYPES = [
+    'Header', 'Block', 'TraceStep', 'Genesis', 'FuzzerMessage', 'WorkReport', 'WorkPackage', 'Statistics',
+    'ValidatorsData', 'AvailabilityAssignments', 'RecentBlocks', 'ReadyQueue', 'AccumulatedQueue', 'AuthPools',
+    'AuthQueues', 'TicketsOrKeys', 'Privileges', 'ServiceInfo', 'Disputes', 'PeerInfo',
+]
+
+
+def reference_encode(cls, value):
+    return bytes(resolve(cls)().encode(value).data)
+
+
+def reference_decode(cls, blob):
+    return resolve(cls)(data=ScaleBytes(bytearray(blob))).decode()
+
+
+def samples(spec_name, type_name, count):
+    spec.set_spec(spec_name)
+    rnd = random.Random(f'{spec_name}-{type_name}')
+    for _ in range(count):
+        value = random_value(type_name, rnd)
+        yield value, reference_encode(type_name, value)
+
+
+@pytest.mark.parametrize('spec_name', ['tiny', 'full'])
+@pytest.mark.parametrize('type_name', TYPES)
+def test_decode_encode(spec_name, type_name):
+    for _, blob in samples(spec_name, type_name, 3 if spec_name == 'tiny' else 1):
+        expected = reference_decode(type_name, blob)
+        # Same JSON, including the int/str/list types of the leaves
+        assert json.dumps(decode(type_name, blob)) == json.dumps(expected)
+        assert bytes(encode(type_name, expected)) == blob
+        assert encoded_size(type_name, expected) == len(blob)
+
+
+@pytest.mark.parametrize('spec_name', ['tiny', 'full'])
+@pytest.mark.parametrize('type_name', TYPES)
+def test_view_measure(spec_name, type_name):
+    for _, blob in samples(spec_name, type_name, 2 if spec_name == 'tiny' else 1):
+        root = view(type_name, blob)
+        if isinstance(root, (StructView, SequenceView, EnumView)):
+            assert root._decode() == decode(type_name, blob)
+            assert bytes(root._raw) == blob
+        assert measure(type_name, blob).end == len(blob)
+
+
+def test_many():
+    blobs = [blob for _, blob in samples('tiny', 'Header', 8)]
+    values = decode_many('Header', blobs)
+    assert values == [decode('Header', blob) for blob in blobs]
+    assert [bytes(blob) for blob in encode_many('Header', values)] == blobs
+
+
+@pytest.mark.parametrize('type_name', ['Header', 'TraceStep'])
+def test_truncated_and_trailing(type_name):
+    (_, blob), = samples('tiny', type_name, 1)
+    with pytest.raises(ValueError):
+        decode(type_name, blob[:-1])
+    with pytest.raises(ValueError):
+        decode(type_name, blob + b'\0')
+    with pytest.raises(ValueError):
+        view(type_name, blob[:len(blob) // 2])._decode()
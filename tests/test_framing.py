@@ -0,0 +1,122 @@
+import io
+import random
+import socket
+
+import pytest
+
+from jam_types.codec import decode, encode
+from jam_types.framing import FrameReader, FrameWriter, peek_wire_message
+from jam_types.fuzzer import FuzzerMessage
+
+from values import random_value
+
+
+def messages(count, seed=0):
+    rnd = random.Random(seed)
+    return [random_value(FuzzerMessage, rnd) for _ in range(count)]
+
+
+def wire(values):
+    """Encoded `FuzzerWireMessage` frames of `values`."""
+    frames = []
+    for value in values:
+        blob = encode(FuzzerMessage, value)
+        frames.append(len(blob).to_bytes(4, 'little') + blob)
+    return b''.join(frames)
+
+
+def test_socketpair():
+    values = messages(20)
+    a, b = socket.socketpair()
+    with a, b:
+        writer = FrameWriter(a)
+        for value in values[:-1]:
+            writer.write(value)
+        writer.send(values[-1])
+        a.shutdown(socket.SHUT_WR)
+        read = list(FrameReader(b))
+    expected = [decode(FuzzerMessage, encode(FuzzerMessage, value)) for value in values]
+    assert read == expected
+
+
+def test_kinds():
+    values = messages(10, seed=1)
+    reader = FrameReader(io.BytesIO(wire(values)))
+    for value in values:
+        kind, _ = reader.read_kind()
+        assert kind == (value if isinstance(value, str) else next(iter(value)))
+    assert reader.read_kind() is None
+    blob = wire(values[:1])
+    assert peek_wire_message(blob)[0] == peek_wire_message(blob + b'next frame')[0]
+
+
+def test_partial_sends():
+    """A non-blocking socket sends part of the frames: the rest is sent by the next flushes, once."""
+    values = messages(50, seed=2)
+    payload = bytes(encode(FuzzerMessage, {'error': 'x' * 4000}))
+    expected = b''.join(len(payload).to_bytes(4, 'little') + payload for _ in range(200)) + wire(values)
+    a, b = socket.socketpair()
+    with a, b:
+        a.setblocking(False)
+        b.setblocking(False)
+        writer = FrameWriter(a, buffer_size=1 << 24)
+        for _ in range(200):
+            writer.write_frame(payload)
+        for value in values:
+            writer.write(value)
+        received = bytearray()
+        blocked = 0
+        while len(received) < len(expected):
+            try:
+                writer.flush()
+            except BlockingIOError:
+                blocked += 1
+            try:
+                received += b.recv(1 << 16)
+            except BlockingIOError:
+                pass
+    assert blocked
+    assert bytes(received) == expected
+
+
+class Trickle(io.RawIOBase):
+    """Non-blocking raw stream: a few bytes per read, None (no data yet) in between."""
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+        self._ready = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        self._ready = not self._ready
+        if not self._ready:
+            return None
+        chunk = self._data[self._offset:self._offset + 3]
+        buf[:len(chunk)] = chunk
+        self._offset += len(chunk)
+        return len(chunk)
+
+
+def test_non_blocking_reads():
+    values = messages(5, seed=3)
+    reader = FrameReader(Trickle(wire(values)))
+    read = []
+    while True:
+        try:
+            message = reader.read()
+        except BlockingIOError:
+            continue
+        if message is None:
+            break
+        read.append(message)
+    assert read == [decode(FuzzerMessage, encode(FuzzerMessage, value)) for value in values]
+
+
+def test_truncated_frame():
+    with pytest.raises(ValueError):
+        FrameReader(io.BytesIO(wire(messages(1))[:-1])).read()
+    with pytest.raises(ValueError):
+        FrameReader(io.BytesIO(wire(messages(1))), max_frame_size=1).read()
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from jam_types.archive import TraceArchive, create_archive
+from jam_types.codec import decode
+from jam_types.fuzzer import TraceStep
+from jam_types.replay import StateReplay, replay_archive, replay_files
+
+from values import write_trace
+
+
+def decoded_state(raw_state):
+    return {bytes.fromhex(item['key'][2:]): bytes.fromhex(item['value'][2:]) for item in raw_state['keyvals']}
+
+
+def expected_changes(path):
+    """Changes of a trace step, from its fully decoded pre and post states."""
+    step = decode(TraceStep, path.read_bytes())
+    old, new = decoded_state(step['pre_state']), decoded_state(step['post_state'])
+    return [(key, old.get(key), new.get(key)) for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)]
+
+
+@pytest.fixture
+def trace(tmp_path):
+    return write_trace(random.Random(1), tmp_path, steps=6)
+
+
+def test_replay_files(trace):
+    paths, states = trace
+    steps = list(replay_files(paths))
+    assert [step.name for step in steps] == [path.name for path in paths[1:]]
+    for step, path in zip(steps, paths[1:]):
+        assert [tuple(change) for change in step.changes] == expected_changes(path)
+    assert steps[-1].replay.state == states[-1]
+
+
+def test_replay_archive(tmp_path, trace):
+    paths, states = trace
+    create_archive(tmp_path / 'trace.jar', paths, spec='tiny')
+    with TraceArchive(tmp_path / 'trace.jar') as archive:
+        steps = list(replay_archive(archive))
+        for step, path in zip(steps, paths[1:]):
+            assert [tuple(change) for change in step.changes] == expected_changes(path)
+        assert steps[-1].replay.state == states[-1]
+
+
+def test_pre_state_mismatch(trace):
+    paths, _ = trace
+    # Skipping a step: the next pre-state is not the replayed state
+    replay = StateReplay.from_genesis(paths[0].read_bytes())
+    replay.apply_step(paths[1].read_bytes())
+    with pytest.raises(ValueError):
+        replay.apply_step(paths[3].read_bytes())
+    # Without verification the recorded pre-state is adopted
+    replay.apply_step(paths[3].read_bytes(), verify=False)
+    step = decode(TraceStep, paths[3].read_bytes())
+    assert replay.state == decoded_state(step['post_state'])
@@ -0,0 +1,106 @@
+"""
+State Merklization against a bit by bit transcription of the Gray Paper
+definitions (appendix D): nodes built as 512 bits sequences, then packed.
+"""
+
+import random
+from hashlib import blake2b
+
+import pytest
+
+from jam_types.codec import encode
+from jam_types.fuzzer import RawState
+from jam_types.keyvals import KeyValuesMap
+from jam_types.trie import ZERO_HASH, StateTrie, merkle_root
+
+
+def H(data):
+    return blake2b(data, digest_size=32).digest()
+
+
+def bits(data):
+    return [(octet >> (7 - i)) & 1 for octet in data for i in range(8)]
+
+
+def octets(sequence):
+    return bytes(sum(sequence[8 * i + j] << (7 - j) for j in range(8)) for i in range(len(sequence) // 8))
+
+
+def branch(left, right):
+    return octets([0] + bits(left)[1:] + bits(right))
+
+
+def leaf(key, value):
+    if len(value) <= 32:
+        return octets([1, 0] + bits(bytes((len(value),)))[2:] + bits(key) + bits(value + bytes(32 - len(value))))
+    return octets([1, 1, 0, 0, 0, 0, 0, 0] + bits(key) + bits(H(value)))
+
+
+def reference_root(state, depth=0):
+    if not state:
+        return ZERO_HASH
+    if len(state) == 1:
+        (key, value), = state.items()
+        return H(leaf(key, value))
+    left = {key: value for key, value in state.items() if not bits(key)[depth]}
+    right = {key: value for key, value in state.items() if bits(key)[depth]}
+    return H(branch(reference_root(left, depth + 1), reference_root(right, depth + 1)))
+
+
+def random_key(rnd):
+    # Service keys share long prefixes, as in real states
+    if rnd.random() < 0.3:
+        return bytes((255, rnd.randrange(4), 0, 0, 0)) + rnd.randbytes(26)
+    return rnd.randbytes(31)
+
+
+def test_vectors():
+    assert merkle_root({}) == ZERO_HASH
+    key = bytes(range(31))
+    # Embedded leaf: 0b10 and the value length in the first octet
+    assert merkle_root({key: b'\x01\x02'}) == H(b'\x82' + key + b'\x01\x02' + bytes(30))
+    # Regular leaf: value hashed
+    assert merkle_root({key: bytes(33)}) == H(b'\xc0' + key + H(bytes(33)))
+    # Keys differing in the first bit: a single branch, top bit of the left hash cleared
+    right_key = b'\x80' + bytes(30)
+    left_hash, right_hash = H(b'\x80' + bytes(31) + bytes(32)), H(b'\x80' + right_key + bytes(32))
+    assert merkle_root({bytes(31): b'', right_key: b''}) == H(bytes((left_hash[0] & 0x7f,)) + left_hash[1:] + right_hash)
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 10, 100])
+def test_reference(count):
+    rnd = random.Random(count)
+    state = {random_key(rnd): rnd.randbytes(rnd.choice((0, 1, 31, 32, 33, 100))) for _ in range(count)}
+    root = reference_root(state)
+    assert merkle_root(state) == root
+    assert StateTrie(state).root() == root
+    # Same root from the `KeyValues` of an encoded state
+    blob = encode(RawState, {
+        'state_root': '0x' + root.hex(),
+        'keyvals': [{'key': '0x' + key.hex(), 'value': '0x' + value.hex()} for key, value in sorted(state.items())],
+    })
+    assert merkle_root(KeyValuesMap.from_raw_state(blob)) == root
+
+
+def test_incremental():
+    rnd = random.Random(0)
+    state = {random_key(rnd): rnd.randbytes(rnd.choice((4, 40))) for _ in range(200)}
+    trie = StateTrie(state)
+    for step in range(100):
+        choice = rnd.random()
+        if choice < 0.4:
+            key = rnd.choice(sorted(state))
+            del state[key]
+            del trie[key]
+        elif choice < 0.7:
+            key = rnd.choice(sorted(state))
+            state[key] = trie[key] = rnd.randbytes(rnd.choice((4, 40)))
+        else:
+            key = random_key(rnd)
+            state[key] = trie[key] = rnd.randbytes(5)
+        if step % 10 == 0:
+            assert trie.root() == merkle_root(state)
+    assert trie.root() == reference_root(state)
+    for key in list(state):
+        del trie[key]
+    assert trie.root() == ZERO_HASH and len(trie) == 0
@@ -0,0 +1,110 @@
+"""
+Random values of the JAM types, as `codec.decode` returns them, and trace files
+built out of them.
+"""
+
+from scalecodec.base import RuntimeConfiguration
+from scalecodec.types import (Bool, Compact, Enum, FixedLengthArray, HexBytes, Null, Option, String, Struct,
+                              U8, U16, U32, U64, Vec)
+
+from jam_types.codec import encode
+from jam_types.fuzzer import Genesis, TraceStep
+from jam_types.simple import ByteArray
+from jam_types.spec import get_current_spec, spec_params
+
+_COMPACTS = (0, 1, 127, 128, 300, 2**14, 2**21 + 5, 2**32 - 1, 2**56 + 3, 2**64 - 1)
+
+
+def resolve(cls):
+    return cls if isinstance(cls, type) else RuntimeConfiguration().get_decoder_class(cls)
+
+
+def random_value(cls, rnd, max_len=3):
+    """Random value of type `cls` (class or type name)."""
+    cls = resolve(cls)
+    if cls.__name__ == 'AvailabilityBitfield':
+        params = spec_params(get_current_spec())
+        return '0x' + rnd.getrandbits(params['core_count']).to_bytes(params['avail_bitfield_bytes'], 'little').hex()
+    if issubclass(cls, ByteArray) or (issubclass(cls, FixedLengthArray) and resolve(cls.sub_type) is U8):
+        return '0x' + rnd.randbytes(cls.element_count).hex()
+    if issubclass(cls, FixedLengthArray):
+        return [random_value(cls.sub_type, rnd, max_len) for _ in range(cls.element_count)]
+    if issubclass(cls, Vec):
+        count = rnd.randint(0, max_len)
+        if getattr(cls, 'max_elements', None):
+            count = min(count, int(cls.max_elements))
+        return [random_value(cls.sub_type, rnd, max_len) for _ in range(count)]
+    if issubclass(cls, Struct):
+        return {name: random_value(field or 'Null', rnd, max_len) for name, field in cls.type_mapping}
+    if issubclass(cls, Enum):
+        name, variant = cls.type_mapping[rnd.choice(list(cls.type_mapping))]
+        return name if variant in (None, 'Null') else {name: random_value(variant, rnd, max_len)}
+    if issubclass(cls, Option):
+        return None if rnd.random() < 0.4 else random_value(cls.sub_type, rnd, max_len)
+    if issubclass(cls, Compact):
+        return rnd.choice(_COMPACTS + (rnd.getrandbits(rnd.randint(1, 64)),))
+    if issubclass(cls, HexBytes):
+        return '0x' + rnd.randbytes(rnd.randint(0, 40)).hex()
+    if issubclass(cls, String):
+        return ''.join(rnd.choice('abcxyz') for _ in range(rnd.randint(0, 10)))
+    if issubclass(cls, Bool):
+        return rnd.random() < 0.5
+    for int_cls, bits in ((U64, 64), (U32, 32), (U16, 16), (U8, 8)):
+        if issubclass(cls, int_cls):
+            return rnd.getrandbits(bits)
+    if issubclass(cls, Null):
+        return None
+    raise TypeError(f"No random values of {cls.__name__}")
+
+
+def random_state(rnd, count):
+    """Random state as a `{key: value}` dict of bytes."""
+    state = {}
+    while len(state) < count:
+        state[rnd.randbytes(31)] = rnd.randbytes(rnd.choice((0, 4, 32, 33, 100)))
+    return state
+
+
+def change_state(rnd, state, count):
+    """Copy of `state` with `count` values changed, removed or added."""
+    state = dict(state)
+    for _ in range(count):
+        choice = rnd.random()
+        if choice < 0.3 and state:
+            del state[rnd.choice(sorted(state))]
+        elif choice < 0.7 and state:
+            state[rnd.choice(sorted(state))] = rnd.randbytes(rnd.choice((1, 8, 40)))
+        else:
+            state[rnd.randbytes(31)] = rnd.randbytes(rnd.choice((2, 64)))
+    return state
+
+
+def raw_state(rnd, state):
+    """`RawState` value of `state`, with a random root."""
+    return {
+        'state_root': '0x' + rnd.randbytes(32).hex(),
+        'keyvals': [{'key': '0x' + key.hex(), 'value': '0x' + state[key].hex()} for key in sorted(state)],
+    }
+
+
+def write_trace(rnd, directory, steps, state_size=20, changes=4):
+    """
+    Write `genesis.bin` and `steps` chained trace steps into `directory`,
+    returning the paths and the states (genesis state first) as dicts.
+    """
+    state = random_state(rnd, state_size)
+    raw = raw_state(rnd, state)
+    genesis = {'header': random_value('Header', rnd), 'state': raw}
+    path = directory / 'genesis.bin'
+    path.write_bytes(encode(Genesis, genesis))
+    paths, states = [path], [state]
+    for index in range(1, steps + 1):
+        state = change_state(rnd, state, changes)
+        post = raw_state(rnd, state)
+        step = {'pre_state': raw, 'block': random_value('Block', rnd, max_len=2), 'post_state': post}
+        path = directory / f'{index:08}.bin'
+        path.write_bytes(encode(TraceStep, step))
+        paths.append(path)
+        states.append(state)
+        raw = post
+    return paths, states